@@ -1,6 +1,6 @@
 import os
 import threading
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, insert
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import QueuePool
 
@@ -79,6 +79,13 @@ class MainDb:
         else:
             self.session.add(data)
 
+    def insert_ignore(self, model, values):
+        """
+        批量插入数据，忽略违反唯一约束的记录
+        """
+        if values:
+            self.session.execute(insert(model).prefix_with("OR IGNORE"), values)
+
     def query(self, *obj):
         """
         查询对象
@@ -259,16 +259,20 @@ class RSSTORRENTS(Base):
     __tablename__ = 'RSS_TORRENTS'
     __table_args__ = (
         Index('INDX_RSS_TORRENTS_NAME', 'TITLE', 'YEAR', 'SEASON', 'EPISODE'),
+        Index('INDX_RSS_TORRENTS_HASH', 'ENCLOSURE_HASH', unique=True),
+        Index('INDX_RSS_TORRENTS_DATE', 'DATE'),
     )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     TORRENT_NAME = Column(Text)
     ENCLOSURE = Column(Text, index=True)
+    ENCLOSURE_HASH = Column(String(32))
     TYPE = Column(Text)
     TITLE = Column(Text)
     YEAR = Column(Text)
     SEASON = Column(Text)
     EPISODE = Column(Text)
+    DATE = Column(Text)
 
 
 class RSSTVS(Base):
@@ -1290,7 +1290,8 @@ class Downloader:
             # 是否存在的标志
             return_flag = False
             # 搜索电视剧的信息
-            tv_info = self.media.get_tmdb_info(mtype=MediaType.TV, tmdbid=meta_info.tmdb_id)
+            tv_info = self.media.get_tmdb_info(mtype=MediaType.TV, tmdbid=meta_info.tmdb_id,
+                                               append_to_response="basic")
             if tv_info:
                 # 传入检查季
                 total_seasons = []
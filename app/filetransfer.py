@@ -843,7 +843,7 @@ class FileTransfer:
                 # 查询TMDB详情，需要全部数据
                 media.set_tmdb_info(self.media.get_tmdb_info(mtype=media.type,
                                                              tmdbid=media.tmdb_id,
-                                                             append_to_response="all"))
+                                                             append_to_response="scrape"))
                 # 输出路径
                 out_path = new_file if not bluray_disk_dir else ret_dir_path
                 # 转移历史记录
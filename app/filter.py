@@ -1,4 +1,6 @@
 import re
+import time
+from threading import Lock
 
 import log
 from app.conf import ModuleConf
@@ -7,6 +9,8 @@ from app.utils import StringUtils, ReleaseGroupsMatcher
 from app.utils.commons import singleton
 from app.utils.types import MediaType
 
+lock = Lock()
+
 
 @singleton
 class Filter:
@@ -14,6 +18,17 @@ class Filter:
     dbhelper = None
     _groups = []
     _rules = []
+    # 编译后的规则组执行计划，规则组ID -> 计划
+    _rule_plans = {}
+    # 默认规则组ID
+    _default_groupid = None
+    # 规则组及规则的签名，未变化时不重新编译
+    _plans_sign = None
+    # 编译后的过滤条件，过滤条件签名 -> 计划
+    _filter_plans = {}
+    # 各条规则的累计统计，规则ID -> 统计
+    _rule_stats = {}
+    _rule_stats_since = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
 
     def __init__(self):
         self.init_config()
@@ -23,6 +38,98 @@ class Filter:
         self.rg_matcher = ReleaseGroupsMatcher()
         self._groups = self.get_filter_group()
         self._rules = self.get_filter_rule()
+        self.__build_rule_plans()
+
+    def __build_rule_plans(self):
+        """
+        将各规则组编译为执行计划：正则预编译、大小范围及促销条件预先解析，规则有变化时才重新编译
+        """
+        plans_sign = (tuple((group.ID, group.GROUP_NAME, group.IS_DEFAULT) for group in self._groups),
+                      tuple((rule.ID, rule.GROUP_ID, rule.PRIORITY, rule.INCLUDE, rule.EXCLUDE,
+                             rule.SIZE_LIMIT, rule.NOTE) for rule in self._rules))
+        if plans_sign == self._plans_sign:
+            return
+        rule_plans = {}
+        default_groupid = None
+        for group in self._groups:
+            if default_groupid is None and group.IS_DEFAULT == "Y":
+                default_groupid = str(group.ID)
+            rule_plans[str(group.ID)] = {
+                "id": group.ID,
+                "name": group.GROUP_NAME,
+                "rules": tuple(self.__compile_rule(rule_info) for rule_info in self.get_rules(group.ID))
+            }
+        self._rule_plans = rule_plans
+        self._default_groupid = default_groupid
+        self._filter_plans = {}
+        self._plans_sign = plans_sign
+
+    @staticmethod
+    def __compile_rule(rule_info):
+        """
+        编译单条过滤规则，解析出错的项保存异常，执行到该项时再抛出，与逐条解析时的行为一致
+        """
+
+        def __compile_re(_pattern):
+            try:
+                return re.compile(_pattern, re.IGNORECASE)
+            except Exception as _err:
+                return _err
+
+        def __to_float(_value):
+            try:
+                return float(_value)
+            except Exception as _err:
+                return _err
+
+        try:
+            order_seq = 100 - int(rule_info.get('pri'))
+        except Exception as err:
+            order_seq = err
+        # 包含、排除均忽略空行
+        includes = tuple(__compile_re(include.strip()) for include in rule_info.get('include') if include)
+        excludes = tuple(__compile_re(exclude.strip()) for exclude in rule_info.get('exclude') if exclude)
+        # 大小范围（字节）
+        size_range = None
+        sizes = rule_info.get('size')
+        if sizes:
+            try:
+                if sizes.find(',') != -1:
+                    sizes = sizes.split(',')
+                    begin_size = int(sizes[0].strip()) if sizes[0].isdigit() else 0
+                    end_size = int(sizes[1].strip()) if sizes[1].isdigit() else 0
+                else:
+                    begin_size = 0
+                    end_size = int(sizes.strip()) if sizes.isdigit() else 0
+                size_range = (begin_size * 1024 ** 3, end_size * 1024 ** 3)
+            except Exception as err:
+                size_range = err
+        # 促销
+        free = None
+        if rule_info.get("free"):
+            try:
+                ul_factor, dl_factor = rule_info.get("free").split()
+                free = (__to_float(ul_factor), __to_float(dl_factor))
+            except Exception as err:
+                free = err
+        return {
+            "info": rule_info,
+            "order": order_seq,
+            "include": includes,
+            "exclude": excludes,
+            "size": size_range,
+            "free": free
+        }
+
+    def get_rule_plan(self, rulegroup=None):
+        """
+        获取规则组的执行计划
+        :param rulegroup: 规则组ID，为空时取默认规则组
+        :return: 执行计划，规则组不存在时为None
+        """
+        if not rulegroup:
+            return self._rule_plans.get(self._default_groupid) if self._default_groupid else None
+        return self._rule_plans.get(str(rulegroup))
 
     def get_rule_groups(self, groupid=None, default=False):
         """
@@ -49,8 +156,11 @@ class Filter:
         获取所有的规则组及组内的规则
         """
         groups = self.get_rule_groups()
+        rule_stats = self.get_rule_stats()
         for group in groups:
             group['rules'] = self.get_rules(group.get("id"))
+            for rule in group['rules']:
+                rule['stats'] = rule_stats.get(rule.get("id")) or {}
         return groups
 
     def get_rules(self, groupid, ruleid=None):
@@ -101,116 +211,195 @@ class Filter:
         """
         if not meta_info:
             return False, 0, ""
+        rule_plan, fixed_result = self.__resolve_rule_plan(rulegroup)
+        return self.__check_rules(meta_info, rule_plan, fixed_result)[:3]
+
+    def __resolve_rule_plan(self, rulegroup):
+        """
+        解析规则组，不需要逐条匹配规则时直接给出结果
+        :return: 规则组执行计划, 固定的匹配结果
+        """
         # 为-1时不使用过滤规则
         if rulegroup and int(rulegroup) == -1:
-            return True, 0, "不过滤"
+            return None, (True, 0, "不过滤")
+        # 过滤规则组
+        rule_plan = self.get_rule_plan(rulegroup)
+        if not rulegroup and not rule_plan:
+            return None, (True, 0, "未配置过滤规则")
+        if not rule_plan:
+            return None, (True, 0, None)
+        return rule_plan, None
+
+    def __check_rules(self, meta_info, rule_plan, fixed_result, update_stats=True):
+        """
+        按已解析的规则组检查种子
+        :param update_stats: 是否累计规则命中统计
+        :return: 是否匹配，匹配的优先值，规则组名称，各条规则的匹配过程
+        """
+        if fixed_result:
+            return (*fixed_result, [])
         # 过滤使用的文本
         title = meta_info.rev_string
         if meta_info.subtitle:
             title = f"{title} {meta_info.subtitle}"
-        # 过滤规则组
-        if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, "未配置过滤规则"
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
+        return self.__match_rule_plan(rule_plan, meta_info, title, update_stats)
+
+    @classmethod
+    def __match_rule_plan(cls, rule_plan, meta_info, title, update_stats=True):
+        """
+        按规则组执行计划匹配种子，规则按优先级依次匹配，命中任意一条即返回
+        :param update_stats: 是否累计规则命中统计，测试规则时不累计
+        :return: 是否匹配，匹配的优先值，规则组名称，各条规则的匹配过程
+        """
         # 命中优先级
         order_seq = 0
         # 当前规则组是否命中
         group_match = True
-        for filter_info in filters:
+        # 各条规则的匹配过程：规则信息、结果、说明（生成过滤说明时才格式化）、耗时
+        rule_traces = []
+        start_time = time.perf_counter()
+        for rule in rule_plan.get("rules"):
+            rule_info = rule.get("info")
+            # 未命中的原因及说明，以第一个不满足的条件为准
+            reason, detail = None, None
             try:
+                # 命中规则的序号
+                if isinstance(rule.get("order"), Exception):
+                    raise rule.get("order")
+                order_seq = rule.get("order")
                 # 当前规则是否命中
                 rule_match = True
-                # 命中规则的序号
-                order_seq = 100 - int(filter_info.get('pri'))
                 # 必须包括的项
-                includes = filter_info.get('include')
-                if includes and rule_match:
-                    include_flag = True
-                    for include in includes:
-                        if not include:
-                            continue
-                        if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
-                            include_flag = False
-                            break
-                    if not include_flag:
+                for include in rule.get("include"):
+                    if isinstance(include, Exception):
+                        raise include
+                    if not include.search(title):
                         rule_match = False
+                        reason, detail = "include", include
+                        break
 
-                # 不能包含的项
-                excludes = filter_info.get('exclude')
+                # 不能包含的项，全部命中时不匹配
+                excludes = rule.get("exclude")
                 if excludes and rule_match:
                     exclude_flag = False
-                    exclude_count = 0
                     for exclude in excludes:
-                        if not exclude:
-                            continue
-                        exclude_count += 1
-                        if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
+                        if isinstance(exclude, Exception):
+                            raise exclude
+                        if not exclude.search(title):
                             exclude_flag = True
-                    if exclude_count > 0 and not exclude_flag:
+                    if not exclude_flag:
                         rule_match = False
+                        reason, detail = "exclude", excludes
                 # 大小
-                sizes = filter_info.get('size')
-                if sizes and rule_match and meta_info.size:
+                size_range = rule.get("size")
+                if size_range and rule_match and meta_info.size:
                     meta_info.size = StringUtils.num_filesize(meta_info.size)
-                    if sizes.find(',') != -1:
-                        sizes = sizes.split(',')
-                        if sizes[0].isdigit():
-                            begin_size = int(sizes[0].strip())
-                        else:
-                            begin_size = 0
-                        if sizes[1].isdigit():
-                            end_size = int(sizes[1].strip())
-                        else:
-                            end_size = 0
-                    else:
-                        begin_size = 0
-                        if sizes.isdigit():
-                            end_size = int(sizes.strip())
-                        else:
-                            end_size = 0
+                    if isinstance(size_range, Exception):
+                        raise size_range
+                    begin_size, end_size = size_range
                     if meta_info.type == MediaType.MOVIE:
-                        if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
+                        if not begin_size <= int(meta_info.size) <= end_size:
                             rule_match = False
                     else:
                         if meta_info.total_episodes \
-                                and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size * 1024 ** 3:
+                                and not begin_size <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size:
                             rule_match = False
+                    if not rule_match:
+                        reason, detail = "size", meta_info.size
 
                 # 促销
-                free = filter_info.get("free")
+                free = rule.get("free")
                 if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
-                    ul_factor, dl_factor = free.split()
-                    if float(ul_factor) > meta_info.upload_volume_factor \
-                            or float(dl_factor) < meta_info.download_volume_factor:
+                    if isinstance(free, Exception):
+                        raise free
+                    ul_factor, dl_factor = free
+                    if isinstance(ul_factor, Exception):
+                        raise ul_factor
+                    if ul_factor > meta_info.upload_volume_factor:
                         rule_match = False
+                    else:
+                        if isinstance(dl_factor, Exception):
+                            raise dl_factor
+                        if dl_factor < meta_info.download_volume_factor:
+                            rule_match = False
+                    if not rule_match and not reason:
+                        reason, detail = "free", meta_info.get_volume_factor_string()
 
+                end_time = time.perf_counter()
                 if rule_match:
-                    return True, order_seq, rulegroup.get("name")
+                    rule_traces.append((rule_info, "match", None, end_time - start_time))
+                    if update_stats:
+                        cls.__update_rule_stats(rule_traces)
+                    return True, order_seq, rule_plan.get("name"), rule_traces
                 else:
                     group_match = False
+                    rule_traces.append((rule_info, reason, detail, end_time - start_time))
+                start_time = end_time
             except Exception as err:
-                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{filter_info}")
+                end_time = time.perf_counter()
+                rule_traces.append((rule_info, "error", err, end_time - start_time))
+                start_time = end_time
+                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{rule_info}")
+        if update_stats:
+            cls.__update_rule_stats(rule_traces)
         if not group_match:
-            return False, 0, rulegroup.get("name")
-        return True, order_seq, rulegroup.get("name")
+            return False, 0, rule_plan.get("name"), rule_traces
+        return True, order_seq, rule_plan.get("name"), rule_traces
+
+    @classmethod
+    def __update_rule_stats(cls, rule_traces):
+        """
+        累计各条规则的检查、命中、未命中原因次数及耗时
+        """
+        if not rule_traces:
+            return
+        with lock:
+            for rule_info, result, _, cost in rule_traces:
+                stats = cls._rule_stats.setdefault(rule_info.get("id"), {
+                    "checked": 0,
+                    "match": 0,
+                    "include": 0,
+                    "exclude": 0,
+                    "size": 0,
+                    "free": 0,
+                    "error": 0,
+                    "cost": 0
+                })
+                stats["checked"] += 1
+                stats[result] += 1
+                stats["cost"] += cost
+
+    @classmethod
+    def get_rule_stats(cls):
+        """
+        获取过滤规则的累计统计
+        :return: {规则ID: {检查次数、命中次数、未命中次数及原因（包含/排除/大小/促销）、出错次数、平均耗时（毫秒）}}
+        """
+        with lock:
+            rule_stats = {rid: dict(stats) for rid, stats in cls._rule_stats.items()}
+        for stats in rule_stats.values():
+            stats["avg_cost"] = round(stats.get("cost") / stats.get("checked") * 1000, 3)
+            stats["reject"] = stats.get("checked") - stats.get("match") - stats.get("error")
+        return rule_stats
+
+    @classmethod
+    def get_rule_stats_since(cls):
+        """
+        过滤规则统计的开始时间
+        """
+        return cls._rule_stats_since
 
     def is_rule_free(self, rulegroup=None):
         """
         判断规则中是否需要Free检测
         """
-        if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, ""
-        else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
-        for filter_info in filters:
-            if filter_info.get("free"):
+        rule_plan = self.get_rule_plan(rulegroup)
+        if not rulegroup and not rule_plan:
+            return True, 0, ""
+        if not rule_plan:
+            return False
+        for rule in rule_plan.get("rules"):
+            if rule.get("free"):
                 return True
         return False
 
@@ -247,89 +436,231 @@ class Filter:
                              meta_info,
                              filter_args,
                              uploadvolumefactor=None,
-                             downloadvolumefactor=None):
+                             downloadvolumefactor=None,
+                             explain=False,
+                             update_stats=True):
         """
         对种子进行过滤
         :param meta_info: 名称识别后的MetaBase对象
         :param filter_args: 过滤条件的字典
         :param uploadvolumefactor: 种子的上传因子 传空不过滤
         :param downloadvolumefactor: 种子的下载因子 传空不过滤
-        :return: 是否匹配，匹配的优先值，匹配信息，值越大越优先
+        :param explain: 是否同时返回过滤过程的说明
+        :param update_stats: 是否累计规则命中统计，仅实际的搜索、订阅过滤累计，测试时不累计
+        :return: 是否匹配，匹配的优先值，匹配信息，值越大越优先；explain时再加上过滤说明
+        """
+        result = self.__check_torrent_filter(meta_info=meta_info,
+                                             filter_plan=self.__get_filter_plan(filter_args),
+                                             uploadvolumefactor=uploadvolumefactor,
+                                             downloadvolumefactor=downloadvolumefactor,
+                                             update_stats=update_stats)
+        return (*result[:3], self.__gen_explain(*result[3])) if explain else result[:3]
+
+    def check_torrent_filters(self, meta_infos, filter_args, volume_factors=None, explain=False, update_stats=True):
+        """
+        批量过滤种子，规则组、质量、分辨率、制作组、包含排除等正则只解析一次
+        :param meta_infos: 名称识别后的MetaBase对象列表
+        :param filter_args: 过滤条件的字典
+        :param volume_factors: 与meta_infos一一对应的（上传因子, 下载因子）列表，传空不过滤
+        :param explain: 是否同时返回过滤过程的说明
+        :param update_stats: 是否累计规则命中统计
+        :return: 与meta_infos一一对应的（是否匹配，匹配的优先值，匹配信息[，过滤说明]）列表
+        """
+        if not meta_infos:
+            return []
+        filter_plan = self.__get_filter_plan(filter_args)
+        results = []
+        for i, meta_info in enumerate(meta_infos):
+            uploadvolumefactor, downloadvolumefactor = volume_factors[i] if volume_factors else (None, None)
+            result = self.__check_torrent_filter(meta_info=meta_info,
+                                                 filter_plan=filter_plan,
+                                                 uploadvolumefactor=uploadvolumefactor,
+                                                 downloadvolumefactor=downloadvolumefactor,
+                                                 update_stats=update_stats)
+            results.append((*result[:3], self.__gen_explain(*result[3])) if explain else result[:3])
+        return results
+
+    def __get_filter_plan(self, filter_args):
+        """
+        获取过滤条件的执行计划，相同的过滤条件只编译一次，规则变化后重新编译
+        """
+        plan_key = tuple(sorted((key, str(value)) for key, value in filter_args.items() if value))
+        filter_plan = self._filter_plans.get(plan_key)
+        if filter_plan is None:
+            filter_plan = self.__compile_filter_args(filter_args)
+            if len(self._filter_plans) >= 256:
+                self._filter_plans = {}
+            self._filter_plans[plan_key] = filter_plan
+        return filter_plan
+
+    def __compile_filter_args(self, filter_args):
+        """
+        将过滤条件编译为执行计划，正则解析出错时保存异常，执行到该项时再抛出
+        """
+
+        def __compile_re(_pattern):
+            if not _pattern:
+                return None
+            try:
+                return re.compile(r"%s" % _pattern, re.I)
+            except Exception as _err:
+                return _err
+
+        filter_plan = {}
+        if filter_args.get("restype"):
+            filter_plan["restype"] = (filter_args.get("restype"), __compile_re(
+                ModuleConf.TORRENT_SEARCH_PARAMS["restype"].get(filter_args.get("restype"))))
+        if filter_args.get("pix"):
+            filter_plan["pix"] = (filter_args.get("pix"), __compile_re(
+                ModuleConf.TORRENT_SEARCH_PARAMS["pix"].get(filter_args.get("pix"))))
+        if filter_args.get("team"):
+            team = filter_args.get("team")
+            try:
+                groups_re = self.rg_matcher.get_groups_re(team)
+            except Exception as err:
+                groups_re = err
+            filter_plan["team"] = (team, groups_re, __compile_re(team))
+        if filter_args.get("sp_state"):
+            try:
+                ul_factor, dl_factor = filter_args.get("sp_state").split()
+                filter_plan["sp_state"] = (ul_factor, dl_factor)
+            except Exception as err:
+                filter_plan["sp_state"] = err
+        for key in ["include", "exclude", "key"]:
+            if filter_args.get(key):
+                filter_plan[key] = (filter_args.get(key), __compile_re(filter_args.get(key)))
+        # 过滤规则，-1表示不使用过滤规则，空则使用默认过滤规则
+        filter_plan["rule"] = filter_args.get("rule")
+        try:
+            filter_plan["rule_plan"] = self.__resolve_rule_plan(filter_args.get("rule"))
+        except Exception as err:
+            filter_plan["rule_plan"] = err
+        return filter_plan
+
+    def __check_torrent_filter(self,
+                               meta_info,
+                               filter_plan,
+                               uploadvolumefactor=None,
+                               downloadvolumefactor=None,
+                               update_stats=True):
+        """
+        按过滤条件执行计划过滤种子
+        :return: 是否匹配，匹配的优先值，匹配信息，生成过滤说明所需的未通过环节、过滤条件及规则匹配过程
         """
+
+        def __reject(_stage, _condition, _msg):
+            return False, 0, f"{meta_info.org_string} {_msg}", (_stage, _condition, None)
+
+        def __search(_pattern, _text):
+            if isinstance(_pattern, Exception):
+                raise _pattern
+            return _pattern.search(_text)
+
         # 过滤包含，排除，关键字使用的文本
         text = meta_info.rev_string
         if meta_info.subtitle:
             text = f"{text} {meta_info.subtitle}"
         # 过滤质量
-        if filter_args.get("restype"):
-            restype_re = ModuleConf.TORRENT_SEARCH_PARAMS["restype"].get(filter_args.get("restype"))
+        if filter_plan.get("restype"):
+            restype, restype_re = filter_plan.get("restype")
             if not meta_info.get_edtion_string():
-                return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
-            if restype_re and not re.search(r"%s" % restype_re, meta_info.get_edtion_string(), re.I):
-                return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
+                return __reject("restype", restype, f"不符合质量 {restype} 要求")
+            if restype_re and not __search(restype_re, meta_info.get_edtion_string()):
+                return __reject("restype", restype, f"不符合质量 {restype} 要求")
         # 过滤分辨率
-        if filter_args.get("pix"):
-            pix_re = ModuleConf.TORRENT_SEARCH_PARAMS["pix"].get(filter_args.get("pix"))
+        if filter_plan.get("pix"):
+            pix, pix_re = filter_plan.get("pix")
             if not meta_info.resource_pix:
-                return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
-            if pix_re and not re.search(r"%s" % pix_re, meta_info.resource_pix, re.I):
-                return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
+                return __reject("pix", pix, f"不符合分辨率 {pix} 要求")
+            if pix_re and not __search(pix_re, meta_info.resource_pix):
+                return __reject("pix", pix, f"不符合分辨率 {pix} 要求")
         # 过滤制作组/字幕组
-        if filter_args.get("team"):
-            team = filter_args.get("team")
+        if filter_plan.get("team"):
+            team, groups_re, team_re = filter_plan.get("team")
             if not meta_info.resource_team:
+                if isinstance(groups_re, Exception):
+                    raise groups_re
                 resource_team = self.rg_matcher.match(
                     title=meta_info.rev_string,
-                    groups=team)
+                    groups=team,
+                    groups_re=groups_re)
                 if not resource_team:
-                    return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
+                    return __reject("team", team, f"不符合制作组/字幕组 {team} 要求")
                 else:
                     meta_info.resource_team = resource_team
-            elif not re.search(r"%s" % team, meta_info.resource_team, re.I):
-                return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
+            elif not __search(team_re, meta_info.resource_team):
+                return __reject("team", team, f"不符合制作组/字幕组 {team} 要求")
         # 过滤促销
-        if filter_args.get("sp_state"):
-            ul_factor, dl_factor = filter_args.get("sp_state").split()
+        if filter_plan.get("sp_state"):
+            if isinstance(filter_plan.get("sp_state"), Exception):
+                raise filter_plan.get("sp_state")
+            ul_factor, dl_factor = filter_plan.get("sp_state")
             if uploadvolumefactor and ul_factor not in ("*", str(uploadvolumefactor)):
-                return False, 0, f"{meta_info.org_string} 不符合促销要求"
+                return __reject("sp_state", filter_plan.get("sp_state"), "不符合促销要求")
             if downloadvolumefactor and dl_factor not in ("*", str(downloadvolumefactor)):
-                return False, 0, f"{meta_info.org_string} 不符合促销要求"
+                return __reject("sp_state", filter_plan.get("sp_state"), "不符合促销要求")
         # 过滤包含
-        if filter_args.get("include"):
-            include = filter_args.get("include")
-            if not re.search(r"%s" % include, text, re.I):
-                return False, 0, f"{meta_info.org_string} 不符合包含 {include} 要求"
+        if filter_plan.get("include"):
+            include, include_re = filter_plan.get("include")
+            if not __search(include_re, text):
+                return __reject("include", include, f"不符合包含 {include} 要求")
         # 过滤排除
-        if filter_args.get("exclude"):
-            exclude = filter_args.get("exclude")
-            if re.search(r"%s" % exclude, text, re.I):
-                return False, 0, f"{meta_info.org_string} 不符合排除 {exclude} 要求"
+        if filter_plan.get("exclude"):
+            exclude, exclude_re = filter_plan.get("exclude")
+            if __search(exclude_re, text):
+                return __reject("exclude", exclude, f"不符合排除 {exclude} 要求")
         # 过滤关键字
-        if filter_args.get("key"):
-            key = filter_args.get("key")
-            if not re.search(r"%s" % key, text, re.I):
-                return False, 0, f"{meta_info.org_string} 不符合 {key} 要求"
-        # 过滤过滤规则，-1表示不使用过滤规则，空则使用默认过滤规则
-        if filter_args.get("rule"):
-            # 已设置默认规则
-            match_flag, order_seq, rule_name = self.check_rules(meta_info, filter_args.get("rule"))
-            match_msg = "%s 大小：%s 促销：%s 不符合订阅/站点过滤规则 %s 要求" % (
-                meta_info.org_string,
-                StringUtils.str_filesize(meta_info.size),
-                meta_info.get_volume_factor_string(),
-                rule_name
-            )
-            return match_flag, order_seq, match_msg
-        else:
-            # 默认过滤规则
-            match_flag, order_seq, rule_name = self.check_rules(meta_info)
-            match_msg = "%s 大小：%s 促销：%s 不符合默认过滤规则 %s 要求" % (
-                meta_info.org_string,
-                StringUtils.str_filesize(meta_info.size),
-                meta_info.get_volume_factor_string(),
-                rule_name
-            )
-            return match_flag, order_seq, match_msg
+        if filter_plan.get("key"):
+            key, key_re = filter_plan.get("key")
+            if not __search(key_re, text):
+                return __reject("key", key, f"不符合 {key} 要求")
+        # 过滤过滤规则
+        if isinstance(filter_plan.get("rule_plan"), Exception):
+            raise filter_plan.get("rule_plan")
+        match_flag, order_seq, rule_name, rule_traces = self.__check_rules(meta_info,
+                                                                             *filter_plan.get("rule_plan"),
+                                                                             update_stats=update_stats)
+        match_msg = "%s 大小：%s 促销：%s 不符合%s过滤规则 %s 要求" % (
+            meta_info.org_string,
+            StringUtils.str_filesize(meta_info.size),
+            meta_info.get_volume_factor_string(),
+            "订阅/站点" if filter_plan.get("rule") else "默认",
+            rule_name
+        )
+        return match_flag, order_seq, match_msg, ("rule" if not match_flag else None, rule_name, rule_traces)
+
+    @staticmethod
+    def __gen_explain(stage, condition, rule_traces=None):
+        """
+        生成过滤说明
+        :param stage: 未通过的环节：restype/pix/team/sp_state/include/exclude/key/rule，通过时为空
+        :param condition: 该环节的过滤条件，rule时为规则组名称
+        :param rule_traces: 规则组内各条规则的匹配过程
+        """
+        rules = []
+        for rule_info, result, detail, _ in rule_traces or []:
+            if result == "include":
+                detail = f"未包含 {detail.pattern}"
+            elif result == "exclude":
+                detail = "包含排除项 %s" % " ".join(exclude.pattern for exclude in detail)
+            elif result == "size":
+                detail = f"大小 {StringUtils.str_filesize(detail)} 超出限制 {rule_info.get('size')}"
+            elif result == "free":
+                detail = f"促销 {detail} 不满足 {rule_info.get('free_text')}"
+            else:
+                detail = str(detail or "")
+            rules.append({
+                "id": rule_info.get("id"),
+                "name": rule_info.get("name"),
+                "result": result,
+                "detail": detail
+            })
+        return {
+            "stage": stage,
+            "condition": " ".join(condition) if isinstance(condition, tuple) else condition,
+            "rules": rules,
+            "matched_rule": next((rule for rule in rules if rule.get("result") == "match"), None)
+        }
 
     def add_group(self, name, default='N'):
         """
@@ -1,4 +1,7 @@
 from .meta_helper import MetaHelper
+from .fanart_helper import FanartHelper
+from .image_cache_helper import ImageCacheHelper
+from .search_engine_helper import SearchEngineHelper
 from .progress_helper import ProgressHelper
 from .security_helper import SecurityHelper
 from .thread_helper import ThreadHelper
@@ -12,3 +15,4 @@ from .submodule_helper import SubmoduleHelper
 from .ffmpeg_helper import FfmpegHelper
 from .rss_helper import RssHelper
 from .plugin_helper import PluginHelper
+from .subscribe_helper import SubscribeHelper
@@ -0,0 +1,133 @@
+import os
+import pickle
+import time
+from enum import Enum
+from threading import RLock
+
+from app.utils import ExceptionUtils
+from app.utils.commons import singleton
+from config import Config
+
+lock = RLock()
+
+# 有图片的缓存有效期
+FANART_EXPIRE_TIMESTAMP = 7 * 24 * 3600
+# 无图片的缓存有效期
+FANART_EMPTY_EXPIRE_TIMESTAMP = 24 * 3600
+
+
+@singleton
+class FanartHelper(object):
+    """
+    Fanart图片缓存，按(媒体类型, ID)保存已解析好的图片索引
+    {
+        "电影-123": {
+            "images": {"movieposter": "url", ...},
+            "cache_timestamp": 1680000000,
+            "cache_expire_timestamp": 1680600000
+        }
+    }
+    """
+    _fanart_data = {}
+    _fanart_path = None
+    _changed = False
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        self._fanart_path = os.path.join(Config().get_config_path(), 'fanart.dat')
+        self._fanart_data = self.__load_fanart_data(self._fanart_path)
+
+    @staticmethod
+    def __get_key(media_type, queryid):
+        """
+        生成缓存key
+        """
+        if isinstance(media_type, Enum):
+            media_type = media_type.value
+        return "%s-%s" % (media_type, queryid)
+
+    def get_images(self, media_type, queryid):
+        """
+        获取缓存的图片索引，未缓存或已过期时返回None
+        """
+        key = self.__get_key(media_type, queryid)
+        with lock:
+            info = self._fanart_data.get(key)
+            if not info:
+                return None
+            if int(time.time()) >= info.get("cache_expire_timestamp", 0):
+                self._fanart_data.pop(key, None)
+                self._changed = True
+                return None
+            return info.get("images")
+
+    def update_images(self, media_type, queryid, images):
+        """
+        新增或更新图片索引
+        """
+        key = self.__get_key(media_type, queryid)
+        now = int(time.time())
+        expire = FANART_EXPIRE_TIMESTAMP if images else FANART_EMPTY_EXPIRE_TIMESTAMP
+        with lock:
+            self._fanart_data[key] = {
+                "images": images or {},
+                "cache_timestamp": now,
+                "cache_expire_timestamp": now + expire
+            }
+            self._changed = True
+
+    def clear_fanart_data(self):
+        """
+        清空所有Fanart缓存
+        """
+        with lock:
+            self._fanart_data = {}
+            self._changed = True
+
+    def get_cache_info(self):
+        """
+        返回缓存条目数及最早、最新条目的缓存时长（秒）
+        """
+        with lock:
+            timestamps = [v.get("cache_timestamp") or 0 for v in self._fanart_data.values()]
+        now = int(time.time())
+        return {
+            "count": len(timestamps),
+            "oldest": now - min(timestamps) if timestamps else 0,
+            "newest": now - max(timestamps) if timestamps else 0
+        }
+
+    @staticmethod
+    def __load_fanart_data(path):
+        """
+        从文件中加载缓存
+        """
+        try:
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = pickle.load(f)
+                return data
+            return {}
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return {}
+
+    def save_fanart_data(self, force=False):
+        """
+        保存缓存数据到文件，同时清理已过期的条目
+        """
+        if not force and not self._changed:
+            return
+        now = int(time.time())
+        with lock:
+            self._fanart_data = {k: v for k, v in self._fanart_data.items()
+                                 if v.get("cache_expire_timestamp", 0) > now}
+            fanart_data = dict(self._fanart_data)
+            self._changed = False
+        try:
+            with open(self._fanart_path, 'wb') as f:
+                pickle.dump(fanart_data, f, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
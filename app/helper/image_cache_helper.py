@@ -0,0 +1,191 @@
+import hashlib
+import os
+import time
+from threading import RLock
+
+import log
+from app.utils import ExceptionUtils, RequestUtils, ImageUtils
+from app.utils.commons import singleton
+from config import Config
+
+lock = RLock()
+
+# 图片缓存目录最大占用空间
+IMAGE_CACHE_MAX_SIZE = 500 * 1024 * 1024
+# 清理时腾出空间到上限的比例
+IMAGE_CACHE_CLEAN_RATIO = 0.8
+# 允许生成的缩略图宽度
+IMAGE_THUMB_WIDTHS = [150, 300, 500, 800]
+
+
+@singleton
+class ImageCacheHelper(object):
+    """
+    图片中转磁盘缓存，按URL哈希保存原图及缩略图，超出空间上限时按最近访问时间淘汰
+    """
+    _cache_path = None
+    _cache_size = 0
+    # 缓存文件名 -> ETag（内容哈希）
+    _etags = {}
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        self._cache_path = os.path.join(Config().get_temp_path(), "imgcache")
+        if not os.path.exists(self._cache_path):
+            os.makedirs(self._cache_path, exist_ok=True)
+        with lock:
+            self._etags = {}
+            self._cache_size = sum(os.path.getsize(os.path.join(self._cache_path, f))
+                                   for f in os.listdir(self._cache_path)
+                                   if os.path.isfile(os.path.join(self._cache_path, f)))
+
+    @staticmethod
+    def get_thumb_width(width):
+        """
+        将请求的宽度规整到允许的缩略图宽度，避免缓存无限膨胀
+        """
+        try:
+            width = int(width)
+        except (TypeError, ValueError):
+            return None
+        if width <= 0:
+            return None
+        for thumb_width in IMAGE_THUMB_WIDTHS:
+            if width <= thumb_width:
+                return thumb_width
+        return None
+
+    @staticmethod
+    def __get_file_name(url, width=None):
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        if width:
+            name = "%s_w%s" % (name, width)
+        return name
+
+    def get_etag(self, url, width=None):
+        """
+        获取已缓存图片的ETag，未缓存时返回None
+        """
+        file_name = self.__get_file_name(url, self.get_thumb_width(width))
+        with lock:
+            etag = self._etags.get(file_name)
+        if etag:
+            return etag
+        file_path = os.path.join(self._cache_path, file_name)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, 'rb') as f:
+                etag = hashlib.md5(f.read()).hexdigest()
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return None
+        with lock:
+            self._etags[file_name] = etag
+        return etag
+
+    def get_image(self, url, width=None):
+        """
+        获取图片内容，优先读取磁盘缓存，缩略图由原图按需生成
+        :param url: 图片地址
+        :param width: 缩略图宽度，为空时返回原图
+        :return: 图片内容, ETag
+        """
+        if not url:
+            return None, None
+        width = self.get_thumb_width(width)
+        content = self.__read(self.__get_file_name(url, width))
+        if content is not None:
+            return content, self.get_etag(url, width)
+        content = self.__read(self.__get_file_name(url))
+        if content is None:
+            ret = RequestUtils(timeout=10).get_res(url)
+            if not ret or not ret.content:
+                return None, None
+            content = ret.content
+            self.__write(self.__get_file_name(url), content)
+        if width:
+            # 原图不宽于缩略图或无法缩放时，原图即作为该宽度的缩略图缓存，下次直接命中且有ETag
+            thumb = ImageUtils.resize_image(content, width) or content
+            self.__write(self.__get_file_name(url, width), thumb)
+            return thumb, self.get_etag(url, width)
+        return content, self.get_etag(url)
+
+    def get_cache_info(self):
+        """
+        返回缓存文件数及占用空间
+        """
+        with lock:
+            return {
+                "count": len(os.listdir(self._cache_path)) if os.path.exists(self._cache_path) else 0,
+                "size": self._cache_size,
+                "max_size": IMAGE_CACHE_MAX_SIZE
+            }
+
+    def __read(self, file_name):
+        """
+        读取缓存文件，并刷新访问时间
+        """
+        file_path = os.path.join(self._cache_path, file_name)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            os.utime(file_path, None)
+            return content
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return None
+
+    def __write(self, file_name, content):
+        """
+        写入缓存文件，超出空间上限时触发清理
+        """
+        file_path = os.path.join(self._cache_path, file_name)
+        tmp_path = "%s.%s.tmp" % (file_path, time.time_ns())
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            with lock:
+                old_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                os.replace(tmp_path, file_path)
+                self._cache_size += len(content) - old_size
+                self._etags[file_name] = hashlib.md5(content).hexdigest()
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        if self._cache_size > IMAGE_CACHE_MAX_SIZE:
+            self.__clean()
+
+    def __clean(self):
+        """
+        按最近访问时间淘汰缓存文件，直到占用空间低于上限的一定比例
+        """
+        with lock:
+            try:
+                files = []
+                for file_name in os.listdir(self._cache_path):
+                    file_path = os.path.join(self._cache_path, file_name)
+                    if os.path.isfile(file_path):
+                        stat = os.stat(file_path)
+                        files.append((stat.st_mtime, stat.st_size, file_name, file_path))
+                files.sort()
+                target_size = IMAGE_CACHE_MAX_SIZE * IMAGE_CACHE_CLEAN_RATIO
+                total_size = sum(f[1] for f in files)
+                removed = 0
+                for _, size, file_name, file_path in files:
+                    if total_size <= target_size:
+                        break
+                    os.remove(file_path)
+                    self._etags.pop(file_name, None)
+                    total_size -= size
+                    removed += 1
+                self._cache_size = total_size
+                log.debug(f"【ImageCache】清理图片缓存 {removed} 个文件")
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
@@ -1,16 +1,41 @@
 import json
+import re
+import threading
 
 import openai
 
-from app.utils import OpenAISessionCache
+import log
+from app.utils import OpenAISessionCache, OpenAIMediaNameCache
 from app.utils.commons import singleton
 from config import Config
 
+# 单次请求最多识别的文件名数量
+OPENAI_BATCH_SIZE = 10
+# 同时进行的识别请求数
+OPENAI_MAX_CONCURRENCY = 2
+# 等待识别结果的超时时间（秒）
+OPENAI_WAIT_TIMEOUT = 120
+
+_filename_prompt = "I will give you a movie/tvshow file name.You need to return a Json." \
+                   "\nPay attention to the correct identification of the film name." \
+                   "\n{\"title\":string,\"version\":string,\"part\":string,\"year\":string,\"resolution\":string,\"release_group\":string,\"season\":number|null,\"episode\":number|null}"
+
+_filenames_prompt = "I will give you a Json array of movie/tvshow file names.You need to return a Json array " \
+                    "with the same length and order, each item of which is a Json." \
+                    "\nPay attention to the correct identification of the film name." \
+                    "\n[{\"title\":string,\"version\":string,\"part\":string,\"year\":string,\"resolution\":string,\"release_group\":string,\"season\":number|null,\"episode\":number|null}]"
+
 
 @singleton
 class OpenAiHelper:
     _api_key = None
     _api_url = None
+    # 等待批量识别的文件名：归一化名称 -> {"name", "event", "result"}
+    _pending = {}
+    _pending_lock = threading.Lock()
+    # 正在提交识别的线程数
+    _flushing = 0
+    _semaphore = threading.BoundedSemaphore(OPENAI_MAX_CONCURRENCY)
 
     def __init__(self):
         self.init_config()
@@ -22,6 +47,7 @@ class OpenAiHelper:
         self._api_url = Config().get_config("openai").get("api_url")
         if self._api_url:
             openai.api_base = self._api_url + "/v1"
+            openai.base_url = self._api_url + "/v1"
         else:
             proxy_conf = Config().get_proxies()
             if proxy_conf and proxy_conf.get("https"):
@@ -99,6 +125,14 @@ class OpenAiHelper:
                         "content": message
                     }
                 ]
+        if hasattr(openai, "chat"):
+            # openai>=1.0
+            return openai.chat.completions.create(
+                model="gpt-3.5-turbo",
+                user=user,
+                messages=message,
+                **kwargs
+            )
         return openai.ChatCompletion.create(
             model="gpt-3.5-turbo",
             user=user,
@@ -116,25 +150,118 @@ class OpenAiHelper:
         if OpenAISessionCache.get(session_id):
             OpenAISessionCache.delete(session_id)
 
+    @staticmethod
+    def __normalize_name(filename):
+        """
+        归一化文件名作为缓存key
+        """
+        return re.sub(r"[\s._\-\[\]()【】]+", " ", str(filename)).strip().lower()
+
     def get_media_name(self, filename):
         """
-        从文件名中提取媒体名称等要素
+        从文件名中提取媒体名称等要素，有空闲的请求时立即提交，
+        否则等待正在进行的请求完成，期间到达的多个文件名合并为一次请求
+        已有文件名列表时应使用get_media_names批量识别
         :param filename: 文件名
         :return: Json
         """
         if not self.get_state():
             return None
-        result = ""
-        try:
-            _filename_prompt = "I will give you a movie/tvshow file name.You need to return a Json." \
-                               "\nPay attention to the correct identification of the film name." \
-                               "\n{\"title\":string,\"version\":string,\"part\":string,\"year\":string,\"resolution\":string,\"release_group\":string,\"season\":number|null,\"episode\":number|null}"
-            completion = self.__get_model(prompt=_filename_prompt, message=filename)
-            result = completion.choices[0].message.content
-            return json.loads(result)
-        except Exception as e:
-            print(f"{str(e)}：{result}")
+        if not filename:
             return {}
+        key = self.__normalize_name(filename)
+        cache_info = OpenAIMediaNameCache.get(key)
+        if cache_info is not None:
+            return cache_info
+        with self._pending_lock:
+            waiter = self._pending.get(key)
+            if not waiter:
+                waiter = {"name": filename, "event": threading.Event(), "result": {}}
+                self._pending[key] = waiter
+            flush_now = self._flushing < OPENAI_MAX_CONCURRENCY
+            if flush_now:
+                self._flushing += 1
+        if flush_now:
+            self.__flush_pending()
+        waiter.get("event").wait(OPENAI_WAIT_TIMEOUT)
+        return waiter.get("result")
+
+    def __flush_pending(self):
+        """
+        将等待中的文件名批量提交识别，直到没有等待的文件名
+        """
+        while True:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                if not pending:
+                    self._flushing -= 1
+                    return
+            try:
+                results = self.get_media_names([waiter.get("name") for waiter in pending.values()])
+                for waiter in pending.values():
+                    waiter["result"] = results.get(waiter.get("name")) or {}
+            except Exception as e:
+                log.warn(f"【OpenAI】识别文件名出错：{str(e)}")
+            finally:
+                for waiter in pending.values():
+                    waiter.get("event").set()
+
+    def get_media_names(self, filenames):
+        """
+        批量从文件名中提取媒体名称等要素，结果按归一化名称缓存
+        :param filenames: 文件名列表
+        :return: {文件名: Json}
+        """
+        if not self.get_state():
+            return {}
+        results = {}
+        todo = {}
+        for filename in filenames or []:
+            if not filename:
+                continue
+            key = self.__normalize_name(filename)
+            cache_info = OpenAIMediaNameCache.get(key)
+            if cache_info is not None:
+                results[filename] = cache_info
+            else:
+                todo.setdefault(key, []).append(filename)
+        keys = list(todo)
+        for i in range(0, len(keys), OPENAI_BATCH_SIZE):
+            batch = keys[i:i + OPENAI_BATCH_SIZE]
+            infos = self.__request_media_names([todo[key][0] for key in batch])
+            for key, info in zip(batch, infos):
+                if info:
+                    OpenAIMediaNameCache.set(key, info)
+                for filename in todo[key]:
+                    results[filename] = info or {}
+        return results
+
+    def __request_media_names(self, filenames):
+        """
+        发送一次识别请求，单个文件名时使用单条提示词
+        :return: 与filenames等长的Json列表，失败的项为{}
+        """
+        result = ""
+        with self._semaphore:
+            try:
+                if len(filenames) == 1:
+                    completion = self.__get_model(prompt=_filename_prompt, message=filenames[0])
+                    result = completion.choices[0].message.content
+                    info = json.loads(result)
+                    return [info if isinstance(info, dict) else {}]
+                completion = self.__get_model(prompt=_filenames_prompt,
+                                              message=json.dumps(filenames, ensure_ascii=False))
+                result = completion.choices[0].message.content
+                infos = json.loads(result)
+                if isinstance(infos, dict):
+                    infos = next((v for v in infos.values() if isinstance(v, list)), [])
+                if not isinstance(infos, list) or len(infos) != len(filenames):
+                    log.warn(f"【OpenAI】批量识别返回数量不匹配：{result}")
+                    return [{} for _ in filenames]
+                return [info if isinstance(info, dict) else {} for info in infos]
+            except Exception as e:
+                log.warn(f"【OpenAI】识别文件名出错：{str(e)}：{result}")
+                return [{} for _ in filenames]
 
     def get_answer(self, text, userid):
         """
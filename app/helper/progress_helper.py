@@ -7,6 +7,8 @@ from app.utils.types import ProgressKey
 @singleton
 class ProgressHelper(object):
     _process_detail = {}
+    # 每次开始进度时递增，用于区分不同批次的事件
+    _serial = 0
 
     def __init__(self):
         self._process_detail = {}
@@ -17,10 +19,13 @@ class ProgressHelper(object):
     def __reset(self, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
             ptype = ptype.value
+        self._serial += 1
         self._process_detail[ptype] = {
             "enable": False,
             "value": 0,
-            "text": "请稍候..."
+            "text": "请稍候...",
+            "serial": self._serial,
+            "events": []
         }
 
     def start(self, ptype=ProgressKey.Search):
@@ -46,6 +51,28 @@ class ProgressHelper(object):
         if text:
             self._process_detail[ptype]['text'] = text
 
+    def push(self, event, ptype=ProgressKey.Search):
+        """
+        追加进度事件，供页面流式获取
+        """
+        if isinstance(ptype, Enum):
+            ptype = ptype.value
+        if not self._process_detail.get(ptype, {}).get('enable'):
+            return
+        self._process_detail[ptype]['events'].append(event)
+
+    def get_events(self, start=0, ptype=ProgressKey.Search):
+        """
+        获取从start开始的进度事件
+        :return: 批次号, 事件列表, 是否进行中
+        """
+        if isinstance(ptype, Enum):
+            ptype = ptype.value
+        detail = self._process_detail.get(ptype)
+        if not detail:
+            return None, [], False
+        return detail.get("serial"), detail.get("events", [])[start:], detail.get("enable")
+
     def get_process(self, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
             ptype = ptype.value
@@ -1,15 +1,61 @@
-import xml.dom.minidom
+import hashlib
+import json
+import re
+import time
+from io import BytesIO
+from threading import Lock, Event
 
+import log
 from app.db import MainDb, DbPersist
 from app.db.models import RSSTORRENTS
-from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils, SiteUtils
-from config import Config
+from app.helper.dict_helper import DictHelper
+from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils, SiteUtils, \
+    RssEnclosureCache, RssFeedCache
+from config import Config, RSS_HISTORY_KEEP_DAYS, RSS_FEED_CACHE_TTL
 from lxml import etree
+from requests.compat import chardet
+from requests.structures import CaseInsensitiveDict
 from urllib.parse import urljoin
 
+lock = Lock()
+
+# CDATA块或未转义的&
+_RSS_BARE_AMP_RE = re.compile(rb"(<!\[CDATA\[.*?]]>)|&(?!#?\w+;)", re.S)
+
+
+class RssFeed(object):
+    """
+    下载的RSS报文，缓存后由各调用方共用，不可修改：状态码、响应头及原始报文，
+    按探测到的编码解码的文本在首次使用时解码一次
+    """
+    __slots__ = ("status_code", "headers", "content", "_text")
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content or b""
+        self._text = None
+
+    def __bool__(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        if self._text is None:
+            encoding = chardet.detect(self.content).get("encoding") or "utf-8"
+            self._text = str(self.content, encoding, errors="replace")
+        return self._text
+
 
 class RssHelper:
     _db = MainDb()
+    _dicthelper = DictHelper()
+    # 条件请求状态，RSS地址 -> ETag、Last-Modified、报文哈希、报文大小，同时保存到字典中，重启后仍可使用
+    _feed_states = {}
+    # 条件请求及共享下载统计，站点域名 -> 304次数、内容未变化次数、节省的字节数及解析次数、请求次数、缓存命中次数、合并请求次数
+    _feed_stats = {}
+    # 正在下载的RSS，(RSS地址, 是否代理, 是否条件请求) -> 完成事件及报文
+    _feed_inflight = {}
 
     """
       RSS帮助类，解析RSS报文、获取RSS地址等
@@ -267,11 +313,13 @@ class RssHelper:
 
 
     @staticmethod
-    def parse_rssxml(url, proxy=False):
+    def parse_rssxml(url, proxy=False, timeout=None, conditional=False):
         """
         解析RSS订阅URL，获取RSS中的种子信息
         :param url: RSS地址
         :param proxy: 是否使用代理
+        :param timeout: 请求超时时间（秒）
+        :param conditional: 是否使用条件请求，RSS未变化时不再解析，直接返回空列表
         :return: 种子信息列表，如为None代表Rss过期
         """
         _special_title_sites = {
@@ -288,36 +336,66 @@ class RssHelper:
         if not url:
             return []
         site_domain = SiteUtils.get_url_domain(url)
+        feed_state = RssHelper.__get_feed_state(url) if conditional else {}
         try:
-            ret = RequestUtils(proxies=Config().get_proxies() if proxy else None).get_res(url)
+            headers = None
+            if feed_state.get("etag") or feed_state.get("last_modified"):
+                headers = {"User-Agent": Config().get_ua()}
+                if feed_state.get("etag"):
+                    headers["If-None-Match"] = feed_state.get("etag")
+                if feed_state.get("last_modified"):
+                    headers["If-Modified-Since"] = feed_state.get("last_modified")
+            ret = RssHelper.fetch_feed(url, proxy=proxy, timeout=timeout, headers=headers)
             if not ret:
                 return []
-            ret.encoding = ret.apparent_encoding
+            if conditional:
+                # 304或报文与上次相同时跳过解析
+                if ret.status_code == 304:
+                    RssHelper.__update_feed_stats(site_domain, not_modified=True,
+                                                  bytes_saved=feed_state.get("size") or 0)
+                    log.debug(f"【Rss】{site_domain} RSS未更新（304），跳过解析")
+                    return []
+                body_hash = hashlib.md5(ret.content).hexdigest()
+                if body_hash == feed_state.get("hash"):
+                    feed_state.update({
+                        "etag": ret.headers.get("ETag"),
+                        "last_modified": ret.headers.get("Last-Modified")
+                    })
+                    RssHelper.__set_feed_state(url, feed_state)
+                    RssHelper.__update_feed_stats(site_domain, not_modified=False, bytes_saved=0)
+                    log.debug(f"【Rss】{site_domain} RSS内容未变化，跳过解析")
+                    return []
+                feed_state = {
+                    "etag": ret.headers.get("ETag"),
+                    "last_modified": ret.headers.get("Last-Modified"),
+                    "hash": body_hash,
+                    "size": len(ret.content)
+                }
+            ret_xml = ret.content
+            # 没有XML声明的报文按探测到的编码转码，其余交由lxml按声明解码
+            if not ret_xml.lstrip().startswith(b"<?xml"):
+                ret_xml = ret.text.encode("utf-8")
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
             return []
-        if ret:
-            ret_xml = ret.text
+        if ret_xml:
             try:
-                # 解析XML
-                dom_tree = xml.dom.minidom.parseString(ret_xml)
-                rootNode = dom_tree.documentElement
-                items = rootNode.getElementsByTagName("item")
-                for item in items:
+                # 流式解析XML
+                for item in RssHelper.__iter_rss_items(ret_xml):
                     try:
                         # 标题
-                        title = DomUtils.tag_value(item, "title", default="")
+                        title = DomUtils.etree_tag_value(item, "title", default="")
                         if not title:
                             continue
                         # 标题特殊处理
                         if site_domain and site_domain in _special_title_sites:
                             title = _special_title_sites.get(site_domain)(title)
                         # 描述
-                        description = DomUtils.tag_value(item, "description", default="")
+                        description = DomUtils.etree_tag_value(item, "description", default="")
                         # 种子页面
-                        link = DomUtils.tag_value(item, "link", default="")
+                        link = DomUtils.etree_tag_value(item, "link", default="")
                         # 种子链接
-                        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+                        enclosure = DomUtils.etree_tag_value(item, "enclosure", "url", default="")
                         if not enclosure and not link:
                             continue
                         # 部分RSS只有link没有enclosure
@@ -325,13 +403,13 @@ class RssHelper:
                             enclosure = link
                             link = None
                         # 大小
-                        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
+                        size = DomUtils.etree_tag_value(item, "enclosure", "length", default=0)
                         if size and str(size).isdigit():
                             size = int(size)
                         else:
                             size = 0
                         # 发布日期
-                        pubdate = DomUtils.tag_value(item, "pubDate", default="")
+                        pubdate = DomUtils.etree_tag_value(item, "pubDate", default="")
                         if pubdate:
                             # 转换为时间
                             pubdate = StringUtils.get_time_stamp(pubdate)
@@ -348,26 +426,183 @@ class RssHelper:
                         continue
             except Exception as e2:
                 # RSS过期 观众RSS 链接已过期，您需要获得一个新的！  pthome RSS Link has expired, You need to get a new one!
-                if ret_xml in _rss_expired_msg:
+                if ret_xml.decode("utf-8", "ignore").strip() in _rss_expired_msg:
                     return None
                 ExceptionUtils.exception_traceback(e2)
+                return ret_array
+            if not ret_array and ret_xml.decode("utf-8", "ignore").strip() in _rss_expired_msg:
+                return None
+            # 解析成功后才记录条件请求状态，解析失败的报文下次仍会重新解析
+            if conditional:
+                RssHelper.__set_feed_state(url, feed_state)
         return ret_array
 
+    @staticmethod
+    def __iter_rss_items(content):
+        """
+        流式解析RSS报文，逐个返回item节点，处理完的节点随即释放
+        """
+        # 转义CDATA以外未转义的&，避免被容错解析直接丢弃（如链接中的&passkey=）
+        content = _RSS_BARE_AMP_RE.sub(lambda m: m.group(0) if m.group(1) else b"&amp;", content)
+        context = etree.iterparse(BytesIO(content),
+                                  events=("end",),
+                                  tag="{*}item",
+                                  recover=True,
+                                  huge_tree=True,
+                                  resolve_entities=False,
+                                  no_network=True)
+        for _, item in context:
+            yield item
+            item.clear(keep_tail=True)
+            while item.getprevious() is not None:
+                del item.getparent()[0]
+        del context
+
+    @classmethod
+    def __get_feed_state(cls, url):
+        with lock:
+            feed_state = cls._feed_states.get(url)
+        if feed_state is None:
+            # 内存中没有时读取保存的状态
+            try:
+                feed_state = json.loads(cls._dicthelper.get("RssFeedState", cls.__get_feed_state_key(url)) or "{}")
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                feed_state = {}
+            with lock:
+                feed_state = cls._feed_states.setdefault(url, feed_state)
+        return dict(feed_state)
+
+    @classmethod
+    def __set_feed_state(cls, url, feed_state):
+        with lock:
+            changed = cls._feed_states.get(url) != feed_state
+            cls._feed_states[url] = feed_state
+        # 状态变化时才写入字典
+        if changed:
+            cls._dicthelper.set("RssFeedState", cls.__get_feed_state_key(url), json.dumps(feed_state))
+
+    @staticmethod
+    def __get_feed_state_key(url):
+        """
+        RSS地址中带有passkey等信息，字典中以地址的哈希为Key
+        """
+        return hashlib.md5(url.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def fetch_feed(cls, url, proxy=False, timeout=None, headers=None):
+        """
+        下载RSS报文，订阅、刷流、自定义订阅共用：同一地址正在下载时等待该次下载的结果，
+        短时间内重复下载直接使用缓存的报文，各调用方自行解析
+        :param url: RSS地址
+        :param proxy: 是否使用代理
+        :param timeout: 请求超时时间（秒）
+        :param headers: 请求头，带条件请求头时不与普通请求合并
+        :return: RssFeed，失败时为None或非200的报文
+        """
+        if not url:
+            return None
+        site_domain = SiteUtils.get_url_domain(url)
+        cache_key = "%s|%s" % (url, bool(proxy))
+        inflight_key = (cache_key, bool(headers))
+        with lock:
+            ret = RssFeedCache.get(cache_key)
+            if ret is not None:
+                cls.__get_feed_stats_entry(site_domain)["cache_hits"] += 1
+                return ret
+            inflight = cls._feed_inflight.get(inflight_key)
+            owner = inflight is None
+            if owner:
+                inflight = {"event": Event(), "response": None}
+                cls._feed_inflight[inflight_key] = inflight
+            else:
+                cls.__get_feed_stats_entry(site_domain)["shared"] += 1
+        if not owner:
+            inflight["event"].wait()
+            return inflight["response"]
+        try:
+            res = RequestUtils(headers=headers,
+                               proxies=Config().get_proxies() if proxy else None,
+                               timeout=timeout).get_res(url)
+            ret = RssFeed(res.status_code, res.headers, res.content) if res is not None else None
+            # 只缓存完整的报文，304等响应仅对本次条件请求有效
+            if ret is not None and ret.status_code == 200:
+                RssFeedCache.set(cache_key, ret, ttl=RSS_FEED_CACHE_TTL)
+            inflight["response"] = ret
+            return ret
+        finally:
+            with lock:
+                cls.__get_feed_stats_entry(site_domain)["requests"] += 1
+                cls._feed_inflight.pop(inflight_key, None)
+            inflight["event"].set()
+
+    @classmethod
+    def __get_feed_stats_entry(cls, site_domain):
+        return cls._feed_stats.setdefault(site_domain, {
+            "not_modified": 0,
+            "unchanged": 0,
+            "bytes_saved": 0,
+            "parses_saved": 0,
+            "requests": 0,
+            "cache_hits": 0,
+            "shared": 0
+        })
+
+    @classmethod
+    def __update_feed_stats(cls, site_domain, not_modified, bytes_saved):
+        with lock:
+            stats = cls.__get_feed_stats_entry(site_domain)
+            if not_modified:
+                stats["not_modified"] += 1
+            else:
+                stats["unchanged"] += 1
+            stats["bytes_saved"] += bytes_saved
+            stats["parses_saved"] += 1
+
+    @classmethod
+    def get_feed_stats(cls, site_domain=None):
+        """
+        获取RSS条件请求及共享下载的统计
+        :param site_domain: 站点域名，为空时返回所有站点
+        :return: {站点域名: {304次数, 内容未变化次数, 节省的字节数, 节省的解析次数, 请求次数, 缓存命中次数, 合并请求次数}}
+        """
+        with lock:
+            if site_domain:
+                return dict(cls._feed_stats.get(site_domain) or {})
+            return {domain: dict(stats) for domain, stats in cls._feed_stats.items()}
+
+    @staticmethod
+    def get_enclosure_hash(enclosure):
+        """
+        计算下载链接的定长哈希，用于唯一索引及查询
+        """
+        if not enclosure:
+            return None
+        return hashlib.md5(enclosure.encode("utf-8")).hexdigest()
+
     @DbPersist(_db)
-    def insert_rss_torrents(self, media_info):
+    def insert_rss_torrents(self, media_infos):
         """
-        将RSS的记录插入数据库
+        将RSS的记录插入数据库，支持批量插入，已存在的下载链接忽略
+        :param media_infos: 媒体信息或媒体信息列表
         """
-        self._db.insert(
-            RSSTORRENTS(
-                TORRENT_NAME=media_info.org_string,
-                ENCLOSURE=media_info.enclosure,
-                TYPE=media_info.type.value,
-                TITLE=media_info.title,
-                YEAR=media_info.year,
-                SEASON=media_info.get_season_string(),
-                EPISODE=media_info.get_episode_string()
-            ))
+        if not isinstance(media_infos, list):
+            media_infos = [media_infos]
+        date = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        self._db.insert_ignore(RSSTORRENTS, [{
+            "TORRENT_NAME": media_info.org_string,
+            "ENCLOSURE": media_info.enclosure,
+            "ENCLOSURE_HASH": self.get_enclosure_hash(media_info.enclosure),
+            "TYPE": media_info.type.value,
+            "TITLE": media_info.title,
+            "YEAR": media_info.year,
+            "SEASON": media_info.get_season_string(),
+            "EPISODE": media_info.get_episode_string(),
+            "DATE": date
+        } for media_info in media_infos])
+        for media_info in media_infos:
+            if media_info.enclosure:
+                RssEnclosureCache.set(media_info.enclosure, True)
 
     def is_rssd_by_enclosure(self, enclosure):
         """
@@ -375,11 +610,37 @@ class RssHelper:
         """
         if not enclosure:
             return True
-        if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0:
+        if RssEnclosureCache.get(enclosure):
+            return True
+        if self._db.query(RSSTORRENTS.ID).filter(
+                RSSTORRENTS.ENCLOSURE_HASH == self.get_enclosure_hash(enclosure)).first():
+            RssEnclosureCache.set(enclosure, True)
             return True
         else:
             return False
 
+    def get_rssd_enclosures(self, enclosures):
+        """
+        批量查询RSS是否处理过，根据下载链接，一个RSS的所有链接只需一次查询
+        :param enclosures: 下载链接列表
+        :return: 已处理过的下载链接集合
+        """
+        enclosures = set([enclosure for enclosure in enclosures if enclosure])
+        # 最近处理过的链接直接命中内存缓存
+        rssd_enclosures = set([enclosure for enclosure in enclosures if RssEnclosureCache.get(enclosure)])
+        unknown_hashes = {self.get_enclosure_hash(enclosure): enclosure
+                          for enclosure in enclosures - rssd_enclosures}
+        hashes = list(unknown_hashes.keys())
+        # 分批查询，避免超出SQLite的参数个数限制
+        for i in range(0, len(hashes), 500):
+            ret = self._db.query(RSSTORRENTS.ENCLOSURE_HASH).filter(
+                RSSTORRENTS.ENCLOSURE_HASH.in_(hashes[i:i + 500])).all()
+            for item in ret:
+                enclosure = unknown_hashes.get(item[0])
+                rssd_enclosures.add(enclosure)
+                RssEnclosureCache.set(enclosure, True)
+        return rssd_enclosures
+
     def is_rssd_by_simple(self, torrent_name, enclosure):
         """
         查询RSS是否处理过，根据名称
@@ -387,21 +648,25 @@ class RssHelper:
         if not torrent_name and not enclosure:
             return True
         if enclosure:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count()
+            ret = self._db.query(RSSTORRENTS.ID).filter(
+                RSSTORRENTS.ENCLOSURE_HASH == self.get_enclosure_hash(enclosure)).first()
         else:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
-        return True if ret > 0 else False
+            ret = self._db.query(RSSTORRENTS.ID).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).first()
+        return True if ret else False
 
     @DbPersist(_db)
     def simple_insert_rss_torrents(self, title, enclosure):
         """
         将RSS的记录插入数据库
         """
-        self._db.insert(
-            RSSTORRENTS(
-                TORRENT_NAME=title,
-                ENCLOSURE=enclosure
-            ))
+        self._db.insert_ignore(RSSTORRENTS, [{
+            "TORRENT_NAME": title,
+            "ENCLOSURE": enclosure,
+            "ENCLOSURE_HASH": self.get_enclosure_hash(enclosure),
+            "DATE": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        }])
+        if enclosure:
+            RssEnclosureCache.set(enclosure, True)
 
     @DbPersist(_db)
     def simple_delete_rss_torrents(self, title, enclosure=None):
@@ -410,9 +675,12 @@ class RssHelper:
         """
         if enclosure:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title,
-                                               RSSTORRENTS.ENCLOSURE == enclosure).delete()
+                                               RSSTORRENTS.ENCLOSURE_HASH == self.get_enclosure_hash(enclosure)
+                                               ).delete()
+            RssEnclosureCache.delete(enclosure)
         else:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title).delete()
+            RssEnclosureCache.clear()
 
     @DbPersist(_db)
     def truncate_rss_history(self):
@@ -420,3 +688,28 @@ class RssHelper:
         清空RSS历史记录
         """
         self._db.query(RSSTORRENTS).delete()
+        RssEnclosureCache.clear()
+
+    @DbPersist(_db)
+    def prune_rss_torrents(self, keep_days=None):
+        """
+        清理超出保留期限的RSS记录，不带下载链接的记录（如插件的处理标记）不清理
+        :param keep_days: 保留天数，为空时读取配置，小于等于0时不清理
+        """
+        if keep_days is None:
+            keep_days = Config().get_config("pt").get("rss_history_keep_days")
+            if keep_days is None or str(keep_days).strip() == "":
+                keep_days = RSS_HISTORY_KEEP_DAYS
+        try:
+            keep_days = int(keep_days)
+        except (TypeError, ValueError):
+            keep_days = RSS_HISTORY_KEEP_DAYS
+        if keep_days <= 0:
+            return 0
+        expire_date = time.strftime('%Y-%m-%d %H:%M:%S',
+                                    time.localtime(time.time() - keep_days * 24 * 3600))
+        count = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.DATE < expire_date,
+                                                   RSSTORRENTS.ENCLOSURE_HASH.isnot(None)).delete()
+        RssEnclosureCache.clear()
+        log.info(f"【Rss】清理 {keep_days} 天前的RSS记录 {count} 条")
+        return count
@@ -0,0 +1,249 @@
+import difflib
+import os
+import pickle
+import re
+import time
+from threading import RLock
+from urllib.parse import quote
+
+from lxml import etree
+
+import log
+from app.utils import ExceptionUtils, RequestUtils
+from app.utils.commons import singleton
+from config import Config, KEYWORD_BLACKLIST, KEYWORD_SEARCH_WEIGHT_3, KEYWORD_SEARCH_WEIGHT_2, \
+    KEYWORD_SEARCH_WEIGHT_1, KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD, \
+    KEYWORD_BING_URL, KEYWORD_BAIDU_URL
+
+lock = RLock()
+
+# 推断出关键字的缓存有效期
+KEYWORD_EXPIRE_TIMESTAMP = 7 * 24 * 3600
+# 未推断出关键字的缓存有效期
+KEYWORD_EMPTY_EXPIRE_TIMESTAMP = 24 * 3600
+# 每小时最多请求搜索引擎的次数
+KEYWORD_HOURLY_BUDGET = 30
+
+
+@singleton
+class SearchEngineHelper(object):
+    """
+    TMDB未识别时通过搜索引擎推断关键字，结果持久化缓存并按小时限制请求次数
+    {
+        "名称": {
+            "keyword": '',
+            "is_movie": False,
+            "cache_expire_timestamp": 1680000000
+        }
+    }
+    """
+    _keyword_data = {}
+    _keyword_path = None
+    _changed = False
+    _bing_url = KEYWORD_BING_URL
+    _baidu_url = KEYWORD_BAIDU_URL
+    _hourly_budget = KEYWORD_HOURLY_BUDGET
+    # 最近一小时内请求搜索引擎的时间
+    _query_times = []
+    # 统计
+    _stats = {}
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        self._keyword_path = os.path.join(Config().get_config_path(), 'keyword.dat')
+        self._keyword_data = self.__load_keyword_data(self._keyword_path)
+        self._query_times = []
+        self._stats = {"hit": 0, "miss": 0, "query": 0, "over_budget": 0}
+
+    def get_keyword(self, feature_name):
+        """
+        获取辅助识别关键字，优先读取缓存
+        :return: 关键字, 是否电影
+        """
+        if not feature_name:
+            return None, False
+        now = int(time.time())
+        with lock:
+            info = self._keyword_data.get(feature_name)
+            if info and now < info.get("cache_expire_timestamp", 0):
+                self._stats["hit"] += 1
+                return info.get("keyword"), info.get("is_movie")
+            self._stats["miss"] += 1
+            # 超出每小时预算时不请求搜索引擎，也不写入缓存，以便后续重试
+            self._query_times = [t for t in self._query_times if now - t < 3600]
+            if len(self._query_times) >= self._hourly_budget:
+                self._stats["over_budget"] += 1
+                log.debug("【Meta】辅助识别已超出每小时请求限制，跳过：%s" % feature_name)
+                return None, False
+            self._query_times.append(now)
+            self._stats["query"] += 1
+        keyword, is_movie = self.__search_engine(feature_name)
+        expire = KEYWORD_EXPIRE_TIMESTAMP if keyword else KEYWORD_EMPTY_EXPIRE_TIMESTAMP
+        with lock:
+            self._keyword_data[feature_name] = {
+                "keyword": keyword,
+                "is_movie": is_movie,
+                "cache_expire_timestamp": int(time.time()) + expire
+            }
+            self._changed = True
+        return keyword, is_movie
+
+    def get_stats(self):
+        """
+        返回缓存及请求统计
+        """
+        now = int(time.time())
+        with lock:
+            stats = dict(self._stats)
+            stats["count"] = len(self._keyword_data)
+            stats["budget_left"] = max(self._hourly_budget
+                                       - len([t for t in self._query_times if now - t < 3600]), 0)
+        return stats
+
+    def clear_keyword_data(self):
+        """
+        清空所有辅助识别缓存
+        """
+        with lock:
+            self._keyword_data = {}
+            self._changed = True
+
+    @staticmethod
+    def __load_keyword_data(path):
+        """
+        从文件中加载缓存
+        """
+        try:
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = pickle.load(f)
+                return data
+            return {}
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return {}
+
+    def save_keyword_data(self, force=False):
+        """
+        保存缓存数据到文件，同时清理已过期的条目
+        """
+        if not force and not self._changed:
+            return
+        now = int(time.time())
+        with lock:
+            self._keyword_data = {k: v for k, v in self._keyword_data.items()
+                                  if v.get("cache_expire_timestamp", 0) > now}
+            keyword_data = dict(self._keyword_data)
+            self._changed = False
+        try:
+            with open(self._keyword_path, 'wb') as f:
+                pickle.dump(keyword_data, f, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    def __search_engine(self, feature_name):
+        """
+        辅助识别关键字
+        """
+        is_movie = False
+        if not feature_name:
+            return None, is_movie
+        # 剔除不必要字符
+        feature_name = re.compile(r"^\w+字幕[组社]?", re.IGNORECASE).sub("", feature_name)
+        backlist = sorted(KEYWORD_BLACKLIST, key=lambda x: len(x), reverse=True)
+        for single in backlist:
+            feature_name = feature_name.replace(single, " ")
+        if not feature_name:
+            return None, is_movie
+
+        def cal_score(strongs, r_dict):
+            for i, s in enumerate(strongs):
+                if len(strongs) < 5:
+                    if i < 2:
+                        score = KEYWORD_SEARCH_WEIGHT_3[0]
+                    else:
+                        score = KEYWORD_SEARCH_WEIGHT_3[1]
+                elif len(strongs) < 10:
+                    if i < 2:
+                        score = KEYWORD_SEARCH_WEIGHT_2[0]
+                    else:
+                        score = KEYWORD_SEARCH_WEIGHT_2[1] if i < (len(strongs) >> 1) else KEYWORD_SEARCH_WEIGHT_2[2]
+                else:
+                    if i < 2:
+                        score = KEYWORD_SEARCH_WEIGHT_1[0]
+                    else:
+                        score = KEYWORD_SEARCH_WEIGHT_1[1] if i < (len(strongs) >> 2) else KEYWORD_SEARCH_WEIGHT_1[
+                            2] if i < (
+                                len(strongs) >> 1) \
+                            else KEYWORD_SEARCH_WEIGHT_1[3] if i < (len(strongs) >> 2 + len(strongs) >> 1) else \
+                            KEYWORD_SEARCH_WEIGHT_1[
+                                4]
+                if r_dict.__contains__(s.lower()):
+                    r_dict[s.lower()] += score
+                    continue
+                r_dict[s.lower()] = score
+
+        bing_url = self._bing_url % quote(feature_name)
+        baidu_url = self._baidu_url % quote(feature_name)
+        res_bing = RequestUtils(timeout=5).get_res(url=bing_url)
+        res_baidu = RequestUtils(timeout=5).get_res(url=baidu_url)
+        ret_dict = {}
+        if res_bing and res_bing.status_code == 200:
+            html_text = res_bing.text
+            if html_text:
+                html = etree.HTML(html_text)
+                strongs_bing = list(
+                    filter(lambda x: (0 if not x else difflib.SequenceMatcher(None, feature_name,
+                                                                              x).ratio()) > KEYWORD_STR_SIMILARITY_THRESHOLD,
+                           map(lambda x: x.text, html.cssselect(
+                               "#sp_requery strong, #sp_recourse strong, #tile_link_cn strong, .b_ad .ad_esltitle~div strong, h2 strong, .b_caption p strong, .b_snippetBigText strong, .recommendationsTableTitle+.b_slideexp strong, .recommendationsTableTitle+table strong, .recommendationsTableTitle+ul strong, .pageRecoContainer .b_module_expansion_control strong, .pageRecoContainer .b_title>strong, .b_rs strong, .b_rrsr strong, #dict_ans strong, .b_listnav>.b_ans_stamp>strong, #b_content #ans_nws .na_cnt strong, .adltwrnmsg strong"))))
+                if strongs_bing:
+                    title = html.xpath("//aside//h2[@class = \" b_entityTitle\"]/text()")
+                    if len(title) > 0:
+                        if title:
+                            t = re.compile(r"\s*\(\d{4}\)$").sub("", title[0])
+                            ret_dict[t] = 200
+                            if html.xpath("//aside//div[@data-feedbk-ids = \"Movie\"]"):
+                                is_movie = True
+                    cal_score(strongs_bing, ret_dict)
+        if res_baidu and res_baidu.status_code == 200:
+            html_text = res_baidu.text
+            if html_text:
+                html = etree.HTML(html_text)
+                ems = list(
+                    filter(lambda x: (0 if not x else difflib.SequenceMatcher(None, feature_name,
+                                                                              x).ratio()) > KEYWORD_STR_SIMILARITY_THRESHOLD,
+                           map(lambda x: x.text, html.cssselect("em"))))
+                if len(ems) > 0:
+                    cal_score(ems, ret_dict)
+        if not ret_dict:
+            return None, False
+        ret = sorted(ret_dict.items(), key=lambda d: d[1], reverse=True)
+        log.info("【Meta】推断关键字为：%s ..." % ([k[0] for i, k in enumerate(ret) if i < 4]))
+        if len(ret) == 1:
+            keyword = ret[0][0]
+        else:
+            pre = ret[0]
+            nextw = ret[1]
+            if nextw[0].find(pre[0]) > -1:
+                # 满分直接判定
+                if int(pre[1]) >= 100:
+                    keyword = pre[0]
+                # 得分相差30 以上， 选分高
+                elif int(pre[1]) - int(nextw[1]) > KEYWORD_DIFF_SCORE_THRESHOLD:
+                    keyword = pre[0]
+                # 重复的不选
+                elif nextw[0].replace(pre[0], "").strip() == pre[0]:
+                    keyword = pre[0]
+                # 纯数字不选
+                elif pre[0].isdigit():
+                    keyword = nextw[0]
+                else:
+                    keyword = nextw[0]
+
+            else:
+                keyword = pre[0]
+        log.info("【Meta】选择关键字为：%s " % keyword)
+        return keyword, is_movie
@@ -0,0 +1,148 @@
+import re
+
+from app.utils.types import MediaType
+
+
+class SubscribeHelper:
+    """
+    订阅匹配：建立订阅倒排索引，按索引找出候选订阅后逐一校验
+    """
+
+    @staticmethod
+    def __get_index_name(name):
+        """
+        订阅名称归一化后作为索引键
+        """
+        return str(name or "").strip().lower()
+
+    @classmethod
+    def build_subscribe_index(cls, rss_movies, rss_tvs):
+        """
+        建立订阅倒排索引，精确匹配的订阅按TMDBID或名称索引，模糊匹配的订阅无法索引单独列出
+        索引中保存订阅在清单中的顺序及ID，匹配时仍按原顺序取第一个命中的订阅
+        """
+        subscribe_index = {}
+        for mtype, rss_infos in (("movie", rss_movies), ("tv", rss_tvs)):
+            tmdbids, names, fuzzy = {}, {}, []
+            for order, (rid, rss_info) in enumerate((rss_infos or {}).items()):
+                tmdbid = rss_info.get('tmdbid')
+                if rss_info.get('fuzzy_match'):
+                    fuzzy.append((order, rid))
+                elif tmdbid and not str(tmdbid).startswith("DB:"):
+                    tmdbids.setdefault(str(tmdbid), []).append((order, rid))
+                else:
+                    names.setdefault(cls.__get_index_name(rss_info.get('name')), []).append((order, rid))
+            subscribe_index[mtype] = {"tmdbid": tmdbids, "name": names, "fuzzy": fuzzy}
+        return subscribe_index
+
+    @classmethod
+    def match_subscribe(cls, media_info, rss_movies, rss_tvs, subscribe_index=None):
+        """
+        通过订阅倒排索引找出候选订阅，再逐一校验站点、年份、季等条件
+        :return: 匹配到的订阅信息，未匹配时返回None
+        """
+        if not subscribe_index:
+            subscribe_index = cls.build_subscribe_index(rss_movies, rss_tvs)
+        if media_info.type == MediaType.MOVIE and rss_movies:
+            rss_infos, mtype = rss_movies, "movie"
+        elif rss_tvs:
+            rss_infos, mtype = rss_tvs, "tv"
+        else:
+            return None
+        index = subscribe_index.get(mtype) or {}
+        candidates = (index.get("tmdbid", {}).get(str(media_info.tmdb_id), [])
+                      + index.get("name", {}).get(cls.__get_index_name(media_info.title), [])
+                      + index.get("fuzzy", []))
+        for _, rid in sorted(candidates):
+            rss_info = rss_infos.get(rid)
+            if not rss_info:
+                continue
+            if mtype == "movie":
+                if cls.check_movie_subscribe(media_info, rss_info):
+                    return rss_info
+            elif cls.check_tv_subscribe(media_info, rss_info):
+                return rss_info
+        return None
+
+    @staticmethod
+    def check_movie_subscribe(media_info, rss_info):
+        """
+        校验种子是否命中电影订阅
+        """
+        rss_sites = rss_info.get('rss_sites')
+        # 过滤订阅站点
+        if rss_sites and media_info.site not in rss_sites:
+            return False
+        # tmdbid或名称年份匹配
+        name = rss_info.get('name')
+        year = rss_info.get('year')
+        tmdbid = rss_info.get('tmdbid')
+        fuzzy_match = rss_info.get('fuzzy_match')
+        # 非模糊匹配
+        if not fuzzy_match:
+            # 有tmdbid时使用tmdbid匹配
+            if tmdbid and not tmdbid.startswith("DB:"):
+                if str(media_info.tmdb_id) != str(tmdbid):
+                    return False
+            else:
+                # 豆瓣年份与tmdb取向不同
+                if year and str(media_info.year) not in [str(year),
+                                                         str(int(year) + 1),
+                                                         str(int(year) - 1)]:
+                    return False
+                if name != media_info.title:
+                    return False
+        # 模糊匹配
+        else:
+            # 匹配年份
+            if year and str(year) != str(media_info.year):
+                return False
+            # 匹配关键字或正则表达式
+            search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
+            if not re.search(name, search_title, re.I) and name not in search_title:
+                return False
+        return True
+
+    @staticmethod
+    def check_tv_subscribe(media_info, rss_info):
+        """
+        校验种子是否命中电视剧订阅
+        """
+        rss_sites = rss_info.get('rss_sites')
+        # 过滤订阅站点
+        if rss_sites and media_info.site not in rss_sites:
+            return False
+        # 有tmdbid时精确匹配
+        name = rss_info.get('name')
+        year = rss_info.get('year')
+        season = rss_info.get('season')
+        tmdbid = rss_info.get('tmdbid')
+        fuzzy_match = rss_info.get('fuzzy_match')
+        # 非模糊匹配
+        if not fuzzy_match:
+            if tmdbid and not tmdbid.startswith("DB:"):
+                if str(media_info.tmdb_id) != str(tmdbid):
+                    return False
+            else:
+                # 匹配年份，年份可以为空
+                if year and str(year) != str(media_info.year):
+                    return False
+                # 匹配名称
+                if name != media_info.title:
+                    return False
+            # 匹配季，季可以为空
+            if season and season != media_info.get_season_string():
+                return False
+        # 模糊匹配
+        else:
+            # 匹配季，季可以为空
+            if season and season != "S00" and season != media_info.get_season_string():
+                return False
+            # 匹配年份
+            if year and str(year) != str(media_info.year):
+                return False
+            # 匹配关键字或正则表达式
+            search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
+            if not re.search(name, search_title, re.I) and name not in search_title:
+                return False
+        return True
@@ -1,5 +1,7 @@
-from concurrent.futures import ThreadPoolExecutor
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
+from app.utils import ExceptionUtils
 from app.utils.commons import singleton
 
 
@@ -16,3 +18,38 @@ class ThreadHelper:
 
     def start_thread(self, func, kwargs):
         self.executor.submit(func, *kwargs)
+
+    def run_tasks(self, tasks, timeout=None):
+        """
+        并发执行多个互不依赖的任务，共用一个截止时间，超时的任务不再等待
+        :param tasks: {任务名: 无参函数}
+        :param timeout: 截止时间（秒），为空时等待全部完成
+        :return: {任务名: 结果}（超时或出错的任务没有结果）, {任务名: 耗时秒数}, 超时的任务名列表
+        """
+        if not tasks:
+            return {}, {}, []
+        start_time = time.time()
+        timings = {}
+
+        def __run(_name, _func):
+            _start = time.time()
+            try:
+                return _func()
+            finally:
+                timings[_name] = round(time.time() - _start, 3)
+
+        futures = {self.executor.submit(__run, name, func): name for name, func in tasks.items()}
+        done, not_done = wait(futures, timeout=timeout)
+        results = {}
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+        timeouts = []
+        for future in not_done:
+            name = futures[future]
+            timeouts.append(name)
+            timings[name] = round(time.time() - start_time, 3)
+        return results, dict(timings), timeouts
@@ -62,7 +62,8 @@ class _IIndexClient(metaclass=ABCMeta):
                key_word,
                filter_args: dict,
                match_media,
-               in_from: SearchType):
+               in_from: SearchType,
+               use_cache=True):
         """
         根据关键字多线程搜索
         """
@@ -83,6 +84,8 @@ class _IIndexClient(metaclass=ABCMeta):
         index_match_fail = 0
         index_error = 0
 
+        # 先识别名称，再批量过滤
+        filter_items = []
         for item in result_array:
             # 名称
             torrent_name = item.get('title')
@@ -134,12 +137,17 @@ class _IIndexClient(metaclass=ABCMeta):
                     f"不匹配类型：{filter_args.get('type').value}")
                 index_rule_fail += 1
                 continue
-            # 检查订阅过滤规则匹配
-            match_flag, res_order, match_msg = self.filter.check_torrent_filter(
-                meta_info=meta_info,
-                filter_args=filter_args,
-                uploadvolumefactor=uploadvolumefactor,
-                downloadvolumefactor=downloadvolumefactor)
+            filter_items.append((meta_info, torrent_name, seeders, enclosure, size, peers, page_url,
+                                 uploadvolumefactor, downloadvolumefactor, description))
+        # 检查订阅过滤规则匹配
+        filter_results = self.filter.check_torrent_filters(
+            meta_infos=[filter_item[0] for filter_item in filter_items],
+            filter_args=filter_args,
+            volume_factors=[(filter_item[7], filter_item[8]) for filter_item in filter_items])
+        for filter_item, filter_result in zip(filter_items, filter_results):
+            meta_info, torrent_name, seeders, enclosure, size, peers, page_url, \
+                uploadvolumefactor, downloadvolumefactor, description = filter_item
+            match_flag, res_order, match_msg = filter_result
             if not match_flag:
                 log.info(f"【{self.client_name}】{match_msg}")
                 index_rule_fail += 1
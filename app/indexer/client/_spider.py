@@ -5,7 +5,10 @@ import re
 from urllib.parse import quote, urlencode
 
 from jinja2 import Template
+from lxml import etree
 from pyquery import PyQuery
+from pyquery.cssselectpatch import JQueryTranslator
+from pyquery.text import extract_text
 
 from app.utils.system_utils import SystemUtils
 import log
@@ -58,6 +61,10 @@ class TorrentSpider(object):
     # 加载等待元素
     wait_element = None
     timeout = 10
+    # 编译后的选择器及文本模板，按站点配置中的原文缓存，同一站点配置只编译一次
+    _xpath_cache = {}
+    _template_cache = {}
+    _translator = JQueryTranslator(xhtml=False)
 
     def __init__(self, indexer, referer=None):
 
@@ -121,9 +128,14 @@ class TorrentSpider(object):
                 wait_item=self.wait_element,
                 headless=noGraphical
             )
+            # 请求失败，计入站点失败
+            if page_source is None:
+                return True, []
             return self.parse(page_source)
         
         html_content = self.sample_request(searchurl)
+        if html_content is None:
+            return True, []
         return self.parse(html_content)
     
 
@@ -244,7 +256,7 @@ class TorrentSpider(object):
 
         if ret is None:
             log.warn(f"【Spider】[{self.indexername}] 请求失败: {searchurl}")
-            return ''
+            return None
         
         # 使用chardet检测字符编码
         raw_data = ret.content
@@ -271,33 +283,33 @@ class TorrentSpider(object):
             return
         selector = self.fields.get("title", {})
         if "selector" in selector:
-            title = torrent(selector.get("selector", "")).clone()
-            self.__remove(title, selector)
+            title = self.__select(torrent, selector.get("selector", ""))
+            title = self.__remove(title, selector)
             items = self.__attribute_or_text(title, selector)
             self.torrents_info["title"] = self.__index(items, selector)
         elif "text" in selector:
             render_dict = {}
             if "title_default" in self.fields:
                 title_default_selector = self.fields.get("title_default", {})
-                title_default_item = torrent(
-                    title_default_selector.get("selector", "")
-                ).clone()
-                self.__remove(title_default_item, title_default_selector)
+                title_default_item = self.__select(
+                    torrent, title_default_selector.get("selector", "")
+                )
+                title_default_item = self.__remove(title_default_item, title_default_selector)
                 items = self.__attribute_or_text(title_default_item, selector)
                 title_default = self.__index(items, title_default_selector)
                 render_dict.update({"title_default": title_default})
             if "title_optional" in self.fields:
                 title_optional_selector = self.fields.get("title_optional", {})
-                title_optional_item = torrent(
-                    title_optional_selector.get("selector", "")
-                ).clone()
-                self.__remove(title_optional_item, title_optional_selector)
+                title_optional_item = self.__select(
+                    torrent, title_optional_selector.get("selector", "")
+                )
+                title_optional_item = self.__remove(title_optional_item, title_optional_selector)
                 items = self.__attribute_or_text(
                     title_optional_item, title_optional_selector
                 )
                 title_optional = self.__index(items, title_optional_selector)
                 render_dict.update({"title_optional": title_optional})
-            self.torrents_info["title"] = Template(selector.get("text")).render(
+            self.torrents_info["title"] = self.__template(selector.get("text")).render(
                 fields=render_dict
             )
         self.torrents_info["title"] = self.__filter_text(
@@ -310,26 +322,26 @@ class TorrentSpider(object):
             return
         selector = self.fields.get("description", {})
         if "selector" in selector or "selectors" in selector:
-            description = torrent(
-                selector.get("selector", selector.get("selectors", ""))
-            ).clone()
+            description = self.__select(
+                torrent, selector.get("selector", selector.get("selectors", ""))
+            )
             if description:
-                self.__remove(description, selector)
+                description = self.__remove(description, selector)
                 items = self.__attribute_or_text(description, selector)
                 self.torrents_info["description"] = self.__index(items, selector)
         elif "text" in selector:
             render_dict = {}
             if "tags" in self.fields:
                 tags_selector = self.fields.get("tags", {})
-                tags_item = torrent(tags_selector.get("selector", "")).clone()
-                self.__remove(tags_item, tags_selector)
+                tags_item = self.__select(torrent, tags_selector.get("selector", ""))
+                tags_item = self.__remove(tags_item, tags_selector)
                 items = self.__attribute_or_text(tags_item, tags_selector)
                 tag = self.__index(items, tags_selector)
                 render_dict.update({"tags": tag})
             if "subject" in self.fields:
                 subject_selector = self.fields.get("subject", {})
-                subject_item = torrent(subject_selector.get("selector", "")).clone()
-                self.__remove(subject_item, subject_selector)
+                subject_item = self.__select(torrent, subject_selector.get("selector", ""))
+                subject_item = self.__remove(subject_item, subject_selector)
                 items = self.__attribute_or_text(subject_item, subject_selector)
                 subject = self.__index(items, subject_selector)
                 render_dict.update({"subject": subject})
@@ -337,10 +349,10 @@ class TorrentSpider(object):
                 description_free_forever_selector = self.fields.get(
                     "description_free_forever", {}
                 )
-                description_free_forever_item = torrent(
-                    description_free_forever_selector.get("selector", "")
-                ).clone()
-                self.__remove(
+                description_free_forever_item = self.__select(
+                    torrent, description_free_forever_selector.get("selector", "")
+                )
+                description_free_forever_item = self.__remove(
                     description_free_forever_item, description_free_forever_selector
                 )
                 items = self.__attribute_or_text(
@@ -354,16 +366,16 @@ class TorrentSpider(object):
                 )
             if "description_normal" in self.fields:
                 description_normal_selector = self.fields.get("description_normal", {})
-                description_normal_item = torrent(
-                    description_normal_selector.get("selector", "")
-                ).clone()
-                self.__remove(description_normal_item, description_normal_selector)
+                description_normal_item = self.__select(
+                    torrent, description_normal_selector.get("selector", "")
+                )
+                description_normal_item = self.__remove(description_normal_item, description_normal_selector)
                 items = self.__attribute_or_text(
                     description_normal_item, description_normal_selector
                 )
                 description_normal = self.__index(items, description_normal_selector)
                 render_dict.update({"description_normal": description_normal})
-            self.torrents_info["description"] = Template(selector.get("text")).render(
+            self.torrents_info["description"] = self.__template(selector.get("text")).render(
                 fields=render_dict
             )
         self.torrents_info["description"] = self.__filter_text(
@@ -375,8 +387,8 @@ class TorrentSpider(object):
         if "details" not in self.fields:
             return
         selector = self.fields.get("details", {})
-        details = torrent(selector.get("selector", "")).clone()
-        self.__remove(details, selector)
+        details = self.__select(torrent, selector.get("selector", ""))
+        details = self.__remove(details, selector)
         items = self.__attribute_or_text(details, selector)
         item = self.__index(items, selector)
         detail_link = self.__filter_text(item, selector.get("filters"))
@@ -416,8 +428,8 @@ class TorrentSpider(object):
                     f'|{self.referer or ""}#'
                 )
         else:
-            download = torrent(selector.get("selector", "")).clone()
-            self.__remove(download, selector)
+            download = self.__select(torrent, selector.get("selector", ""))
+            download = self.__remove(download, selector)
             items = self.__attribute_or_text(download, selector)
             item = self.__index(items, selector)
             download_link = self.__filter_text(item, selector.get("filters"))
@@ -438,8 +450,8 @@ class TorrentSpider(object):
         if "imdbid" not in self.fields:
             return
         selector = self.fields.get("imdbid", {})
-        imdbid = torrent(selector.get("selector", "")).clone()
-        self.__remove(imdbid, selector)
+        imdbid = self.__select(torrent, selector.get("selector", ""))
+        imdbid = self.__remove(imdbid, selector)
         items = self.__attribute_or_text(imdbid, selector)
         item = self.__index(items, selector)
         self.torrents_info["imdbid"] = item
@@ -452,8 +464,8 @@ class TorrentSpider(object):
         if "size" not in self.fields:
             return
         selector = self.fields.get("size", {})
-        size = torrent(selector.get("selector", selector.get("selectors", ""))).clone()
-        self.__remove(size, selector)
+        size = self.__select(torrent, selector.get("selector", selector.get("selectors", "")))
+        size = self.__remove(size, selector)
         items = self.__attribute_or_text(size, selector)
         item = self.__index(items, selector)
         item = self.__filter_text(item, selector.get("filters"))
@@ -473,8 +485,8 @@ class TorrentSpider(object):
         if "leechers" not in self.fields:
             return
         selector = self.fields.get("leechers", {})
-        leechers = torrent(selector.get("selector", "")).clone()
-        self.__remove(leechers, selector)
+        leechers = self.__select(torrent, selector.get("selector", ""))
+        leechers = self.__remove(leechers, selector)
         items = self.__attribute_or_text(leechers, selector)
         item = self.__index(items, selector)
         if item:
@@ -490,8 +502,8 @@ class TorrentSpider(object):
         if "seeders" not in self.fields:
             return
         selector = self.fields.get("seeders", {})
-        seeders = torrent(selector.get("selector", "")).clone()
-        self.__remove(seeders, selector)
+        seeders = self.__select(torrent, selector.get("selector", ""))
+        seeders = self.__remove(seeders, selector)
         items = self.__attribute_or_text(seeders, selector)
         item = self.__index(items, selector)
         if item:
@@ -507,8 +519,8 @@ class TorrentSpider(object):
         if "grabs" not in self.fields:
             return
         selector = self.fields.get("grabs", {})
-        grabs = torrent(selector.get("selector", "")).clone()
-        self.__remove(grabs, selector)
+        grabs = self.__select(torrent, selector.get("selector", ""))
+        grabs = self.__remove(grabs, selector)
         items = self.__attribute_or_text(grabs, selector)
         item = self.__index(items, selector)
         if item:
@@ -524,8 +536,8 @@ class TorrentSpider(object):
         if "date_added" not in self.fields:
             return
         selector = self.fields.get("date_added", {})
-        pubdate = torrent(selector.get("selector", "")).clone()
-        self.__remove(pubdate, selector)
+        pubdate = self.__select(torrent, selector.get("selector", ""))
+        pubdate = self.__remove(pubdate, selector)
         items = self.__attribute_or_text(pubdate, selector)
         self.torrents_info["pubdate"] = self.__index(items, selector)
         self.torrents_info["pubdate"] = self.__filter_text(
@@ -537,8 +549,8 @@ class TorrentSpider(object):
         if "date_elapsed" not in self.fields:
             return
         selector = self.fields.get("date_elapsed", {})
-        date_elapsed = torrent(selector.get("selector", "")).clone()
-        self.__remove(date_elapsed, selector)
+        date_elapsed = self.__select(torrent, selector.get("selector", ""))
+        date_elapsed = self.__remove(date_elapsed, selector)
         items = self.__attribute_or_text(date_elapsed, selector)
         self.torrents_info["date_elapsed"] = self.__index(items, selector)
         self.torrents_info["date_elapsed"] = self.__filter_text(
@@ -553,15 +565,15 @@ class TorrentSpider(object):
         self.torrents_info["downloadvolumefactor"] = 1
         if "case" in selector:
             for downloadvolumefactorselector in list(selector.get("case", {}).keys()):
-                downloadvolumefactor = torrent(downloadvolumefactorselector)
+                downloadvolumefactor = self.__select(torrent, downloadvolumefactorselector)
                 if len(downloadvolumefactor) > 0:
                     self.torrents_info["downloadvolumefactor"] = selector.get(
                         "case", {}
                     ).get(downloadvolumefactorselector)
                     break
         elif "selector" in selector:
-            downloadvolume = torrent(selector.get("selector", "")).clone()
-            self.__remove(downloadvolume, selector)
+            downloadvolume = self.__select(torrent, selector.get("selector", ""))
+            downloadvolume = self.__remove(downloadvolume, selector)
             items = self.__attribute_or_text(downloadvolume, selector)
             item = self.__index(items, selector)
             if item:
@@ -579,15 +591,15 @@ class TorrentSpider(object):
         self.torrents_info["uploadvolumefactor"] = 1
         if "case" in selector:
             for uploadvolumefactorselector in list(selector.get("case", {}).keys()):
-                uploadvolumefactor = torrent(uploadvolumefactorselector)
+                uploadvolumefactor = self.__select(torrent, uploadvolumefactorselector)
                 if len(uploadvolumefactor) > 0:
                     self.torrents_info["uploadvolumefactor"] = selector.get(
                         "case", {}
                     ).get(uploadvolumefactorselector)
                     break
         elif "selector" in selector:
-            uploadvolume = torrent(selector.get("selector", "")).clone()
-            self.__remove(uploadvolume, selector)
+            uploadvolume = self.__select(torrent, selector.get("selector", ""))
+            uploadvolume = self.__remove(uploadvolume, selector)
             items = self.__attribute_or_text(uploadvolume, selector)
             item = self.__index(items, selector)
             if item:
@@ -602,8 +614,8 @@ class TorrentSpider(object):
         if "labels" not in self.fields:
             return
         selector = self.fields.get("labels", {})
-        labels = torrent(selector.get("selector", "")).clone()
-        self.__remove(labels, selector)
+        labels = self.__select(torrent, selector.get("selector", ""))
+        labels = self.__remove(labels, selector)
         items = self.__attribute_or_text(labels, selector)
         if items:
             self.torrents_info["labels"] = "|".join(items)
@@ -685,15 +697,70 @@ class TorrentSpider(object):
         formatted_str = template.format(*values)
         return formatted_str
 
-    @staticmethod
-    def __remove(item, selector):
+    @classmethod
+    def __get_xpath(cls, selector):
+        """
+        将CSS选择器编译为XPath，与PyQuery的选择结果一致，编译出错时在使用时抛出
+        """
+        xpath = cls._xpath_cache.get(selector)
+        if xpath is None:
+            try:
+                xpath = etree.XPath(cls._translator.css_to_xpath(selector.replace('[@', '['),
+                                                                 prefix='descendant-or-self::'))
+            except Exception as err:
+                xpath = err
+            cls._xpath_cache[selector] = xpath
+        if isinstance(xpath, Exception):
+            raise xpath
+        return xpath
+
+    @classmethod
+    def __select(cls, elements, selector):
+        """
+        在单个或多个元素中按CSS选择器查找元素
+        """
+        xpath = cls.__get_xpath(selector)
+        if not isinstance(elements, list):
+            return xpath(elements)
+        results = []
+        for element in elements:
+            results.extend(xpath(element))
+        return results
+
+    @classmethod
+    def __template(cls, text):
+        """
+        获取编译后的文本模板
+        """
+        template = cls._template_cache.get(text)
+        if template is None:
+            template = Template(text)
+            cls._template_cache[text] = template
+        return template
+
+    @classmethod
+    def __remove(cls, items, selector):
         """
-        移除元素
+        移除元素，只在需要移除时复制元素，不影响原页面
         """
-        if selector and "remove" in selector:
-            removelist = selector.get("remove", "").split(", ")
-            for v in removelist:
-                item.remove(v)
+        if not selector or "remove" not in selector:
+            return items
+        items = [copy.deepcopy(item) for item in items]
+        removelist = selector.get("remove", "").split(", ")
+        for v in removelist:
+            for tag in cls.__select(items, v):
+                parent = tag.getparent()
+                if parent is None:
+                    continue
+                # 保留被移除元素后面的文本
+                if tag.tail:
+                    prev = tag.getprevious()
+                    if prev is None:
+                        parent.text = (parent.text or '') + tag.tail
+                    else:
+                        prev.tail = (prev.tail or '') + tag.tail
+                parent.remove(tag)
+        return items
 
     @staticmethod
     def __attribute_or_text(item, selector):
@@ -702,9 +769,9 @@ class TorrentSpider(object):
         if not item:
             return []
         if "attribute" in selector:
-            items = [i.attr(selector.get("attribute")) for i in item.items() if i]
+            items = [i.get(selector.get("attribute")) for i in item]
         else:
-            items = [i.text() for i in item.items() if i]
+            items = [PyQuery(i).html() if i.tag == 'textarea' else extract_text(i) for i in item]
         return items
 
     @staticmethod
@@ -744,10 +811,11 @@ class TorrentSpider(object):
                 return False, []
 
             for torn in result_list:
-                torn_copy = copy.deepcopy(self.Getinfo(PyQuery(torn)))
-                if not torn_copy['title']:
+                # 每条种子都生成新的字典，无需复制
+                torrent_info = self.Getinfo(torn)
+                if not torrent_info['title']:
                     continue
-                self.torrents_info_array.append(torn_copy)
+                self.torrents_info_array.append(torrent_info)
                 if len(self.torrents_info_array) >= int(self.result_num):
                     break
 
@@ -1,9 +1,14 @@
 # author: https://github.com/jxxghp/MoviePilot/blob/main/app/helper/browser.py
 import os
+import threading
 import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+
 import log
 
-from config import Config
+from app.utils import SiteUtils
+from config import Config, PLAYWRIGHT_MAX_BROWSERS, PLAYWRIGHT_MAX_CONTEXTS, PLAYWRIGHT_IDLE_TIMEOUT
 from typing import Callable, Any
 
 from playwright.sync_api import sync_playwright, Page
@@ -20,9 +25,247 @@ class WaitElement:
         self.state = _state
 
 
+class BrowserPool(object):
+    """
+    常驻浏览器池：
+    Playwright的同步接口只能在创建它的线程中使用，每个浏览器运行在独立的常驻线程中，
+    页面操作排队交由这些线程执行，浏览器数即同时打开的页面数上限；
+    同一站点复用浏览器上下文，使用前检查浏览器连接状态，断开时重新启动，
+    线程空闲超时后关闭浏览器并退出，有新任务时再按需启动
+    """
+
+    def __init__(self,
+                 browser_type="chromium",
+                 max_browsers=PLAYWRIGHT_MAX_BROWSERS,
+                 max_contexts=PLAYWRIGHT_MAX_CONTEXTS,
+                 idle_timeout=PLAYWRIGHT_IDLE_TIMEOUT):
+        """
+        :param browser_type: 浏览器类型
+        :param max_browsers: 最大浏览器数，即同时打开的页面数
+        :param max_contexts: 每个浏览器保留的上下文数
+        :param idle_timeout: 浏览器空闲该时间（秒）后关闭
+        """
+        self._browser_type = browser_type
+        self._max_browsers = max_browsers
+        self._max_contexts = max_contexts
+        self._idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        # 待执行的任务：(Future, 函数, 上下文键, 上下文参数, 是否使用独立上下文)
+        self._queue = deque()
+        self._threads = []
+        self._idle = 0
+        self._serial = 0
+        self._closed = False
+        # 各线程当前打开的浏览器数、上下文数
+        self._browsers = {}
+        self._contexts = {}
+        self._stats = {"launches": 0, "restarts": 0, "created": 0, "reuses": 0, "pages": 0}
+
+    def submit(self, func, url=None, headless=True, ua=None, proxy=None, fresh=False):
+        """
+        提交页面操作
+        :param func: 执行的函数，接收新打开的Page对象，函数返回后页面即关闭
+        :param url: 网页地址，同一站点复用浏览器上下文
+        :param headless: 是否无头模式
+        :param ua: user-agent
+        :param proxy: 代理设置
+        :param fresh: 是否使用独立的上下文，用后即关闭，不带已有的Cookie等状态
+        :return: Future，结果为函数的返回值
+        """
+        future = Future()
+        key = (headless, SiteUtils.get_url_domain(url) if url else "", ua, (proxy or {}).get("server"))
+        options = {"user_agent": ua, "proxy": proxy}
+        with self._cond:
+            self._queue.append((future, func, key, options, fresh))
+            # 排队任务多于空闲线程时才新建，线程总数不超过上限
+            if len(self._queue) > self._idle and len(self._threads) < self._max_browsers:
+                self._serial += 1
+                thread = threading.Thread(target=self.__worker,
+                                          name=f"Playwright-{self._browser_type}-{self._serial}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def get_stats(self):
+        """
+        获取浏览器池状态
+        """
+        with self._cond:
+            return {
+                "threads": len(self._threads),
+                "idle": self._idle,
+                "queued": len(self._queue),
+                "browsers": sum(self._browsers.values()),
+                "contexts": sum(self._contexts.values()),
+                **self._stats
+            }
+
+    def shutdown(self, timeout=30):
+        """
+        关闭浏览器池，已排队的任务执行完后关闭所有浏览器，之后提交任务时重新启动
+        """
+        with self._cond:
+            self._closed = True
+            threads = list(self._threads)
+            self._cond.notify_all()
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        with self._cond:
+            self._closed = False
+
+    def __count(self, name, value=1):
+        with self._cond:
+            self._stats[name] += value
+
+    @staticmethod
+    def __close(obj):
+        try:
+            obj.close()
+        except Exception as err:
+            log.debug(f"【Playwright】关闭失败：{str(err)}")
+
+    def __get_context(self, playwright, browsers, contexts, key, options, fresh):
+        """
+        取得浏览器上下文，浏览器不可用时重新启动，同一站点复用上下文
+        """
+        headless = key[0]
+        browser = browsers.get(headless)
+        # 健康检查：浏览器进程退出或连接断开时重新启动，原有上下文随之失效
+        if browser and not browser.is_connected():
+            log.warn("【Playwright】浏览器连接已断开，重新启动")
+            browsers.pop(headless)
+            for ckey in [ckey for ckey in contexts if ckey[0] == headless]:
+                contexts.pop(ckey)
+            self.__count("restarts")
+            browser = None
+        if not browser:
+            browser = playwright[self._browser_type].launch(headless=headless)
+            browsers[headless] = browser
+            self.__count("launches")
+        if fresh:
+            self.__count("created")
+            return browser.new_context(**options)
+        context = contexts.get(key)
+        if context:
+            contexts.move_to_end(key)
+            self.__count("reuses")
+            return context
+        context = browser.new_context(**options)
+        contexts[key] = context
+        self.__count("created")
+        # 关闭最久未使用的上下文
+        while len(contexts) > self._max_contexts:
+            self.__close(contexts.popitem(last=False)[1])
+        return context
+
+    def __worker(self):
+        thread = threading.current_thread()
+        playwright = None
+        browsers = {}
+        contexts = OrderedDict()
+        try:
+            while True:
+                with self._cond:
+                    deadline = time.time() + self._idle_timeout
+                    while not self._queue and not self._closed:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self._idle += 1
+                        self._cond.wait(remaining)
+                        self._idle -= 1
+                    # 空闲超时或浏览器池关闭，退出线程并关闭浏览器
+                    if not self._queue:
+                        self._threads.remove(thread)
+                        return
+                    future, func, key, options, fresh = self._queue.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                context = None
+                page = None
+                try:
+                    if not playwright:
+                        playwright = sync_playwright().start()
+                    context = self.__get_context(playwright, browsers, contexts, key, options, fresh)
+                    page = context.new_page()
+                    self.__count("pages")
+                    future.set_result(func(page))
+                except BaseException as err:
+                    # 出错后上下文可能已不可用，不再复用
+                    if not fresh and contexts.get(key) is context:
+                        contexts.pop(key, None)
+                        if context:
+                            self.__close(context)
+                    future.set_exception(err)
+                finally:
+                    if page:
+                        self.__close(page)
+                    if fresh and context:
+                        self.__close(context)
+                    with self._cond:
+                        self._browsers[thread.name] = len(browsers)
+                        self._contexts[thread.name] = len(contexts)
+        finally:
+            with self._cond:
+                if thread in self._threads:
+                    self._threads.remove(thread)
+                self._browsers.pop(thread.name, None)
+                self._contexts.pop(thread.name, None)
+            for context in contexts.values():
+                self.__close(context)
+            for browser in browsers.values():
+                self.__close(browser)
+            if playwright:
+                try:
+                    playwright.stop()
+                except Exception as err:
+                    log.debug(f"【Playwright】关闭失败：{str(err)}")
+
+
 class PlaywrightHelper:
-    def __init__(self, browser_type="chromium"):
+    # 各浏览器类型共用的浏览器池
+    _pools = {}
+    _lock = threading.Lock()
+
+    def __init__(self, browser_type="chromium", pool: BrowserPool = None):
+        """
+        :param browser_type: 浏览器类型
+        :param pool: 使用的浏览器池，为空时使用该浏览器类型共用的浏览器池
+        """
         self.browser_type = browser_type
+        self._pool = pool
+
+    def __get_pool(self) -> BrowserPool:
+        if self._pool:
+            return self._pool
+        with PlaywrightHelper._lock:
+            pool = PlaywrightHelper._pools.get(self.browser_type)
+            if not pool:
+                pool = BrowserPool(browser_type=self.browser_type)
+                PlaywrightHelper._pools[self.browser_type] = pool
+            return pool
+
+    @staticmethod
+    def get_pool_stats():
+        """
+        获取各浏览器池的状态
+        """
+        with PlaywrightHelper._lock:
+            pools = dict(PlaywrightHelper._pools)
+        return {browser_type: pool.get_stats() for browser_type, pool in pools.items()}
+
+    @staticmethod
+    def stop_service():
+        """
+        关闭所有常驻浏览器
+        """
+        with PlaywrightHelper._lock:
+            pools = list(PlaywrightHelper._pools.values())
+        for pool in pools:
+            pool.shutdown()
 
     @staticmethod
     def __pass_cloudflare(url: str, page: Page) -> bool:
@@ -57,29 +300,30 @@ class PlaywrightHelper:
                 'server': Config().get_proxies().get('http')
             } if proxy else None
 
-            with sync_playwright() as playwright:
-                browser = playwright[self.browser_type].launch(headless=headless)
-                context = browser.new_context(user_agent=ua, proxy=proxies)
-                page = context.new_page()
+            # 出错时异常交由浏览器池处理，不再复用该站点的上下文
+            def __action(page: Page):
                 if cookies:
-                    page.set_extra_http_headers({"cookie": cookies}) 
-                try:
-                    if not self.__pass_cloudflare(url, page):
-                        log.warn("cloudflare challenge fail !")
-
-                    # 等待页面自动跳转
-                    if wait_item and wait_item.element and wait_item.state:
-                        page.wait_for_selector(wait_item.element, state=wait_item.state, timeout=timeout * 3000)
-                    
-                    # 等待网络空闲，即没有HTTP请求正在进行
-                    page.wait_for_load_state("networkidle", timeout=timeout * 1000)
-
-                    # 回调函数
-                    return callback(page)
-                except Exception as e:
-                    log.error(f"网页操作失败: {str(e)}")
-                finally:
-                    browser.close()
+                    page.set_extra_http_headers({"cookie": cookies})
+                if not self.__pass_cloudflare(url, page):
+                    log.warn("cloudflare challenge fail !")
+
+                # 等待页面自动跳转
+                if wait_item and wait_item.element and wait_item.state:
+                    page.wait_for_selector(wait_item.element, state=wait_item.state, timeout=timeout * 3000)
+
+                # 等待网络空闲，即没有HTTP请求正在进行
+                page.wait_for_load_state("networkidle", timeout=timeout * 1000)
+
+                # 回调函数
+                return callback(page)
+
+            # 未带Cookie的多为登录等操作，使用独立的上下文，避免带上之前的登录状态
+            return self.__get_pool().submit(__action,
+                                            url=url,
+                                            headless=headless,
+                                            ua=ua,
+                                            proxy=proxies,
+                                            fresh=not cookies).result()
         except Exception as e:
             log.error(f"网页操作失败: {str(e)}")
         return None
@@ -107,30 +351,30 @@ class PlaywrightHelper:
             proxies={
                 'server': Config().get_proxies().get('http')
             } if proxy else None
-            with sync_playwright() as playwright:
-                browser = playwright[self.browser_type].launch(headless=headless)
-                context = browser.new_context(user_agent=ua, proxy=proxies)
-                page = context.new_page()
+
+            # 出错时异常交由浏览器池处理，不再复用该站点的上下文
+            def __get_source(page: Page):
                 if cookies:
-                    page.set_extra_http_headers({"cookie": cookies}) 
-                try:
-                    log.info(f'[Playwright]开始访问{url}')
-                    if not self.__pass_cloudflare(url, page):
-                        log.warn("cloudflare challenge fail !")
+                    page.set_extra_http_headers({"cookie": cookies})
+                log.info(f'[Playwright]开始访问{url}')
+                if not self.__pass_cloudflare(url, page):
+                    log.warn("cloudflare challenge fail !")
 
-                    # 等待页面自动跳转
-                    if wait_item and wait_item.element and wait_item.state:
-                        page.wait_for_selector(wait_item.element, state=wait_item.state, timeout=timeout * 1000)
+                # 等待页面自动跳转
+                if wait_item and wait_item.element and wait_item.state:
+                    page.wait_for_selector(wait_item.element, state=wait_item.state, timeout=timeout * 1000)
 
-                    page.wait_for_load_state("networkidle", timeout=timeout * 1000)
-                    source = page.content()
-                except Exception as e:
-                    log.error(f"获取网页源码失败: {str(e)} {page.content() if page else ''}")
-                    source = None
-                finally:
-                    browser.close()
+                page.wait_for_load_state("networkidle", timeout=timeout * 1000)
+                return page.content()
+
+            source = self.__get_pool().submit(__get_source,
+                                              url=url,
+                                              headless=headless,
+                                              ua=ua,
+                                              proxy=proxies).result()
         except Exception as e:
             log.error(f"获取网页源码失败: {str(e)}")
+            source = None
         return source
     
 
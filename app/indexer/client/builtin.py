@@ -1,4 +1,7 @@
 import datetime
+import re
+import threading
+import time
 import traceback
 from typing import List
 
@@ -8,13 +11,16 @@ from app.conf import SystemConfig
 from app.helper import ProgressHelper, DbHelper
 from app.indexer.client._base import _IIndexClient
 from app.indexer.client import Rarbg, TorrentSpider, TNodeSpider, TorrentLeech, InterfaceSpider, MTorrentSpider
+from app.indexer.indexer_health import IndexerHealth
 from app.indexer.manager import IndexerManager, IndexerConf
 from app.media.meta.metainfo import MetaInfo
 from app.sites import Sites
-from app.utils import StringUtils
+from app.utils import StringUtils, IndexerResultCache
 from app.utils.types import SearchType, IndexerType, ProgressKey, SystemConfigKey
 
-from config import Config
+from config import Config, INDEXER_RESULT_CACHE_TTL
+
+lock = threading.Lock()
 
 
 class BuiltinIndexer(_IIndexClient):
@@ -31,6 +37,10 @@ class BuiltinIndexer(_IIndexClient):
     progress = None
     sites = None
     dbhelper = None
+    # 各站点搜索结果缓存的命中统计
+    _cache_stats = {}
+    # 各站点的耗时及熔断状态，重新加载配置时保留
+    _health = IndexerHealth()
 
     def __init__(self, config=None):
         super().__init__()
@@ -111,16 +121,14 @@ class BuiltinIndexer(_IIndexClient):
                key_word,
                filter_args: dict,
                match_media,
-               in_from: SearchType) -> List[MetaInfo]:
+               in_from: SearchType,
+               use_cache=True) -> List[MetaInfo]:
         """
         根据关键字多线程搜索
+        :param use_cache: 是否使用站点原始搜索结果的缓存，为False时强制请求站点
         """
         if not indexer or not key_word:
             return None
-        # 站点流控
-        if self.sites.check_ratelimit(indexer.siteid):
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 触发站点流控，跳过 ...")
-            return []
         # fix 共用同一个dict时会导致某个站点的更新全局全效
         if filter_args is None:
             filter_args = {}
@@ -128,21 +136,61 @@ class BuiltinIndexer(_IIndexClient):
         # 不在设定搜索范围的站点过滤掉
         if filter_args.get("site") and indexer.name not in filter_args.get("site"):
             return []
+        # 特殊符号处理
+        search_word = StringUtils.handler_special_chars(text=key_word, replace_word=" ", allow_space=True)
+        mtype = match_media.type if match_media and match_media.tmdb_info else None
+        # 原始结果缓存，命中时不请求站点，识别和过滤仍按本次条件重新执行
+        cache_key = self.__get_cache_key(indexer, search_word, mtype)
+        cache_results = IndexerResultCache.get(cache_key) if use_cache else None
+        if use_cache:
+            self.__update_cache_stats(indexer.name, hit=cache_results is not None)
+        # 站点流控
+        if cache_results is None and self.sites.check_ratelimit(indexer.siteid):
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 触发站点流控，跳过 ...")
+            return []
+        # 站点熔断
+        if cache_results is None and not self._health.allow(indexer.name):
+            log.info(f"【{self.client_name}】{indexer.name} 连续失败已熔断，跳过 ...")
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 连续失败已熔断，跳过 ...")
+            return []
         # 搜索条件没有过滤规则时，使用站点的过滤规则
         if not filter_args.get("rule") and indexer.rule:
             filter_args.update({"rule": indexer.rule})
         # 计算耗时
         start_time = datetime.datetime.now()
 
-        log.info(f"【{self.client_name}】开始搜索Indexer：{indexer.name} ...")
-        # 特殊符号处理
-        search_word = StringUtils.handler_special_chars(text=key_word, replace_word=" ", allow_space=True)
+        if cache_results is not None:
+            log.info(f"【{self.client_name}】{indexer.name} 命中搜索结果缓存：{search_word}")
+            result_array = list(cache_results)
+        else:
+            result_array = self.__search_indexer(indexer, search_word, match_media, mtype, cache_key, start_time)
+        # 返回结果
+        if len(result_array) == 0:
+            log.warn(f"【{self.client_name}】{indexer.name} 未搜索到数据")
+            # 更新进度
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 未搜索到数据")
+            return []
+        else:
+            log.warn(f"【{self.client_name}】{indexer.name} 返回数据：{len(result_array)}")
+            # 更新进度
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 返回 {len(result_array)} 条数据")
+            # 过滤
+            return self.filter_search_results(result_array=result_array,
+                                              order_seq=order_seq,
+                                              indexer=indexer,
+                                              filter_args=filter_args,
+                                              match_media=match_media,
+                                              start_time=start_time)
 
+    def __search_indexer(self, indexer: IndexerConf, search_word, match_media, mtype, cache_key, start_time):
+        """
+        请求站点搜索，成功的结果写入缓存
+        """
+        log.info(f"【{self.client_name}】开始搜索Indexer：{indexer.name} ...")
         # 开始索引
         result_array = []
+        request_start = time.time()
         try:
-            mtype = match_media.type if match_media and match_media.tmdb_info else None
-
             if indexer.parser == "TNodeSpider":
                 error_flag, result_array = TNodeSpider(indexer).search(keyword=search_word)
             elif indexer.parser == "RarBg":
@@ -153,12 +201,18 @@ class BuiltinIndexer(_IIndexClient):
             elif indexer.parser == "InterfaceSpider":
                 error_flag, result_array = InterfaceSpider(indexer).search(keyword=search_word, mtype=mtype)
             elif indexer.parser == "MTorrentSpider":
+                # 按站点最近的耗时自适应超时时间
+                indexer.timeout = self._health.get_timeout(indexer.name, indexer.timeout)
                 error_flag, result_array = MTorrentSpider(indexer).search(keyword=search_word, mtype=mtype)
             else:
-                error_flag, result_array = TorrentSpider(indexer).search_torrents(keyword=search_word, mtype=mtype)
+                spider = TorrentSpider(indexer)
+                spider.timeout = self._health.get_timeout(indexer.name, spider.timeout)
+                error_flag, result_array = spider.search_torrents(keyword=search_word, mtype=mtype)
         except Exception as err:
             log.error("【%s】%s搜索执行出错: %s - %s" % (self.client_name, indexer.name, str(err), traceback.format_exc()))
             error_flag = True
+        # 记录耗时及成功失败，用于自适应超时和熔断
+        self._health.record(indexer.name, time.time() - request_start, success=not error_flag)
 
         # 索引花费的时间
         seconds = round((datetime.datetime.now() - start_time).seconds, 1)
@@ -167,20 +221,40 @@ class BuiltinIndexer(_IIndexClient):
                                                 itype=self.client_id,
                                                 seconds=seconds,
                                                 result='N' if error_flag else 'Y')
-        # 返回结果
-        if len(result_array) == 0:
-            log.warn(f"【{self.client_name}】{indexer.name} 未搜索到数据")
-            # 更新进度
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 未搜索到数据")
-            return []
-        else:
-            log.warn(f"【{self.client_name}】{indexer.name} 返回数据：{len(result_array)}")
-            # 更新进度
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 返回 {len(result_array)} 条数据")
-            # 过滤
-            return self.filter_search_results(result_array=result_array,
-                                              order_seq=order_seq,
-                                              indexer=indexer,
-                                              filter_args=filter_args,
-                                              match_media=match_media,
-                                              start_time=start_time)
+        # 出错的结果不缓存
+        if not error_flag:
+            IndexerResultCache.set(cache_key, tuple(result_array or []), ttl=INDEXER_RESULT_CACHE_TTL)
+        return result_array or []
+
+    @staticmethod
+    def __get_cache_key(indexer: IndexerConf, search_word, mtype, page=0):
+        """
+        搜索结果缓存的键：站点、规范化的关键字、页码、媒体类型
+        """
+        keyword = re.sub(r"\s+", " ", str(search_word)).strip().lower()
+        return indexer.id, keyword, page, mtype.value if mtype else None
+
+    @classmethod
+    def __update_cache_stats(cls, name, hit):
+        with lock:
+            stats = cls._cache_stats.setdefault(name, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+
+    @classmethod
+    def get_health_stats(cls):
+        """
+        获取各站点的耗时及熔断状态
+        """
+        return cls._health.get_stats()
+
+    @classmethod
+    def get_cache_stats(cls):
+        """
+        获取各站点搜索结果缓存的命中统计
+        :return: {站点名称: {"hits": 命中数, "misses": 未命中数, "hit_rate": 命中率%}}
+        """
+        with lock:
+            return {name: {"hits": stats.get("hits"),
+                           "misses": stats.get("misses"),
+                           "hit_rate": round(100 * stats.get("hits") / (stats.get("hits") + stats.get("misses")), 1)}
+                    for name, stats in cls._cache_stats.items()}
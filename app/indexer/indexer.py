@@ -1,10 +1,12 @@
 import copy
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import as_completed
 from typing import List
 
 import log
 from app.helper import ProgressHelper, SubmoduleHelper, DbHelper
+from app.indexer.search_pool import SearchPool
 from app.media import Media
 from app.media.meta.metainfo import MetaInfo
 from app.utils import ExceptionUtils, StringUtils
@@ -20,6 +22,7 @@ class Indexer(object):
     _client_type = None
     progress = None
     dbhelper = None
+    searchpool = None
 
     def __init__(self):
         self._indexer_schemas = SubmoduleHelper.import_submodules(
@@ -27,6 +30,8 @@ class Indexer(object):
             filter_func=lambda _, obj: hasattr(obj, 'client_id')
         )
         log.debug(f"【Indexer】加载索引器：{self._indexer_schemas}")
+        # 搜索线程池常驻，重新加载配置时不重建
+        self.searchpool = SearchPool()
         self.init_config()
 
     def init_config(self):
@@ -112,7 +117,9 @@ class Indexer(object):
                           key_word: [str, list],
                           filter_args: dict,
                           match_media=None,
-                          in_from: SearchType = None) -> List[MetaInfo]:
+                          in_from: SearchType = None,
+                          callback=None,
+                          use_cache=True) -> List[MetaInfo]:
         """
         根据关键字调用 Index API 搜索
         :param key_word: 搜索的关键字，不能为空
@@ -121,6 +128,8 @@ class Indexer(object):
                             sp_state: 为UL DL，* 代表不关心，
         :param match_media: 需要匹配的媒体信息
         :param in_from: 搜索渠道
+        :param callback: 每个站点搜索完成后立即回调，参数为：站点名称、该站点已识别过滤的结果、耗时（秒）
+        :param use_cache: 是否使用站点原始搜索结果的缓存，为False时强制请求所有站点
         :return: 命中的资源媒体信息列表
         """
         if not key_word:
@@ -148,11 +157,23 @@ class Indexer(object):
             self.progress.update(ptype=ProgressKey.Search,
                                  text="开始搜索 %s，站点：%s ..." % (key_word, filter_args.get("site")))
         else:
-            log.info(f"【{self._client_type.value}】开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
+            log.info(f"【{self._client_type.value}】开始并行搜索 %s，站点数：%s ..." % (key_word, len(indexers)))
             self.progress.update(ptype=ProgressKey.Search,
-                                 text="开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
-        # 多线程
-        executor = ThreadPoolExecutor(max_workers=len(indexers))
+                                 text="开始并行搜索 %s，站点数：%s ..." % (key_word, len(indexers)))
+        # 提交到共用的搜索线程池，按站点限制并发
+        interactive = SearchPool.is_interactive(in_from)
+
+        def __search(_order_seq, _indexer, _key_word, _filter_args):
+            _start = time.time()
+            _result = self._client.search(_order_seq, _indexer, _key_word, _filter_args, match_media, in_from,
+                                          use_cache=use_cache)
+            return _indexer.name, _result, round(time.time() - _start, 3)
+
+        def __submit(_order_seq, _indexer, _key_word, _filter_args):
+            return self.searchpool.submit(_indexer.name, __search,
+                                          _order_seq, _indexer, _key_word, _filter_args,
+                                          interactive=interactive)
+
         all_task = []
         for indexer in indexers:
             order_seq = 100 - int(indexer.pri)
@@ -160,7 +181,7 @@ class Indexer(object):
             # 原始标题检索
             if 'title' == indexer.search_type and key_word:
                 _filter_args = copy.deepcopy(filter_args) if filter_args is not None else {}
-                task = executor.submit(self._client.search, order_seq, indexer, key_word, _filter_args, match_media, in_from)
+                task = __submit(order_seq, indexer, key_word, _filter_args)
                 all_task.append(task)
 
             # 其他搜索类型都需要 match_media 不为空
@@ -170,13 +191,13 @@ class Indexer(object):
             # 豆瓣id检索
             if 'douban_id' == indexer.search_type and match_media.douban_id:
                 for db_id in StringUtils.split_and_filter(match_media.douban_id, ","):
-                    task = executor.submit(self._client.search, order_seq, indexer, db_id, copy.deepcopy(filter_args), match_media, in_from)
+                    task = __submit(order_seq, indexer, db_id, copy.deepcopy(filter_args))
                     all_task.append(task)
                         
 
             # imdb id 检索
             if 'imdb' == indexer.search_type and match_media.imdb_id:
-                task = executor.submit(self._client.search, order_seq, indexer, match_media.imdb_id, copy.deepcopy(filter_args), match_media, in_from)
+                task = __submit(order_seq, indexer, match_media.imdb_id, copy.deepcopy(filter_args))
                 all_task.append(task)
 
             # 英文名检索
@@ -184,22 +205,35 @@ class Indexer(object):
                 en_name = self.get_en_name(match_media)
                 if en_name:
                     _filter_args_en = copy.deepcopy(filter_args) if filter_args is not None else {}
-                    task = executor.submit(self._client.search, order_seq, indexer, en_name, _filter_args_en, match_media, in_from)
+                    task = __submit(order_seq, indexer, en_name, _filter_args_en)
                     all_task.append(task)
 
         ret_array = []
         finish_count = 0
+        # 各站点耗时及结果数，同一站点有多个搜索任务时取最长耗时
+        site_timings = {}
         for future in as_completed(all_task):
-            result = future.result()
+            site, result, seconds = future.result()
             finish_count += 1
             self.progress.update(ptype=ProgressKey.Search,
                                  value=round(100 * (finish_count / len(all_task))))
+            timing = site_timings.setdefault(site, {"count": 0, "seconds": 0})
+            timing["count"] += len(result or [])
+            timing["seconds"] = max(timing["seconds"], seconds)
             if result:
                 ret_array = ret_array + result
+            if callback:
+                try:
+                    callback(site, result or [], seconds)
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
         # 计算耗时
         end_time = datetime.datetime.now()
         log.info(f"【{self._client_type.value}】所有站点搜索完成，有效资源数：%s，总耗时 %s 秒"
                  % (len(ret_array), (end_time - start_time).seconds))
+        log.info(f"【{self._client_type.value}】各站点耗时：%s" % "，".join(
+            "%s %s秒/%s条" % (site, timing.get("seconds"), timing.get("count"))
+            for site, timing in sorted(site_timings.items(), key=lambda x: x[1].get("seconds"), reverse=True)))
         self.progress.update(ptype=ProgressKey.Search,
                              text="所有站点搜索完成，有效资源数：%s，总耗时 %s 秒"
                                   % (len(ret_array), (end_time - start_time).seconds),
@@ -220,3 +254,25 @@ class Indexer(object):
         获取索引器统计信息
         """
         return self.dbhelper.get_indexer_statistics()
+
+    def get_health_stats(self):
+        """
+        获取各站点的耗时及熔断状态
+        """
+        if not self._client or not hasattr(self._client, "get_health_stats"):
+            return {}
+        return self._client.get_health_stats()
+
+    def get_search_pool_stats(self):
+        """
+        获取搜索线程池的状态
+        """
+        return self.searchpool.get_stats()
+
+    def get_search_cache_stats(self):
+        """
+        获取各站点搜索结果缓存的命中统计
+        """
+        if not self._client or not hasattr(self._client, "get_cache_stats"):
+            return {}
+        return self._client.get_cache_stats()
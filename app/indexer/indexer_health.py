@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from collections import deque
+
+import log
+from config import INDEXER_LATENCY_WINDOW, INDEXER_TIMEOUT_FACTOR, INDEXER_MIN_TIMEOUT, \
+    INDEXER_BREAKER_FAILURES, INDEXER_BREAKER_COOLDOWN, INDEXER_BREAKER_MAX_COOLDOWN
+
+# 熔断状态：正常、熔断、探测中
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class IndexerHealth(object):
+    """
+    索引站点健康状态：
+    按站点记录最近成功请求的耗时，以P95计算自适应超时时间；
+    连续失败达到阈值后熔断，冷却时间过后放行一次探测请求，探测成功则恢复，失败则冷却时间加倍
+    """
+
+    def __init__(self,
+                 window=INDEXER_LATENCY_WINDOW,
+                 factor=INDEXER_TIMEOUT_FACTOR,
+                 min_timeout=INDEXER_MIN_TIMEOUT,
+                 failures=INDEXER_BREAKER_FAILURES,
+                 cooldown=INDEXER_BREAKER_COOLDOWN,
+                 max_cooldown=INDEXER_BREAKER_MAX_COOLDOWN,
+                 timer=time.time):
+        """
+        :param window: 保留的最近请求耗时数
+        :param factor: 超时时间为P95耗时的倍数
+        :param min_timeout: 超时时间下限（秒）
+        :param failures: 连续失败多少次后熔断
+        :param cooldown: 熔断冷却时间（秒）
+        :param max_cooldown: 冷却时间上限（秒）
+        :param timer: 计时函数
+        """
+        self._window = window
+        self._factor = factor
+        self._min_timeout = min_timeout
+        self._failures = failures
+        self._cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def __get_site(self, name):
+        site = self._sites.get(name)
+        if not site:
+            site = {
+                "latencies": deque(maxlen=self._window),
+                "failures": 0,
+                "state": BREAKER_CLOSED,
+                "open_until": 0,
+                "cooldown": self._cooldown
+            }
+            self._sites[name] = site
+        return site
+
+    def allow(self, name):
+        """
+        判断站点是否可以请求，熔断冷却结束后只放行一次探测请求
+        """
+        with self._lock:
+            site = self.__get_site(name)
+            if site.get("state") == BREAKER_CLOSED:
+                return True
+            if site.get("state") == BREAKER_OPEN and self._timer() >= site.get("open_until"):
+                site["state"] = BREAKER_HALF_OPEN
+                log.info(f"【Indexer】{name} 熔断冷却结束，开始探测 ...")
+                return True
+            return False
+
+    def get_timeout(self, name, default):
+        """
+        获取站点的自适应超时时间，样本不足或探测请求时使用默认超时时间
+        :param name: 站点名称
+        :param default: 站点默认超时时间（秒），也是自适应超时时间的上限
+        """
+        with self._lock:
+            site = self.__get_site(name)
+            latencies = sorted(site.get("latencies"))
+            if site.get("state") != BREAKER_CLOSED or len(latencies) < 5:
+                return default
+            p95 = latencies[math.ceil(len(latencies) * 0.95) - 1]
+            return min(default, max(self._min_timeout, math.ceil(p95 * self._factor)))
+
+    def record(self, name, seconds, success):
+        """
+        记录一次请求结果
+        :param name: 站点名称
+        :param seconds: 耗时（秒）
+        :param success: 是否成功
+        """
+        with self._lock:
+            site = self.__get_site(name)
+            if success:
+                site["latencies"].append(seconds)
+                if site.get("state") != BREAKER_CLOSED:
+                    log.info(f"【Indexer】{name} 探测成功，恢复搜索")
+                site.update({"failures": 0, "state": BREAKER_CLOSED, "cooldown": self._cooldown})
+                return
+            site["failures"] += 1
+            if site.get("state") == BREAKER_HALF_OPEN:
+                # 探测失败，冷却时间加倍
+                site["cooldown"] = min(site.get("cooldown") * 2, self._max_cooldown)
+            elif site.get("state") == BREAKER_OPEN or site.get("failures") < self._failures:
+                return
+            site["state"] = BREAKER_OPEN
+            site["open_until"] = self._timer() + site.get("cooldown")
+            log.warn(f"【Indexer】{name} 连续失败 {site.get('failures')} 次，熔断 {site.get('cooldown')} 秒")
+
+    def get_stats(self):
+        """
+        获取各站点的健康状态
+        :return: {站点名称: {"state": 熔断状态, "failures": 连续失败次数, "p95": 耗时P95, "retry": 剩余冷却秒数}}
+        """
+        with self._lock:
+            now = self._timer()
+            stats = {}
+            for name, site in self._sites.items():
+                latencies = sorted(site.get("latencies"))
+                stats[name] = {
+                    "state": site.get("state"),
+                    "failures": site.get("failures"),
+                    "p95": round(latencies[math.ceil(len(latencies) * 0.95) - 1], 1) if latencies else None,
+                    "retry": max(0, round(site.get("open_until") - now)) if site.get("state") == BREAKER_OPEN else 0
+                }
+            return stats
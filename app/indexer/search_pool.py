@@ -0,0 +1,124 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from app.utils.types import SearchType
+from config import INDEXER_SEARCH_MAX_WORKERS, INDEXER_SITE_MAX_CONCURRENCY, INDEXER_INTERACTIVE_WEIGHT
+
+# 后台发起的搜索，其余渠道均视为交互式搜索
+BACKGROUND_SEARCH_TYPES = [SearchType.RSS, SearchType.USERRSS, SearchType.DB, SearchType.PLUGIN]
+
+
+class SearchPool(object):
+    """
+    索引器搜索共用的线程池：
+    线程数全局限制，同一站点同时执行的搜索数限制，
+    交互式搜索与后台搜索分别排队，按权重轮流取任务，后台搜索不会被饿死
+    """
+
+    def __init__(self,
+                 max_workers=INDEXER_SEARCH_MAX_WORKERS,
+                 site_limit=INDEXER_SITE_MAX_CONCURRENCY,
+                 interactive_weight=INDEXER_INTERACTIVE_WEIGHT):
+        """
+        :param max_workers: 最大线程数
+        :param site_limit: 同一站点同时执行的搜索数
+        :param interactive_weight: 每执行该数量的交互式搜索后优先执行一个后台搜索
+        """
+        self._max_workers = max_workers
+        self._site_limit = site_limit
+        self._interactive_weight = interactive_weight
+        self._cond = threading.Condition()
+        # 待执行的任务：(站点, Future, 函数, 参数)
+        self._queues = {"interactive": deque(), "background": deque()}
+        # 各站点正在执行的任务数
+        self._site_running = {}
+        self._threads = []
+        self._idle = 0
+        # 取任务的轮次，用于交互式与后台搜索的加权轮转
+        self._turn = 0
+
+    @staticmethod
+    def is_interactive(in_from: SearchType):
+        """
+        判断搜索渠道是否为交互式搜索
+        """
+        return in_from not in BACKGROUND_SEARCH_TYPES
+
+    def submit(self, site, func, *args, interactive=True):
+        """
+        提交搜索任务
+        :param site: 站点名称，用于限制同一站点的并发数
+        :param func: 执行的函数
+        :param args: 函数参数
+        :param interactive: 是否交互式搜索
+        :return: Future，可配合as_completed使用
+        """
+        future = Future()
+        with self._cond:
+            self._queues["interactive" if interactive else "background"].append((site, future, func, args))
+            # 排队任务多于空闲线程时才新建，线程总数不超过上限
+            if self.__queued() > self._idle and len(self._threads) < self._max_workers:
+                thread = threading.Thread(target=self.__worker,
+                                          name=f"IndexerSearch-{len(self._threads) + 1}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def get_stats(self):
+        """
+        获取线程池状态
+        """
+        with self._cond:
+            return {
+                "threads": len(self._threads),
+                "idle": self._idle,
+                "interactive": len(self._queues.get("interactive")),
+                "background": len(self._queues.get("background")),
+                "running": {site: count for site, count in self._site_running.items() if count}
+            }
+
+    def __queued(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def __pick(self):
+        """
+        按权重轮流从交互式、后台队列中取出第一个站点未达并发上限的任务
+        """
+        if self._turn % (self._interactive_weight + 1) == self._interactive_weight:
+            order = ("background", "interactive")
+        else:
+            order = ("interactive", "background")
+        for name in order:
+            queue = self._queues.get(name)
+            for i, task in enumerate(queue):
+                if self._site_running.get(task[0], 0) < self._site_limit:
+                    del queue[i]
+                    self._turn += 1
+                    return task
+        return None
+
+    def __worker(self):
+        while True:
+            with self._cond:
+                task = self.__pick()
+                while task is None:
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    task = self.__pick()
+                site, future, func, args = task
+                self._site_running[site] = self._site_running.get(site, 0) + 1
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func(*args))
+                    except BaseException as err:
+                        future.set_exception(err)
+            finally:
+                with self._cond:
+                    self._site_running[site] -= 1
+                    # 站点并发数释放后，其它线程可能可以取到该站点的任务
+                    self._cond.notify_all()
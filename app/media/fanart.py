@@ -1,5 +1,4 @@
-from functools import lru_cache
-
+from app.helper.fanart_helper import FanartHelper
 from app.utils import RequestUtils, ExceptionUtils
 from app.utils.types import MediaType
 from config import Config, FANART_MOVIE_API_URL, FANART_TV_API_URL
@@ -25,49 +24,58 @@ class Fanart:
     _season_types = ['seasonposter',
                      'seasonthumb',
                      'seasonbanner']
-    _images = {}
-
-    def __init__(self):
-        self.init_config()
-
-    def init_config(self):
-        self._images = {}
 
     def __get_fanart_images(self, media_type, queryid):
+        """
+        获取按图片类型索引的图片地址，优先从缓存中读取
+        """
         if not media_type or not queryid:
-            return
+            return {}
+        images = FanartHelper().get_images(media_type=media_type, queryid=queryid)
+        if images is not None:
+            return images
         try:
             ret = self.__request_fanart(media_type=media_type, queryid=queryid)
-            if ret and ret.status_code == 200:
-                if media_type == MediaType.MOVIE:
-                    for image_type in self._movie_image_types:
-                        images = ret.json().get(image_type)
-                        if isinstance(images, list):
-                            self._images[image_type] = images[0].get('url') if isinstance(images[0], dict) else ""
-                        else:
-                            self._images[image_type] = ""
-                else:
-                    for image_type in self._tv_image_types:
-                        images = ret.json().get(image_type)
-                        if isinstance(images, list):
-                            if image_type in self._season_types:
-                                if not self._images.get(image_type):
-                                    self._images[image_type] = {}
-                                for image in images:
-                                    if image.get("season") not in self._images[image_type].keys():
-                                        self._images[image_type][image.get("season")] = image.get("url")
-                            else:
-                                self._images[image_type] = images[0].get('url') if isinstance(images[0], dict) else ""
-                        else:
-                            if image_type in self._season_types:
-                                self._images[image_type] = {}
-                            else:
-                                self._images[image_type] = ""
+            if ret is None or ret.status_code not in [200, 404]:
+                return {}
+            images = self.__index_images(media_type=media_type,
+                                         data=ret.json() if ret.status_code == 200 else {})
+            FanartHelper().update_images(media_type=media_type, queryid=queryid, images=images)
+            return images
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
+        return {}
+
+    def __index_images(self, media_type, data):
+        """
+        将Fanart返回的数据解析为 图片类型->地址 的索引，季图片为 季->地址
+        """
+        images = {}
+        if not isinstance(data, dict):
+            return images
+        if media_type == MediaType.MOVIE:
+            for image_type in self._movie_image_types:
+                items = data.get(image_type)
+                if isinstance(items, list):
+                    images[image_type] = items[0].get('url') if isinstance(items[0], dict) else ""
+                else:
+                    images[image_type] = ""
+        else:
+            for image_type in self._tv_image_types:
+                items = data.get(image_type)
+                if image_type in self._season_types:
+                    images[image_type] = {}
+                    if isinstance(items, list):
+                        for image in items:
+                            if image.get("season") not in images[image_type].keys():
+                                images[image_type][image.get("season")] = image.get("url")
+                elif isinstance(items, list):
+                    images[image_type] = items[0].get('url') if isinstance(items[0], dict) else ""
+                else:
+                    images[image_type] = ""
+        return images
 
     @classmethod
-    @lru_cache(maxsize=256)
     def __request_fanart(cls, media_type, queryid):
         if media_type == MediaType.MOVIE:
             image_url = FANART_MOVIE_API_URL % queryid
@@ -85,12 +93,11 @@ class Fanart:
         """
         if not media_type or not queryid:
             return ""
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.MOVIE:
-            return self._images.get("moviethumb", default)
+            return images.get("moviethumb", default)
         else:
-            return self._images.get("tvthumb", default)
+            return images.get("tvthumb", default)
 
     def get_poster(self, media_type, queryid, default=None):
         """
@@ -98,12 +105,11 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.MOVIE:
-            return self._images.get("movieposter", default)
+            return images.get("movieposter", default)
         else:
-            return self._images.get("tvposter", default)
+            return images.get("tvposter", default)
 
     def get_background(self, media_type, queryid, default=None):
         """
@@ -111,12 +117,11 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.MOVIE:
-            return self._images.get("moviebackground", default)
+            return images.get("moviebackground", default)
         else:
-            return self._images.get("showbackground", default)
+            return images.get("showbackground", default)
 
     def get_banner(self, media_type, queryid, default=None):
         """
@@ -124,12 +129,11 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.MOVIE:
-            return self._images.get("moviebanner", default)
+            return images.get("moviebanner", default)
         else:
-            return self._images.get("tvbanner", default)
+            return images.get("tvbanner", default)
 
     def get_disc(self, media_type, queryid, default=None):
         """
@@ -137,10 +141,9 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.MOVIE:
-            return self._images.get("moviedisc", default)
+            return images.get("moviedisc", default)
         else:
             return None
 
@@ -150,12 +153,11 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.MOVIE:
-            return self._images.get("hdmovielogo", default)
+            return images.get("hdmovielogo", default)
         else:
-            return self._images.get("hdtvlogo", default)
+            return images.get("hdtvlogo", default)
 
     def get_thumb(self, media_type, queryid, default=None):
         """
@@ -163,12 +165,11 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.MOVIE:
-            return self._images.get("moviethumb", default)
+            return images.get("moviethumb", default)
         else:
-            return self._images.get("tvthumb", default)
+            return images.get("tvthumb", default)
 
     def get_clearart(self, media_type, queryid, default=None):
         """
@@ -176,10 +177,9 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type == MediaType.TV:
-            return self._images.get("hdclearart", default)
+            return images.get("hdclearart", default)
         else:
             return None
 
@@ -189,11 +189,10 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type != MediaType.TV:
             return None
-        return self._images.get("seasonposter", {}).get(season, "") or default
+        return images.get("seasonposter", {}).get(season, "") or default
 
     def get_seasonthumb(self, media_type, queryid, season, default=None):
         """
@@ -201,11 +200,10 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type != MediaType.TV:
             return None
-        return self._images.get("seasonthumb", {}).get(season, "") or default
+        return images.get("seasonthumb", {}).get(season, "") or default
 
     def get_seasonbanner(self, media_type, queryid, season, default=None):
         """
@@ -213,8 +211,7 @@ class Fanart:
         """
         if not media_type or not queryid:
             return None
-        if not self._images:
-            self.__get_fanart_images(media_type=media_type, queryid=queryid)
+        images = self.__get_fanart_images(media_type=media_type, queryid=queryid)
         if media_type != MediaType.TV:
             return None
-        return self._images.get("seasonbanner", {}).get(season, "") or default
+        return images.get("seasonbanner", {}).get(season, "") or default
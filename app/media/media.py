@@ -1,7 +1,6 @@
-import difflib
 import os
 import random
-import re
+import sys
 import traceback
 import cn2an
 import zhconv
@@ -11,16 +10,28 @@ import log
 from functools import lru_cache
 from lxml import etree
 
-from app.helper import MetaHelper
+from app.helper import MetaHelper, SearchEngineHelper
 from app.helper.openai_helper import OpenAiHelper
 from app.media.doubanapi.apiv2 import DoubanApi
 from app.media.meta._base import MetaBase
 from app.media.meta.metainfo import MetaInfo
 from app.media.tmdbv3api import TMDb, Search, Movie, TV, Person, Find, TMDbException, Discover, Trending, Episode, Genre
-from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, cacheman
+from app.media.tmdbv3api.as_obj import AsObj
+from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, TmdbDetailCache
 from app.utils.types import MediaType, MatchMode
-from config import Config, KEYWORD_BLACKLIST, KEYWORD_SEARCH_WEIGHT_3, KEYWORD_SEARCH_WEIGHT_2, KEYWORD_SEARCH_WEIGHT_1, \
-    KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD
+from config import Config
+
+# TMDB详情附加信息方案，调用方按需选择，避免查询和缓存用不到的数据
+TMDB_APPEND_PROFILES = {
+    # 名称、年份、类别及中文名，用于列表展示和过滤
+    "basic": ["alternative_titles"],
+    # 识别：另需译名匹配及外部ID
+    "identify": ["alternative_titles", "translations", "external_ids"],
+    # 详情页：另需演职员和图片
+    "detail": ["alternative_titles", "external_ids", "credits", "images"],
+    # 刮削：全部
+    "scrape": ["alternative_titles", "translations", "external_ids", "credits", "images"]
+}
 
 
 class Media:
@@ -37,6 +48,7 @@ class Media:
     genre = None
     meta = None
     openai = None
+    searchengine = None
     _rmt_match_mode = None
     _search_keyword = None
     _search_tmdbweb = None
@@ -88,6 +100,8 @@ class Media:
         self.meta = MetaHelper()
         # ChatGPT
         self.openai = OpenAiHelper()
+        # 搜索引擎辅助识别
+        self.searchengine = SearchEngineHelper()
         # 匹配模式
         rmt_match_mode = app.get('rmt_match_mode', 'normal')
         if rmt_match_mode:
@@ -601,7 +615,7 @@ class Media:
         :param mtype: 类型：电影、电视剧、动漫，为空时都查（此时用不上年份）
         :param tmdbid: TMDB的ID，有tmdbid时优先使用tmdbid，否则使用年份和标题
         :param language: 语种
-        :param append_to_response: 附加信息
+        :param append_to_response: 附加信息方案：basic/identify/detail/scrape，默认identify
         :param chinese: 是否转换中文标题
         """
         if not self.tmdb:
@@ -609,15 +623,22 @@ class Media:
             return None
         # 设置语言
         self.__set_language(language)
-        if mtype == MediaType.MOVIE:
-            tmdb_info = self.__get_tmdb_movie_detail(tmdbid, append_to_response)
-            if tmdb_info:
-                tmdb_info['media_type'] = MediaType.MOVIE
-        else:
-            tmdb_info = self.__get_tmdb_tv_detail(tmdbid, append_to_response)
+        # 附加信息
+        parts = self.__get_append_parts(append_to_response)
+        media_type = MediaType.MOVIE if mtype == MediaType.MOVIE else MediaType.TV
+        cache_key = f"{media_type.name}-{tmdbid}-{self.tmdb.language}"
+        tmdb_info = self.__get_tmdb_detail_cache(cache_key, parts)
+        if tmdb_info is None:
+            if media_type == MediaType.MOVIE:
+                tmdb_info = self.__get_tmdb_movie_detail(tmdbid, ",".join(parts))
+            else:
+                tmdb_info = self.__get_tmdb_tv_detail(tmdbid, ",".join(parts))
             if tmdb_info:
-                tmdb_info['media_type'] = MediaType.TV
+                tmdb_info = self.__update_tmdb_detail_cache(cache_key, parts, tmdb_info)
         if tmdb_info:
+            # 缓存中的对象不直接修改
+            tmdb_info = tmdb_info.copy()
+            tmdb_info['media_type'] = media_type
             # 转换genreid
             tmdb_info['genre_ids'] = self.__get_genre_ids_from_detail(tmdb_info.get('genres'))
             # 转换中文标题
@@ -626,6 +647,92 @@ class Media:
 
         return tmdb_info
 
+    @staticmethod
+    def __get_append_parts(append_to_response):
+        """
+        将附加信息方案名称转换为TMDB的append_to_response列表，兼容原有的all和逗号分隔写法
+        """
+        if append_to_response is None:
+            return TMDB_APPEND_PROFILES["identify"]
+        if append_to_response == "all":
+            return TMDB_APPEND_PROFILES["scrape"]
+        if append_to_response in TMDB_APPEND_PROFILES:
+            return TMDB_APPEND_PROFILES[append_to_response]
+        return [part.strip() for part in str(append_to_response).split(",") if part.strip()]
+
+    @staticmethod
+    def __get_tmdb_detail_cache(cache_key, parts):
+        """
+        从详情缓存中获取已包含所需附加信息的条目
+        """
+        cache_info = TmdbDetailCache.get(cache_key)
+        if not cache_info:
+            return None
+        cache_parts, tmdb_info = cache_info
+        if not set(parts).issubset(cache_parts):
+            return None
+        return tmdb_info
+
+    @staticmethod
+    def __update_tmdb_detail_cache(cache_key, parts, tmdb_info):
+        """
+        精简详情后写入缓存，已缓存条目中本次未查询的附加信息予以保留，使条目逐步升级
+        """
+        translations = tmdb_info.get("translations")
+        if translations:
+            # 译名只用于名称匹配，去掉简介等大段文本
+            tmdb_info["translations"] = AsObj(translations=[{
+                "iso_3166_1": translation.get("iso_3166_1"),
+                "iso_639_1": translation.get("iso_639_1"),
+                "data": {
+                    "title": translation.get("data", {}).get("title"),
+                    "name": translation.get("data", {}).get("name")
+                }
+            } for translation in translations.get("translations") or []])
+        cache_parts = set(parts)
+        cache_info = TmdbDetailCache.get(cache_key)
+        if cache_info:
+            old_parts, old_info = cache_info
+            for part in old_parts - cache_parts:
+                if old_info.get(part) is not None:
+                    tmdb_info[part] = old_info.get(part)
+            cache_parts |= old_parts
+        TmdbDetailCache.set(cache_key, (cache_parts, tmdb_info))
+        return tmdb_info
+
+    @staticmethod
+    def get_tmdb_cache_info():
+        """
+        返回TMDB详情缓存的条目数及估算占用内存（字节）
+        """
+        seen = set()
+
+        def __sizeof(obj):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            size = sys.getsizeof(obj)
+            if isinstance(obj, AsObj):
+                size += __sizeof(obj.__dict__)
+            elif isinstance(obj, dict):
+                size += sum(__sizeof(k) + __sizeof(v) for k, v in obj.items())
+            elif isinstance(obj, (list, tuple, set)):
+                size += sum(__sizeof(i) for i in obj)
+            return size
+
+        values = list(TmdbDetailCache.values())
+        return {
+            "count": len(values),
+            "size": sum(__sizeof(v) for v in values)
+        }
+
+    @staticmethod
+    def clear_tmdb_detail_cache():
+        """
+        清空TMDB详情缓存
+        """
+        TmdbDetailCache.clear()
+
     def __update_tmdbinfo_cn_title(self, tmdb_info):
         """
         更新TMDB信息中的中文名称
@@ -753,7 +860,8 @@ class Media:
                        language=None,
                        chinese=True,
                        append_to_response=None,
-                       meta_info = None):
+                       meta_info = None,
+                       chatgpt=True):
         """
         只有名称信息，判别是电影还是电视剧并搜刮TMDB信息，用于种子名称识别
         :param title: 种子名称
@@ -764,6 +872,7 @@ class Media:
         :param language: 语言
         :param chinese: 原标题为英文时是否从别名中搜索中文名称
         :param append_to_response: 额外查询的信息
+        :param chatgpt: TMDB未匹配时是否通过ChatGPT识别，批量识别时由get_media_infos统一识别
         :return: 带有TMDB信息的MetaInfo对象
         """
         if not self.tmdb:
@@ -791,24 +900,54 @@ class Media:
         file_media_info = self.query_tmdb_info(search_name, meta_info.type, meta_info.year,
                                                meta_info.begin_season, append_to_response, chinese, strict, cache)
         
-       # 通过ChatGPT查询
-        if not file_media_info and self._chatgpt_enable:
-            mtype, seasons, episodes, file_media_info = self.__search_chatgpt(file_name=meta_info.get_name(),
-                                                                              mtype=mtype)
-            # 修正类型和集数
-            meta_info.type = mtype
-            if not meta_info.get_season_string():
-                meta_info.set_season(seasons)
-            if not meta_info.get_episode_string():
-                meta_info.set_episode(episodes)
-        
-        # 赋值TMDB信息并返回
+        # 赋值TMDB信息
         meta_info.set_tmdb_info(file_media_info)
+        # 通过ChatGPT查询
+        if not file_media_info and chatgpt:
+            self.__set_chatgpt_info(meta_info, mtype)
         # 根据TMDB信息修正文件剧集信息
         self.fix_file_season_by_tmdb_info(meta_info)
 
         return meta_info
 
+    def get_media_infos(self, titles, mtype=None, strict=None, cache=True, language=None, chinese=True):
+        """
+        批量识别种子名称并搜刮TMDB信息，TMDB未匹配的名称合并提交ChatGPT识别，用于RSS等一次处理多个种子的场景
+        :param titles: 种子名称列表
+        :return: 与titles一一对应的MetaInfo对象列表，未识别出有效信息的为None
+        """
+        media_infos = [self.get_media_info(title=title,
+                                           mtype=mtype,
+                                           strict=strict,
+                                           cache=cache,
+                                           language=language,
+                                           chinese=chinese,
+                                           chatgpt=False) for title in titles or []]
+        missed = [media_info for media_info in media_infos if media_info and not media_info.tmdb_info]
+        if missed and self._chatgpt_enable:
+            # 批量识别后结果已缓存，逐个处理时直接命中
+            self.openai.get_media_names([media_info.get_name() for media_info in missed])
+            for media_info in missed:
+                self.__set_chatgpt_info(media_info, mtype)
+                self.fix_file_season_by_tmdb_info(media_info)
+        return media_infos
+
+    def __set_chatgpt_info(self, meta_info, mtype=None):
+        """
+        TMDB未匹配时通过ChatGPT识别文件名，修正类型和集数后赋值TMDB信息
+        """
+        if not self._chatgpt_enable:
+            return
+        mtype, seasons, episodes, file_media_info = self.__search_chatgpt(file_name=meta_info.get_name(),
+                                                                          mtype=mtype)
+        # 修正类型和集数
+        meta_info.type = mtype
+        if not meta_info.get_season_string():
+            meta_info.set_season(seasons)
+        if not meta_info.get_episode_string():
+            meta_info.set_episode(episodes)
+        meta_info.set_tmdb_info(file_media_info)
+
     # 从tmdb查询电影信息(名称准确时可调用)
     def query_tmdb_info(self, name, mtype, year=None, begin_season=None,
                         append_to_response=None, chinese=True, strict=None, cache=True):
@@ -857,11 +996,7 @@ class Media:
             file_media_info = self.__search_tmdb_web(file_media_name=name, mtype=mtype)
         if not file_media_info and self._search_keyword:
             # 关键字猜测
-            cache_name = cacheman["tmdb_supply"].get(name)
-            is_movie = False
-            if not cache_name:
-                cache_name, is_movie = self.__search_engine(name)
-                cacheman["tmdb_supply"].set(name, cache_name)
+            cache_name, is_movie = self.searchengine.get_keyword(name)
             if cache_name:
                 log.info("【Meta】开始辅助查询：%s ..." % cache_name)
                 if is_movie:
@@ -1204,11 +1339,7 @@ class Media:
                             if not meta_info.get_episode_string():
                                 meta_info.set_episode(episodes)
                         if not file_media_info and self._search_keyword:
-                            cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
-                            is_movie = False
-                            if not cache_name:
-                                cache_name, is_movie = self.__search_engine(meta_info.get_name())
-                                cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
+                            cache_name, is_movie = self.searchengine.get_keyword(meta_info.get_name())
                             if cache_name:
                                 log.info("【Meta】开始辅助查询：%s ..." % cache_name)
                                 if is_movie:
@@ -1402,6 +1533,7 @@ class Media:
         """
         获取电影的详情
         :param tmdbid: TMDB ID
+        :param append_to_response: 附加信息，逗号分隔
         :return: TMDB信息
         """
         """
@@ -1508,6 +1640,7 @@ class Media:
         """
         获取电视剧的详情
         :param tmdbid: TMDB ID
+        :param append_to_response: 附加信息，逗号分隔
         :return: TMDB信息
         """
         """
@@ -2180,6 +2313,7 @@ class Media:
         en_info = self.get_tmdb_info(mtype=media_info.type,
                                      tmdbid=media_info.tmdb_id,
                                      language="en",
+                                     append_to_response="basic",
                                      chinese=False)
         if en_info:
             return en_info.get("title") if media_info.type == MediaType.MOVIE else en_info.get("name")
@@ -2352,112 +2486,6 @@ class Media:
 
         return movie_item
 
-    @staticmethod
-    def __search_engine(feature_name):
-        """
-        辅助识别关键字
-        """
-        is_movie = False
-        if not feature_name:
-            return None, is_movie
-        # 剔除不必要字符
-        feature_name = re.compile(r"^\w+字幕[组社]?", re.IGNORECASE).sub("", feature_name)
-        backlist = sorted(KEYWORD_BLACKLIST, key=lambda x: len(x), reverse=True)
-        for single in backlist:
-            feature_name = feature_name.replace(single, " ")
-        if not feature_name:
-            return None, is_movie
-
-        def cal_score(strongs, r_dict):
-            for i, s in enumerate(strongs):
-                if len(strongs) < 5:
-                    if i < 2:
-                        score = KEYWORD_SEARCH_WEIGHT_3[0]
-                    else:
-                        score = KEYWORD_SEARCH_WEIGHT_3[1]
-                elif len(strongs) < 10:
-                    if i < 2:
-                        score = KEYWORD_SEARCH_WEIGHT_2[0]
-                    else:
-                        score = KEYWORD_SEARCH_WEIGHT_2[1] if i < (len(strongs) >> 1) else KEYWORD_SEARCH_WEIGHT_2[2]
-                else:
-                    if i < 2:
-                        score = KEYWORD_SEARCH_WEIGHT_1[0]
-                    else:
-                        score = KEYWORD_SEARCH_WEIGHT_1[1] if i < (len(strongs) >> 2) else KEYWORD_SEARCH_WEIGHT_1[
-                            2] if i < (
-                                len(strongs) >> 1) \
-                            else KEYWORD_SEARCH_WEIGHT_1[3] if i < (len(strongs) >> 2 + len(strongs) >> 1) else \
-                            KEYWORD_SEARCH_WEIGHT_1[
-                                4]
-                if r_dict.__contains__(s.lower()):
-                    r_dict[s.lower()] += score
-                    continue
-                r_dict[s.lower()] = score
-
-        bing_url = "https://www.cn.bing.com/search?q=%s&qs=n&form=QBRE&sp=-1" % feature_name
-        baidu_url = "https://www.baidu.com/s?ie=utf-8&tn=baiduhome_pg&wd=%s" % feature_name
-        res_bing = RequestUtils(timeout=5).get_res(url=bing_url)
-        res_baidu = RequestUtils(timeout=5).get_res(url=baidu_url)
-        ret_dict = {}
-        if res_bing and res_bing.status_code == 200:
-            html_text = res_bing.text
-            if html_text:
-                html = etree.HTML(html_text)
-                strongs_bing = list(
-                    filter(lambda x: (0 if not x else difflib.SequenceMatcher(None, feature_name,
-                                                                              x).ratio()) > KEYWORD_STR_SIMILARITY_THRESHOLD,
-                           map(lambda x: x.text, html.cssselect(
-                               "#sp_requery strong, #sp_recourse strong, #tile_link_cn strong, .b_ad .ad_esltitle~div strong, h2 strong, .b_caption p strong, .b_snippetBigText strong, .recommendationsTableTitle+.b_slideexp strong, .recommendationsTableTitle+table strong, .recommendationsTableTitle+ul strong, .pageRecoContainer .b_module_expansion_control strong, .pageRecoContainer .b_title>strong, .b_rs strong, .b_rrsr strong, #dict_ans strong, .b_listnav>.b_ans_stamp>strong, #b_content #ans_nws .na_cnt strong, .adltwrnmsg strong"))))
-                if strongs_bing:
-                    title = html.xpath("//aside//h2[@class = \" b_entityTitle\"]/text()")
-                    if len(title) > 0:
-                        if title:
-                            t = re.compile(r"\s*\(\d{4}\)$").sub("", title[0])
-                            ret_dict[t] = 200
-                            if html.xpath("//aside//div[@data-feedbk-ids = \"Movie\"]"):
-                                is_movie = True
-                    cal_score(strongs_bing, ret_dict)
-        if res_baidu and res_baidu.status_code == 200:
-            html_text = res_baidu.text
-            if html_text:
-                html = etree.HTML(html_text)
-                ems = list(
-                    filter(lambda x: (0 if not x else difflib.SequenceMatcher(None, feature_name,
-                                                                              x).ratio()) > KEYWORD_STR_SIMILARITY_THRESHOLD,
-                           map(lambda x: x.text, html.cssselect("em"))))
-                if len(ems) > 0:
-                    cal_score(ems, ret_dict)
-        if not ret_dict:
-            return None, False
-        ret = sorted(ret_dict.items(), key=lambda d: d[1], reverse=True)
-        log.info("【Meta】推断关键字为：%s ..." % ([k[0] for i, k in enumerate(ret) if i < 4]))
-        if len(ret) == 1:
-            keyword = ret[0][0]
-        else:
-            pre = ret[0]
-            nextw = ret[1]
-            if nextw[0].find(pre[0]) > -1:
-                # 满分直接判定
-                if int(pre[1]) >= 100:
-                    keyword = pre[0]
-                # 得分相差30 以上， 选分高
-                elif int(pre[1]) - int(nextw[1]) > KEYWORD_DIFF_SCORE_THRESHOLD:
-                    keyword = pre[0]
-                # 重复的不选
-                elif nextw[0].replace(pre[0], "").strip() == pre[0]:
-                    keyword = pre[0]
-                # 纯数字不选
-                elif pre[0].isdigit():
-                    keyword = nextw[0]
-                else:
-                    keyword = nextw[0]
-
-            else:
-                keyword = pre[0]
-        log.info("【Meta】选择关键字为：%s " % keyword)
-        return keyword, is_movie
-
     @staticmethod
     def __get_genre_ids_from_detail(genres):
         """
@@ -74,11 +74,11 @@ class Scraper:
                 log.info(f"【Scraper】读取到本地nfo文件的tmdbid：{tmdbid}")
                 meta_info.set_tmdb_info(self.media.get_tmdb_info(mtype=meta_info.type,
                                                                  tmdbid=tmdbid,
-                                                                 append_to_response='all'))
+                                                                 append_to_response="scrape"))
                 media_info = meta_info
             else:
                 medias = self.media.get_media_info_on_files(file_list=[file],
-                                                            append_to_response="all")
+                                                            append_to_response="scrape")
                 if not medias:
                     continue
                 media_info = None
@@ -60,6 +60,8 @@ class Movie(TMDb):
             **self._call(
                 self._urls["details"] % movie_id,
                 "append_to_response=" + append_to_response,
+                # 详情由Media按附加信息方案精简后缓存，不再缓存原始响应
+                call_cached=False
             )
         )
 
@@ -162,19 +162,23 @@ class _IMediaClient(metaclass=ABCMeta):
         pass
 
     @staticmethod
-    def get_nt_image_url(url, remote=False):
+    def get_nt_image_url(url, remote=False, width=None):
         """
         获取NT中转内网图片的地址
         :param: url: 图片的URL
         :param: remote: 是否需要返回完整的URL
+        :param: width: 缩略图宽度，为空时返回原图
         """
         if not url:
             return ""
+        image_url = f"img?url={quote(url)}"
+        if width:
+            image_url = f"{image_url}&width={width}"
         if remote:
             domain = Config().get_domain()
             if domain:
-                return f"{domain}/img?url={quote(url)}"
+                return f"{domain}/{image_url}"
             else:
                 return ""
         else:
-            return f"img?url={quote(url)}"
+            return image_url
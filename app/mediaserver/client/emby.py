@@ -439,19 +439,20 @@ class Emby(_IMediaClient):
             return None
         return None
 
-    def get_local_image_by_id(self, item_id, remote=True, inner=False):
+    def get_local_image_by_id(self, item_id, remote=True, inner=False, width=None):
         """
         根据ItemId从媒体服务器查询本地图片地址
         :param: item_id: 在Emby中的ID
         :param: remote 是否远程使用，TG微信等客户端调用应为True
         :param: inner 是否NT内部调用，为True是会使用NT中转
+        :param: width 缩略图宽度，NT中转时生效
         """
         if not self._host or not self._apikey:
             return None
         if not remote:
             image_url = "%sItems/%s/Images/Primary" % (self._host, item_id)
             if inner:
-                return self.get_nt_image_url(image_url)
+                return self.get_nt_image_url(image_url, width=width)
             return image_url
         else:
             host = self._play_host or self._host
@@ -797,7 +798,7 @@ class Emby(_IMediaClient):
                         continue
                     item_type = MediaType.MOVIE.value if item.get("Type") == "Movie" else MediaType.TV.value
                     link = self.get_play_url(item.get("Id"))
-                    image = self.get_local_image_by_id(item_id=item.get("Id"), remote=False, inner=True)
+                    image = self.get_local_image_by_id(item_id=item.get("Id"), remote=False, inner=True, width=300)
                     ret_latest.append({
                         "id": item.get("Id"),
                         "name": item.get("Name"),
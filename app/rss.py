@@ -1,17 +1,23 @@
-import re
+import datetime
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 
 import log
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import DbHelper, RssHelper
+from app.helper import DbHelper, RssHelper, DictHelper, SubscribeHelper
 from app.media import Media
 from app.media.meta import MetaInfo
+from app.message import Message
 from app.sites import Sites, SiteConf
 from app.subscribe import Subscribe
-from app.utils import ExceptionUtils, TorrentUtils
+from app.utils import ExceptionUtils, TorrentUtils, SiteUtils, StringUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaType, SearchType
+from config import RSS_FETCH_MAX_WORKERS, RSS_FETCH_TIMEOUT, RSS_WATERMARK_GRACE
 
 lock = Lock()
 
@@ -27,6 +33,12 @@ class Rss:
     dbhelper = None
     rsshelper = None
     subscribe = None
+    message = None
+    dicthelper = None
+    # 上次处理时的订阅清单签名
+    _subscribe_sign = None
+    # 订阅倒排索引，订阅清单变化时重建
+    _subscribe_index = None
 
     def __init__(self):
         self.init_config()
@@ -40,6 +52,8 @@ class Rss:
         self.dbhelper = DbHelper()
         self.rsshelper = RssHelper()
         self.subscribe = Subscribe()
+        self.message = Message()
+        self.dicthelper = DictHelper()
 
     def rssdownload(self):
         """
@@ -93,11 +107,8 @@ class Rss:
             else:
                 check_sites = list(set(check_sites))
 
-            # 匹配到的资源列表
-            rss_download_torrents = []
-            # 缺失的资源详情
-            rss_no_exists = {}
-            # 遍历站点资源
+            # 需要处理的站点
+            rss_check_sites = []
             for site_info in rss_sites_info:
                 if not site_info:
                     continue
@@ -107,215 +118,360 @@ class Rss:
                 if check_sites and site_name not in check_sites:
                     continue
                 # 站点rss链接
-                rss_url = site_info.get("rssurl")
-                if not rss_url:
+                if not site_info.get("rssurl"):
                     log.info(f"【Rss】{site_name} 未配置rssurl，跳过...")
                     continue
-                # 站点信息
-                site_id = site_info.get("id")
-                site_cookie = site_info.get("cookie")
-                site_ua = site_info.get("ua")
-                # 是否解析种子详情
-                site_parse = site_info.get("parse")
-                # 是否使用代理
-                site_proxy = site_info.get("proxy")
-                # 使用的规则
-                site_fliter_rule = site_info.get("rule")
-                # 开始下载RSS
-                log.info(f"【Rss】正在处理：{site_name}")
-                if site_info.get("pri"):
-                    site_order = 100 - int(site_info.get("pri"))
-                else:
-                    site_order = 0
-                rss_acticles = self.rsshelper.parse_rssxml(url=rss_url)
-                if rss_acticles is None:
-                    # RSS链接过期
-                    log.error(f"【Rss】站点 {site_name} RSS链接已过期，请重新获取！")
-                    # 发送消息
-                    self.message.send_site_message(title="【RSS链接过期提醒】",
-                                                   text=f"站点：{site_name}\n"
-                                                        f"链接：{rss_url}")
-                    continue
-                if not rss_acticles:
-                    log.warn(f"【Rss】{site_name} 未下载到数据")
-                    continue
-                else:
-                    log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
-                # 处理RSS结果
-                res_num = 0
-                for article in rss_acticles:
-                    try:
-                        # 种子名
-                        title = article.get('title')
-                        # 种子链接
-                        enclosure = article.get('enclosure')
-                        # 种子页面
-                        page_url = article.get('link')
-                        # 种子大小
-                        size = article.get('size')
-                        # 开始处理
-                        log.info(f"【Rss】开始处理：{title}")
-                        # 检查这个种子是不是下过了
-                        if self.rsshelper.is_rssd_by_enclosure(enclosure):
-                            log.info(f"【Rss】{title} 已成功订阅过")
-                            continue
-                        # 识别种子名称，开始搜索TMDB
-                        media_info = MetaInfo(title=title)
-                        cache_info = self.media.get_cache_info(media_info)
-                        if cache_info.get("id"):
-                            # 使用缓存信息
-                            media_info.tmdb_id = cache_info.get("id")
-                            media_info.type = cache_info.get("type")
-                            media_info.title = cache_info.get("title")
-                            media_info.year = cache_info.get("year")
-                        else:
-                            # 重新查询TMDB
-                            media_info = self.media.get_media_info(title=title)
-                            if not media_info:
-                                log.warn(f"【Rss】{title} 无法识别出媒体信息！")
-                                continue
-                            elif not media_info.tmdb_info:
-                                log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
-                        # 大小及种子页面
-                        media_info.set_torrent_info(size=size,
-                                                    page_url=page_url,
-                                                    site=site_name,
-                                                    site_order=site_order,
-                                                    enclosure=enclosure)
-                        # 检查种子是否匹配订阅，返回匹配到的订阅ID、是否洗版、总集数、上传因子、下载因子
-                        match_flag, match_msg, match_info = self.check_torrent_rss(
-                            media_info=media_info,
-                            rss_movies=rss_movies,
-                            rss_tvs=rss_tvs,
-                            site_id=site_id,
-                            site_filter_rule=site_fliter_rule,
-                            site_cookie=site_cookie,
-                            site_parse=site_parse,
-                            site_ua=site_ua,
-                            site_proxy=site_proxy)
-                        for msg in match_msg:
-                            log.info(f"【Rss】{msg}")
-
-                        # 未匹配
-                        if not match_flag:
-                            continue
-
-                        # 非模糊匹配命中，检查本地情况，检查删除订阅
-                        if not match_info.get("fuzzy_match"):
-                            # 匹配到订阅，如没有TMDB信息则重新查询
-                            if not media_info.tmdb_info and media_info.tmdb_id:
-                                media_info.set_tmdb_info(self.media.get_tmdb_info(mtype=media_info.type,
-                                                                                  tmdbid=media_info.tmdb_id))
-                            if not media_info.tmdb_info:
-                                continue
-                            # 非洗版时检查本地是否存在
-                            if not match_info.get("over_edition"):
-                                if media_info.type == MediaType.MOVIE:
-                                    exist_flag, rss_no_exists, _ = self.downloader.check_exists_medias(
-                                        meta_info=media_info,
-                                        no_exists=rss_no_exists
-                                    )
-                                else:
-                                    # 从登记薄中获取缺失剧集
-                                    season = 1
-                                    if match_info.get("season"):
-                                        season = int(str(match_info.get("season")).replace("S", ""))
-                                    # 设定的总集数
-                                    total_ep = match_info.get("total")
-                                    # 设定的开始集数
-                                    current_ep = match_info.get("current_ep")
-                                    # 表登记的缺失集数
-                                    episodes = self.subscribe.get_subscribe_tv_episodes(match_info.get("id"))
-                                    if episodes is None:
-                                        episodes = []
-                                        if current_ep:
-                                            episodes = list(range(int(current_ep), int(total_ep) + 1))
-                                        rss_no_exists[media_info.tmdb_id] = [
-                                            {
-                                                "season": season,
-                                                "episodes": episodes,
-                                                "total_episodes": total_ep
-                                            }
-                                        ]
-                                    else:
-                                        rss_no_exists[media_info.tmdb_id] = [
-                                            {
-                                                "season": season,
-                                                "episodes": episodes,
-                                                "total_episodes": total_ep
-                                            }
-                                        ]
-                                    # 检查本地媒体库情况
-                                    exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
-                                        meta_info=media_info,
-                                        total_ep={season: total_ep}
-                                    )
-                                    # 取交集做为缺失集
-                                    rss_no_exists = TorrentUtils.get_intersection_episodes(target=rss_no_exists,
-                                                                                      source=library_no_exists,
-                                                                                      title=media_info.tmdb_id)
-                                    if rss_no_exists.get(media_info.tmdb_id):
-                                        log.info("【Rss】%s 订阅缺失季集：%s" % (
-                                            media_info.get_title_string(),
-                                            rss_no_exists.get(media_info.tmdb_id)
-                                        ))
-                                # 本地已存在
-                                if exist_flag:
-                                    continue
-                            # 洗版模式
-                            else:
-                                # 洗版时季集不完整的资源不要
-                                if media_info.type != MediaType.MOVIE \
-                                        and media_info.get_episode_list():
-                                    log.info(
-                                        f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
-                                        f"正在洗版，过滤掉季集不完整的资源：{title}"
-                                    )
-                                    continue
-                                if not self.subscribe.check_subscribe_over_edition(
-                                        rtype=media_info.type,
-                                        rssid=match_info.get("id"),
-                                        res_order=match_info.get("res_order")):
-                                    log.info(
-                                        f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
-                                        f"正在洗版，跳过低优先级或同优先级资源：{title}"
-                                    )
-                                    continue
-                        # 模糊匹配
-                        else:
-                            # 不做处理，直接下载
-                            pass
+                rss_check_sites.append(site_info)
+            if not rss_check_sites:
+                return
 
-                        # 站点流控
-                        if self.sites.check_ratelimit(site_id):
-                            continue
+            # 订阅清单变化后，不使用条件请求及高水位，所有条目重新匹配一次
+            subscribe_sign = self.__get_subscribe_sign(rss_movies, rss_tvs)
+            conditional = subscribe_sign == self._subscribe_sign
+            if not conditional or not self._subscribe_index:
+                self._subscribe_index = SubscribeHelper.build_subscribe_index(rss_movies, rss_tvs)
+            self._subscribe_sign = subscribe_sign
 
-                        # 设置种子信息
-                        media_info.set_torrent_info(res_order=match_info.get("res_order"),
-                                                    filter_rule=match_info.get("filter_rule"),
-                                                    over_edition=match_info.get("over_edition"),
-                                                    download_volume_factor=match_info.get("download_volume_factor"),
-                                                    upload_volume_factor=match_info.get("upload_volume_factor"),
-                                                    rssid=match_info.get("id"))
-                        # 设置下载参数
-                        media_info.set_download_info(download_setting=match_info.get("download_setting"),
-                                                     save_path=match_info.get("save_path"))
-                        # 插入数据库历史记录
-                        self.rsshelper.insert_rss_torrents(media_info)
-                        # 加入下载列表
-                        if media_info not in rss_download_torrents:
-                            rss_download_torrents.append(media_info)
-                            res_num = res_num + 1
+            # 匹配到的资源列表
+            rss_download_torrents = []
+            # 缺失的资源详情
+            rss_no_exists = {}
+            # 并发下载各站点RSS，先下载完成的站点先处理
+            executor = ThreadPoolExecutor(max_workers=min(RSS_FETCH_MAX_WORKERS, len(rss_check_sites)))
+            futures = {executor.submit(self.__fetch_site_rss, site_info, conditional): site_info
+                       for site_info in rss_check_sites}
+            try:
+                for future in as_completed(futures):
+                    site_info = futures[future]
+                    site_name = site_info.get("name")
+                    try:
+                        rss_acticles, fetch_time = future.result()
                     except Exception as e:
                         ExceptionUtils.exception_traceback(e)
-                        log.error("【Rss】处理RSS发生错误：%s" % str(e))
+                        log.error(f"【Rss】{site_name} 下载RSS出错：{str(e)}")
+                        continue
+                    if rss_acticles is None:
+                        # RSS链接过期
+                        log.error(f"【Rss】站点 {site_name} RSS链接已过期，请重新获取！")
+                        # 发送消息
+                        self.message.send_site_message(title="【RSS链接过期提醒】",
+                                                       text=f"站点：{site_name}\n"
+                                                            f"链接：{site_info.get('rssurl')}")
+                        continue
+                    if not rss_acticles:
+                        feed_stats = RssHelper.get_feed_stats(SiteUtils.get_url_domain(site_info.get("rssurl")))
+                        log.info(f"【Rss】{site_name} 没有新数据，下载耗时 {fetch_time} 秒，"
+                                 f"累计节省解析 {feed_stats.get('parses_saved') or 0} 次，"
+                                 f"节省流量 {StringUtils.str_filesize(feed_stats.get('bytes_saved') or 0)}")
                         continue
-                log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
+                    log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}，下载耗时 {fetch_time} 秒")
+                    # 按高水位丢弃已处理过的条目
+                    rss_acticles, watermark = self.__filter_by_watermark(site_info=site_info,
+                                                                         rss_acticles=rss_acticles,
+                                                                         subscribe_sign=subscribe_sign)
+                    if not rss_acticles:
+                        log.info(f"【Rss】{site_name} 没有高水位之后的新数据")
+                        continue
+                    # 处理RSS结果
+                    start_time = time.time()
+                    res_num, rss_no_exists = self.__process_site_rss(site_info=site_info,
+                                                                     rss_acticles=rss_acticles,
+                                                                     rss_movies=rss_movies,
+                                                                     rss_tvs=rss_tvs,
+                                                                     rss_download_torrents=rss_download_torrents,
+                                                                     rss_no_exists=rss_no_exists)
+                    log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源，下载耗时 %s 秒，处理耗时 %s 秒" % (
+                        site_name, res_num, fetch_time, round(time.time() - start_time, 3)))
+                    # 处理完成后才更新高水位
+                    if watermark:
+                        self.dicthelper.set("RssWatermark", str(site_info.get("id")), json.dumps(watermark))
+            finally:
+                executor.shutdown(wait=False)
             log.info("【Rss】所有RSS处理结束，共 %s 个有效资源" % len(rss_download_torrents))
             # 开始择优下载
             self.download_rss_torrent(rss_download_torrents=rss_download_torrents,
                                       rss_no_exists=rss_no_exists)
 
+    @staticmethod
+    def __fetch_site_rss(site_info, conditional=True):
+        """
+        下载站点RSS
+        :param site_info: 站点信息
+        :param conditional: 是否使用条件请求
+        :return: 种子信息列表（为None代表RSS过期）, 下载耗时（秒）
+        """
+        start_time = time.time()
+        log.info(f"【Rss】正在下载：{site_info.get('name')}")
+        rss_acticles = RssHelper.parse_rssxml(url=site_info.get("rssurl"),
+                                              timeout=RSS_FETCH_TIMEOUT,
+                                              conditional=conditional)
+        return rss_acticles, round(time.time() - start_time, 3)
+
+    @staticmethod
+    def __get_subscribe_sign(rss_movies, rss_tvs):
+        """
+        计算订阅清单签名，用于判断订阅是否有变化
+        """
+        return hashlib.md5(json.dumps([rss_movies, rss_tvs],
+                                      sort_keys=True,
+                                      default=str).encode("utf-8")).hexdigest()
+
+    def __filter_by_watermark(self, site_info, rss_acticles, subscribe_sign):
+        """
+        按站点高水位（发布时间+下载链接）丢弃已处理过的RSS条目，避免重复识别
+        发布时间缺失或不可靠（晚于当前时间）时不使用高水位，全部交由后续去重处理
+        :return: 需要处理的条目, 新的高水位（为None时不更新）
+        """
+        pubdates = []
+        for article in rss_acticles:
+            pubdate = article.get("pubdate")
+            if not isinstance(pubdate, datetime.datetime):
+                break
+            pubdates.append(pubdate.timestamp())
+        if len(pubdates) != len(rss_acticles) \
+                or max(pubdates) > time.time() + RSS_WATERMARK_GRACE:
+            log.debug(f"【Rss】{site_info.get('name')} 发布时间缺失或不可靠，不使用高水位")
+            return rss_acticles, None
+        # 高水位：{"sign": 订阅清单签名, "pubdate": 最大发布时间, "enclosures": {容差时间内的下载链接: 发布时间}}
+        watermark = {}
+        try:
+            watermark = json.loads(self.dicthelper.get("RssWatermark", str(site_info.get("id"))) or "{}")
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+        if watermark.get("sign") != subscribe_sign:
+            watermark = {}
+        seen_enclosures = watermark.get("enclosures") or {}
+        mark_pubdate = watermark.get("pubdate") or 0
+        # 早于高水位容差范围的丢弃，容差范围内的按下载链接丢弃
+        new_acticles = [article for article, pubdate in zip(rss_acticles, pubdates)
+                        if pubdate >= mark_pubdate - RSS_WATERMARK_GRACE
+                        and article.get("enclosure") not in seen_enclosures]
+        if len(new_acticles) < len(rss_acticles):
+            log.info(f"【Rss】{site_info.get('name')} 高水位过滤掉 {len(rss_acticles) - len(new_acticles)} 个已处理条目")
+        # 新的高水位
+        mark_pubdate = max(pubdates + [mark_pubdate])
+        seen_enclosures.update({article.get("enclosure"): pubdate
+                                for article, pubdate in zip(rss_acticles, pubdates)})
+        return new_acticles, {
+            "sign": subscribe_sign,
+            "pubdate": mark_pubdate,
+            "enclosures": {enclosure: pubdate for enclosure, pubdate in seen_enclosures.items()
+                           if pubdate >= mark_pubdate - RSS_WATERMARK_GRACE}
+        }
+
+    def __process_site_rss(self, site_info, rss_acticles, rss_movies, rss_tvs,
+                           rss_download_torrents, rss_no_exists):
+        """
+        处理单个站点的RSS结果，匹配到的资源加入下载列表
+        :return: 匹配到的资源数, 缺失的资源详情
+        """
+        # 站点信息
+        site_id = site_info.get("id")
+        site_name = site_info.get("name")
+        site_cookie = site_info.get("cookie")
+        site_ua = site_info.get("ua")
+        # 是否解析种子详情
+        site_parse = site_info.get("parse")
+        # 是否使用代理
+        site_proxy = site_info.get("proxy")
+        # 使用的规则
+        site_fliter_rule = site_info.get("rule")
+        if site_info.get("pri"):
+            site_order = 100 - int(site_info.get("pri"))
+        else:
+            site_order = 0
+        res_num = 0
+        # 一次查询出已处理过的种子
+        rssd_enclosures = self.rsshelper.get_rssd_enclosures([article.get('enclosure')
+                                                              for article in rss_acticles])
+        # 需要记录的种子，处理完后批量插入
+        rss_torrents = []
+        # 先识别未处理过的种子，未命中缓存的批量识别，TMDB未匹配的名称合并提交ChatGPT识别
+        media_infos = {}
+        uncached_articles = []
+        for article in rss_acticles:
+            enclosure = article.get('enclosure')
+            if not enclosure or enclosure in rssd_enclosures:
+                continue
+            media_info = MetaInfo(title=article.get('title'))
+            cache_info = self.media.get_cache_info(media_info)
+            if cache_info.get("id"):
+                # 使用缓存信息
+                media_info.tmdb_id = cache_info.get("id")
+                media_info.type = cache_info.get("type")
+                media_info.title = cache_info.get("title")
+                media_info.year = cache_info.get("year")
+                media_infos[enclosure] = media_info
+            else:
+                uncached_articles.append(article)
+        if uncached_articles:
+            media_infos.update(zip([article.get('enclosure') for article in uncached_articles],
+                                   self.media.get_media_infos([article.get('title')
+                                                               for article in uncached_articles])))
+        for article in rss_acticles:
+            try:
+                # 种子名
+                title = article.get('title')
+                # 种子链接
+                enclosure = article.get('enclosure')
+                # 种子页面
+                page_url = article.get('link')
+                # 种子大小
+                size = article.get('size')
+                # 开始处理
+                log.info(f"【Rss】开始处理：{title}")
+                # 检查这个种子是不是下过了
+                if not enclosure or enclosure in rssd_enclosures:
+                    log.info(f"【Rss】{title} 已成功订阅过")
+                    continue
+                # 已识别的媒体信息
+                media_info = media_infos.get(enclosure)
+                if not media_info:
+                    log.warn(f"【Rss】{title} 无法识别出媒体信息！")
+                    continue
+                elif not media_info.tmdb_id:
+                    log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
+                # 大小及种子页面
+                media_info.set_torrent_info(size=size,
+                                            page_url=page_url,
+                                            site=site_name,
+                                            site_order=site_order,
+                                            enclosure=enclosure)
+                # 检查种子是否匹配订阅，返回匹配到的订阅ID、是否洗版、总集数、上传因子、下载因子
+                match_flag, match_msg, match_info = self.check_torrent_rss(
+                    media_info=media_info,
+                    rss_movies=rss_movies,
+                    rss_tvs=rss_tvs,
+                    subscribe_index=self._subscribe_index,
+                    site_id=site_id,
+                    site_filter_rule=site_fliter_rule,
+                    site_cookie=site_cookie,
+                    site_parse=site_parse,
+                    site_ua=site_ua,
+                    site_proxy=site_proxy)
+                for msg in match_msg:
+                    log.info(f"【Rss】{msg}")
+
+                # 未匹配
+                if not match_flag:
+                    continue
+
+                # 非模糊匹配命中，检查本地情况，检查删除订阅
+                if not match_info.get("fuzzy_match"):
+                    # 匹配到订阅，如没有TMDB信息则重新查询
+                    if not media_info.tmdb_info and media_info.tmdb_id:
+                        media_info.set_tmdb_info(self.media.get_tmdb_info(mtype=media_info.type,
+                                                                          tmdbid=media_info.tmdb_id))
+                    if not media_info.tmdb_info:
+                        continue
+                    # 非洗版时检查本地是否存在
+                    if not match_info.get("over_edition"):
+                        if media_info.type == MediaType.MOVIE:
+                            exist_flag, rss_no_exists, _ = self.downloader.check_exists_medias(
+                                meta_info=media_info,
+                                no_exists=rss_no_exists
+                            )
+                        else:
+                            # 从登记薄中获取缺失剧集
+                            season = 1
+                            if match_info.get("season"):
+                                season = int(str(match_info.get("season")).replace("S", ""))
+                            # 设定的总集数
+                            total_ep = match_info.get("total")
+                            # 设定的开始集数
+                            current_ep = match_info.get("current_ep")
+                            # 表登记的缺失集数
+                            episodes = self.subscribe.get_subscribe_tv_episodes(match_info.get("id"))
+                            if episodes is None:
+                                episodes = []
+                                if current_ep:
+                                    episodes = list(range(int(current_ep), int(total_ep) + 1))
+                                rss_no_exists[media_info.tmdb_id] = [
+                                    {
+                                        "season": season,
+                                        "episodes": episodes,
+                                        "total_episodes": total_ep
+                                    }
+                                ]
+                            else:
+                                rss_no_exists[media_info.tmdb_id] = [
+                                    {
+                                        "season": season,
+                                        "episodes": episodes,
+                                        "total_episodes": total_ep
+                                    }
+                                ]
+                            # 检查本地媒体库情况
+                            exist_flag, library_no_exists, _ = self.downloader.check_exists_medias(
+                                meta_info=media_info,
+                                total_ep={season: total_ep}
+                            )
+                            # 取交集做为缺失集
+                            rss_no_exists = TorrentUtils.get_intersection_episodes(target=rss_no_exists,
+                                                                              source=library_no_exists,
+                                                                              title=media_info.tmdb_id)
+                            if rss_no_exists.get(media_info.tmdb_id):
+                                log.info("【Rss】%s 订阅缺失季集：%s" % (
+                                    media_info.get_title_string(),
+                                    rss_no_exists.get(media_info.tmdb_id)
+                                ))
+                        # 本地已存在
+                        if exist_flag:
+                            continue
+                    # 洗版模式
+                    else:
+                        # 洗版时季集不完整的资源不要
+                        if media_info.type != MediaType.MOVIE \
+                                and media_info.get_episode_list():
+                            log.info(
+                                f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
+                                f"正在洗版，过滤掉季集不完整的资源：{title}"
+                            )
+                            continue
+                        if not self.subscribe.check_subscribe_over_edition(
+                                rtype=media_info.type,
+                                rssid=match_info.get("id"),
+                                res_order=match_info.get("res_order")):
+                            log.info(
+                                f"【Rss】{media_info.get_title_string()}{media_info.get_season_string()} "
+                                f"正在洗版，跳过低优先级或同优先级资源：{title}"
+                            )
+                            continue
+                # 模糊匹配
+                else:
+                    # 不做处理，直接下载
+                    pass
+
+                # 站点流控
+                if self.sites.check_ratelimit(site_id):
+                    continue
+
+                # 设置种子信息
+                media_info.set_torrent_info(res_order=match_info.get("res_order"),
+                                            filter_rule=match_info.get("filter_rule"),
+                                            over_edition=match_info.get("over_edition"),
+                                            download_volume_factor=match_info.get("download_volume_factor"),
+                                            upload_volume_factor=match_info.get("upload_volume_factor"),
+                                            rssid=match_info.get("id"))
+                # 设置下载参数
+                media_info.set_download_info(download_setting=match_info.get("download_setting"),
+                                             save_path=match_info.get("save_path"))
+                # 待插入数据库历史记录
+                rss_torrents.append(media_info)
+                rssd_enclosures.add(enclosure)
+                # 加入下载列表
+                if media_info not in rss_download_torrents:
+                    rss_download_torrents.append(media_info)
+                    res_num = res_num + 1
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【Rss】处理RSS发生错误：%s" % str(e))
+                continue
+        # 插入数据库历史记录
+        if rss_torrents:
+            self.rsshelper.insert_rss_torrents(rss_torrents)
+        return res_num, rss_no_exists
+
     def check_torrent_rss(self,
                           media_info,
                           rss_movies,
@@ -325,7 +481,8 @@ class Rss:
                           site_cookie,
                           site_parse,
                           site_ua,
-                          site_proxy):
+                          site_proxy,
+                          subscribe_index=None):
         """
         判断种子是否命中订阅
         :param media_info: 已识别的种子媒体信息
@@ -337,6 +494,7 @@ class Rss:
         :param site_parse: 是否解析种子详情
         :param site_ua: 站点请求UA
         :param site_proxy: 是否使用代理
+        :param subscribe_index: 订阅倒排索引，为空时按订阅清单临时建立
         :return: 匹配到的订阅ID、是否洗版、总集数、匹配规则的资源顺序、上传因子、下载因子，匹配的季（电视剧）
         """
         # 默认值
@@ -344,98 +502,21 @@ class Rss:
         match_flag = False
         # 匹配的rss信息
         match_msg = []
-        match_rss_info = {}
         # 上传因素
         upload_volume_factor = None
         # 下载因素
         download_volume_factor = None
         hit_and_run = False
 
-        # 匹配电影
-        if media_info.type == MediaType.MOVIE and rss_movies:
-            for rid, rss_info in rss_movies.items():
-                rss_sites = rss_info.get('rss_sites')
-                # 过滤订阅站点
-                if rss_sites and media_info.site not in rss_sites:
-                    continue
-                # tmdbid或名称年份匹配
-                name = rss_info.get('name')
-                year = rss_info.get('year')
-                tmdbid = rss_info.get('tmdbid')
-                fuzzy_match = rss_info.get('fuzzy_match')
-                # 非模糊匹配
-                if not fuzzy_match:
-                    # 有tmdbid时使用tmdbid匹配
-                    if tmdbid and not tmdbid.startswith("DB:"):
-                        if str(media_info.tmdb_id) != str(tmdbid):
-                            continue
-                    else:
-                        # 豆瓣年份与tmdb取向不同
-                        if year and str(media_info.year) not in [str(year),
-                                                                 str(int(year) + 1),
-                                                                 str(int(year) - 1)]:
-                            continue
-                        if name != media_info.title:
-                            continue
-                # 模糊匹配
-                else:
-                    # 匹配年份
-                    if year and str(year) != str(media_info.year):
-                        continue
-                    # 匹配关键字或正则表达式
-                    search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
-                        continue
-                # 媒体匹配成功
-                match_flag = True
-                match_rss_info = rss_info
-
-                break
-        # 匹配电视剧
-        elif rss_tvs:
-            # 匹配种子标题
-            for rid, rss_info in rss_tvs.items():
-                rss_sites = rss_info.get('rss_sites')
-                # 过滤订阅站点
-                if rss_sites and media_info.site not in rss_sites:
-                    continue
-                # 有tmdbid时精确匹配
-                name = rss_info.get('name')
-                year = rss_info.get('year')
-                season = rss_info.get('season')
-                tmdbid = rss_info.get('tmdbid')
-                fuzzy_match = rss_info.get('fuzzy_match')
-                # 非模糊匹配
-                if not fuzzy_match:
-                    if tmdbid and not tmdbid.startswith("DB:"):
-                        if str(media_info.tmdb_id) != str(tmdbid):
-                            continue
-                    else:
-                        # 匹配年份，年份可以为空
-                        if year and str(year) != str(media_info.year):
-                            continue
-                        # 匹配名称
-                        if name != media_info.title:
-                            continue
-                    # 匹配季，季可以为空
-                    if season and season != media_info.get_season_string():
-                        continue
-                # 模糊匹配
-                else:
-                    # 匹配季，季可以为空
-                    if season and season != "S00" and season != media_info.get_season_string():
-                        continue
-                    # 匹配年份
-                    if year and str(year) != str(media_info.year):
-                        continue
-                    # 匹配关键字或正则表达式
-                    search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
-                        continue
-                # 媒体匹配成功
-                match_flag = True
-                match_rss_info = rss_info
-                break
+        # 匹配订阅
+        match_rss_info = SubscribeHelper.match_subscribe(media_info=media_info,
+                                                         rss_movies=rss_movies,
+                                                         rss_tvs=rss_tvs,
+                                                         subscribe_index=subscribe_index)
+        if match_rss_info:
+            match_flag = True
+        else:
+            match_rss_info = {}
 
         # 名称匹配成功，开始过滤
         if match_flag:
@@ -1,8 +1,9 @@
 import json
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor as FetchExecutor, as_completed
+from threading import Lock
 
-import jsonpath
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -17,10 +18,12 @@ from app.media.meta import MetaInfo
 from app.message import Message
 from app.searcher import Searcher
 from app.subscribe import Subscribe
-from app.utils import RequestUtils, StringUtils, ExceptionUtils
+from app.utils import StringUtils, ExceptionUtils, JsonPath
 from app.utils.commons import singleton
 from app.utils.types import MediaType, SearchType, RssType
-from config import Config
+from config import Config, USERRSS_FETCH_MAX_WORKERS
+
+lock = Lock()
 
 
 @singleton
@@ -38,6 +41,8 @@ class RssChecker(object):
     _scheduler = None
     _rss_tasks = []
     _rss_parsers = []
+    # (任务ID, RSS地址) -> 最近一次耗时、条目数、累计失败次数、最近错误
+    _address_stats = {}
     _site_users = {
         "D": "下载",
         "R": "订阅",
@@ -62,6 +67,10 @@ class RssChecker(object):
         rss_parsers = self.dbhelper.get_userrss_parser()
         self._rss_parsers = []
         for rss_parser in rss_parsers:
+            # 预编译解析器表达式，各任务及报文复用
+            compiled, err_msg = self.__compile_parser(rss_parser.TYPE, rss_parser.FORMAT)
+            if err_msg:
+                log.error(f"【RssChecker】解析器 {rss_parser.NAME} 配置错误：{err_msg}")
             self._rss_parsers.append(
                 {
                     "id": rss_parser.ID,
@@ -69,7 +78,9 @@ class RssChecker(object):
                     "type": rss_parser.TYPE,
                     "format": rss_parser.FORMAT,
                     "params": rss_parser.PARAMS,
-                    "note": rss_parser.NOTE
+                    "note": rss_parser.NOTE,
+                    "compiled": compiled,
+                    "error": err_msg
                 }
             )
         # 读取任务任务列表
@@ -106,10 +117,13 @@ class RssChecker(object):
                 print(str(e))
                 parsers = [task.PARSER]
             state = True if task.STATE in ["Y", "1", True] else False
+            # 各RSS地址的耗时及失败次数
+            address_stats = [self.__get_address_stats(task.ID, address) for address in addresses]
             self._rss_tasks.append({
                 "id": task.ID,
                 "name": task.NAME,
                 "address": addresses,
+                "address_stats": address_stats,
                 "proxy": proxy,
                 "parser": parsers,
                 "interval": task.INTERVAL,
@@ -130,6 +144,10 @@ class RssChecker(object):
                 "filter_args": json.loads(task.FILTER_ARGS)
                 if task.FILTER_ARGS else {"restype": "", "pix": "", "team": ""},
             })
+        # 清理已删除的任务及已修改的地址的统计
+        address_keys = set([(task.get("id"), address)
+                            for task in self._rss_tasks for address in task.get("address")])
+        self._address_stats = {key: stats for key, stats in self._address_stats.items() if key in address_keys}
         if not self._rss_tasks:
             return
         # 启动RSS任务
@@ -405,105 +423,189 @@ class RssChecker(object):
     def __parse_userrss_result(self, taskinfo):
         """
         获取RSS链接数据，根据PARSER进行解析获取返回结果
+        多个RSS地址并发获取，结果按地址顺序合并并去重
         """
-        task_name = taskinfo.get("name")
         rss_urls = taskinfo.get("address")
         rss_parsers = taskinfo.get("parser")
         count = min(len(rss_urls), len(rss_parsers))
+        addresses = [(i, rss_urls[i], rss_parsers[i]) for i in range(count) if rss_urls[i]]
+        if not addresses:
+            return []
+        if len(addresses) == 1:
+            results = {addresses[0][0]: self.__parse_userrss_address(taskinfo, *addresses[0])}
+        else:
+            executor = FetchExecutor(max_workers=min(USERRSS_FETCH_MAX_WORKERS, len(addresses)))
+            try:
+                futures = {executor.submit(self.__parse_userrss_address, taskinfo, *address): address[0]
+                           for address in addresses}
+                results = {futures[future]: future.result() for future in as_completed(futures)}
+            finally:
+                executor.shutdown(wait=False)
+        # 合并去重，优先保留靠前地址的条目
         rss_result = []
-        for i in range(count):
-            rss_url = rss_urls[i]
-            if not rss_url:
-                continue
-            # 检查解析器有效性
-            rss_parser = self.get_userrss_parser(rss_parsers[i])
-            if not rss_parser:
-                log.error(f"【RssChecker】任务 {task_name} RSS地址 {rss_url} 配置解析器不存在")
-                continue
-            parser_name = rss_parser.get("name")
-            if not rss_parser.get("format"):
-                log.error(f"【RssChecker】任务 {task_name} 配置解析器 {parser_name} 格式不正确")
-                continue
+        rss_keys = set()
+        for i, _, _ in addresses:
+            for rss_item in results.get(i) or []:
+                rss_key = rss_item.get("enclosure") or rss_item.get("title")
+                if rss_key:
+                    if rss_key in rss_keys:
+                        continue
+                    rss_keys.add(rss_key)
+                rss_result.append(rss_item)
+        return rss_result
+
+    def __parse_userrss_address(self, taskinfo, i, rss_url, parser_id):
+        """
+        获取并解析单个RSS地址，同时记录地址的耗时及失败次数
+        :return: 解析结果列表
+        """
+        start_time = time.time()
+        rss_result, err_msg = self.__fetch_userrss_address(taskinfo, i, rss_url, parser_id)
+        with lock:
+            address_stats = self.__get_address_stats(taskinfo.get("id"), rss_url)
+            address_stats["latency"] = round(time.time() - start_time, 2)
+            address_stats["count"] = len(rss_result)
+            if err_msg:
+                address_stats["failures"] += 1
+                address_stats["error"] = err_msg
+            else:
+                address_stats["error"] = ""
+        if err_msg:
+            log.error(f"【RssChecker】任务 {taskinfo.get('name')} {err_msg}")
+        return rss_result
+
+    def __get_address_stats(self, taskid, rss_url):
+        """
+        获取RSS地址的统计信息，任务重新加载后保留
+        """
+        return self._address_stats.setdefault((taskid, rss_url), {
+            "latency": None,
+            "count": 0,
+            "failures": 0,
+            "error": ""
+        })
+
+    def __fetch_userrss_address(self, taskinfo, i, rss_url, parser_id):
+        """
+        获取RSS地址数据，根据PARSER进行解析
+        :return: 解析结果列表, 错误信息
+        """
+        rss_result = []
+        # 检查解析器有效性
+        rss_parser = self.get_userrss_parser(parser_id)
+        if not rss_parser:
+            return rss_result, f"RSS地址 {rss_url} 配置解析器不存在"
+        parser_name = rss_parser.get("name")
+        compiled = rss_parser.get("compiled")
+        if not compiled:
+            return rss_result, f"配置解析器 {parser_name} 格式不正确：{rss_parser.get('error')}"
+
+        # 拼装链接
+        if rss_parser.get("params"):
+            _dict = {
+                "TMDBKEY": Config().get_config("app").get("rmt_tmdbkey")
+            }
             try:
-                rss_parser_format = json.loads(rss_parser.get("format"))
+                param_url = rss_parser.get("params").format(**_dict)
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
-                log.error(f"【RssChecker】任务 {task_name} 配置解析器 {parser_name} 不是合法的Json格式")
-                continue
-
-            # 拼装链接
-            if rss_parser.get("params"):
-                _dict = {
-                    "TMDBKEY": Config().get_config("app").get("rmt_tmdbkey")
-                }
-                try:
-                    param_url = rss_parser.get("params").format(**_dict)
-                except Exception as e:
-                    ExceptionUtils.exception_traceback(e)
-                    log.error(f"【RssChecker】任务 {task_name} 配置解析器 {parser_name} 附加参数不合法")
-                    continue
-                rss_url = "%s?%s" % (rss_url, param_url) if rss_url.find("?") == -1 else "%s&%s" % (rss_url, param_url)
-            # 请求数据
+                return rss_result, f"配置解析器 {parser_name} 附加参数不合法"
+            rss_url = "%s?%s" % (rss_url, param_url) if rss_url.find("?") == -1 else "%s&%s" % (rss_url, param_url)
+        # 请求数据
+        try:
+            ret = RssHelper.fetch_feed(rss_url, proxy=taskinfo.get("proxy"))
+            if not ret:
+                return rss_result, f"RSS地址 {rss_url} 请求失败" + (f"，错误码：{ret.status_code}" if ret is not None else "")
+        except Exception as e2:
+            ExceptionUtils.exception_traceback(e2)
+            return rss_result, f"RSS地址 {rss_url} 请求出错：{str(e2)}"
+        # 解析数据 XPATH
+        if rss_parser.get("type") == "XML":
             try:
-                ret = RequestUtils(proxies=Config().get_proxies() if taskinfo.get("proxy") else None
-                                   ).get_res(rss_url)
-                if not ret:
-                    continue
-                ret.encoding = ret.apparent_encoding
-            except Exception as e2:
-                ExceptionUtils.exception_traceback(e2)
-                continue
-            # 解析数据 XPATH
-            if rss_parser.get("type") == "XML":
-                try:
-                    result_tree = etree.XML(ret.text.encode("utf-8"))
-                    item_list = result_tree.xpath(rss_parser_format.get("list")) or []
-                    for item in item_list:
-                        rss_item = {}
-                        for key, attr in rss_parser_format.get("item", {}).items():
-                            if attr.get("path"):
-                                if attr.get("namespaces"):
-                                    value = item.xpath("//ns:%s" % attr.get("path"),
-                                                       namespaces={"ns": attr.get("namespaces")})
-                                else:
-                                    value = item.xpath(attr.get("path"))
-                            elif attr.get("value"):
-                                value = attr.get("value")
-                            else:
-                                continue
-                            if value:
-                                rss_item.update({key: value[0]})
-                        rss_item.update({"address_index": i+1})
-                        rss_result.append(rss_item)
-                except Exception as err:
-                    ExceptionUtils.exception_traceback(err)
-                    log.error(f"【RssChecker】任务 {task_name} RSS地址 {rss_url} 获取的订阅报文无法解析：{str(err)}")
-                    continue
-            elif rss_parser.get("type") == "JSON":
-                try:
-                    result_json = json.loads(ret.text)
-                except Exception as err:
-                    ExceptionUtils.exception_traceback(err)
-                    log.error(f"【RssChecker】任务 {task_name} RSS地址 {rss_url} 获取的订阅报文不是合法的Json格式：{str(err)}")
-                    continue
-                item_list = jsonpath.jsonpath(result_json, rss_parser_format.get("list"))[0]
-                if not isinstance(item_list, list):
-                    log.error(f"【RssChecker】任务 {task_name} RSS地址 {rss_url} 获取的订阅报文list后不是列表")
-                    continue
+                result_tree = etree.XML(ret.text.encode("utf-8"))
+                item_list = compiled.get("list")(result_tree) or []
                 for item in item_list:
                     rss_item = {}
-                    for key, attr in rss_parser_format.get("item", {}).items():
-                        if attr.get("path"):
-                            value = jsonpath.jsonpath(item, attr.get("path"))
-                        elif attr.get("value"):
-                            value = attr.get("value")
-                        else:
-                            continue
+                    for key, path, attr_value in compiled.get("item"):
+                        value = path(item) if path else attr_value
                         if value:
                             rss_item.update({key: value[0]})
                     rss_item.update({"address_index": i+1})
                     rss_result.append(rss_item)
-        return rss_result
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                return rss_result, f"RSS地址 {rss_url} 获取的订阅报文无法解析：{str(err)}"
+        elif rss_parser.get("type") == "JSON":
+            try:
+                result_json = json.loads(ret.text)
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                return rss_result, f"RSS地址 {rss_url} 获取的订阅报文不是合法的Json格式：{str(err)}"
+            item_list = compiled.get("list").find(result_json)
+            item_list = item_list[0] if item_list else None
+            if not isinstance(item_list, list):
+                return rss_result, f"RSS地址 {rss_url} 获取的订阅报文list后不是列表"
+            for item in item_list:
+                rss_item = {}
+                for key, path, attr_value in compiled.get("item"):
+                    value = path.find(item) if path else attr_value
+                    if value:
+                        rss_item.update({key: value[0]})
+                rss_item.update({"address_index": i+1})
+                rss_result.append(rss_item)
+        return rss_result, ""
+
+    @staticmethod
+    def __compile_parser(parser_type, parser_format):
+        """
+        预编译解析器中的XPATH/JSONPATH表达式
+        :param parser_type: 解析器类型 XML/JSON
+        :param parser_format: 解析器格式（Json字符串）
+        :return: {"list": 列表表达式, "item": [(字段, 表达式, 固定值)]}, 错误信息
+        """
+        if not parser_format:
+            return None, "解析器格式为空"
+        try:
+            parser_format = json.loads(parser_format)
+        except Exception as e:
+            return None, f"不是合法的Json格式：{str(e)}"
+        if not isinstance(parser_format, dict) or not parser_format.get("list"):
+            return None, "缺少list配置"
+        if not isinstance(parser_format.get("item") or {}, dict):
+            return None, "item配置必须是字典"
+        try:
+            if parser_type == "XML":
+                list_path = etree.XPath(parser_format.get("list"))
+            elif parser_type == "JSON":
+                list_path = JsonPath(parser_format.get("list"))
+            else:
+                return None, f"不支持的解析器类型：{parser_type}"
+        except Exception as e:
+            return None, f"list表达式 {parser_format.get('list')} 不合法：{str(e)}"
+        items = []
+        for key, attr in (parser_format.get("item") or {}).items():
+            if not isinstance(attr, dict):
+                return None, f"{key} 配置必须是字典"
+            path = None
+            value = None
+            if attr.get("path"):
+                try:
+                    if parser_type == "XML":
+                        if attr.get("namespaces"):
+                            path = etree.XPath("//ns:%s" % attr.get("path"),
+                                               namespaces={"ns": attr.get("namespaces")})
+                        else:
+                            path = etree.XPath(attr.get("path"))
+                    else:
+                        path = JsonPath(attr.get("path"))
+                except Exception as e:
+                    return None, f"{key} 表达式 {attr.get('path')} 不合法：{str(e)}"
+            elif attr.get("value"):
+                value = attr.get("value")
+            else:
+                continue
+            items.append((key, path, value))
+        return {"list": list_path, "item": items}, ""
 
     def get_userrss_parser(self, pid=None):
         if pid:
@@ -601,7 +703,8 @@ class RssChecker(object):
             "rule": taskinfo.get("filter") if taskinfo.get("uses") == "D" else None
         }
         match_flag, res_order, match_msg = self.filter.check_torrent_filter(meta_info=media_info,
-                                                                            filter_args=filter_args)
+                                                                            filter_args=filter_args,
+                                                                            update_stats=False)
         # 未匹配
         if not match_flag:
             log.info(f"【RssChecker】{match_msg}")
@@ -786,12 +889,16 @@ class RssChecker(object):
 
     def update_userrss_parser(self, item):
         """
-        更新自定义RSS解析器
+        更新自定义RSS解析器，保存前先编译校验
         :param item: 解析器信息
+        :return: 是否成功, 错误信息
         """
+        _, err_msg = self.__compile_parser(item.get("type"), item.get("format"))
+        if err_msg:
+            return False, err_msg
         ret = self.dbhelper.update_userrss_parser(item)
         self.init_config()
-        return ret
+        return ret, ""
 
     def get_userrss_task_history(self, task_id):
         """
@@ -5,7 +5,7 @@ from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
 
 import log
-from app.helper import MetaHelper
+from app.helper import MetaHelper, FanartHelper, SearchEngineHelper, RssHelper
 from app.mediaserver import MediaServer
 from app.rss import Rss
 from app.sites import SiteUserInfo
@@ -20,6 +20,7 @@ from config import (
     RSS_REFRESH_TMDB_INTERVAL,
     META_DELETE_UNKNOWN_INTERVAL,
     REFRESH_WALLPAPER_INTERVAL,
+    RSS_HISTORY_PRUNE_INTERVAL,
     Config,
 )
 from web.backend.wallpaper import get_login_wallpaper
@@ -134,6 +135,16 @@ class Scheduler:
             MetaHelper().save_meta_data, "interval", seconds=METAINFO_SAVE_INTERVAL
         )
 
+        # Fanart缓存定时保存
+        self.SCHEDULER.add_job(
+            FanartHelper().save_fanart_data, "interval", seconds=METAINFO_SAVE_INTERVAL
+        )
+
+        # 辅助识别缓存定时保存
+        self.SCHEDULER.add_job(
+            SearchEngineHelper().save_keyword_data, "interval", seconds=METAINFO_SAVE_INTERVAL
+        )
+
         # 定时把队列中的监控文件转移走
         self.SCHEDULER.add_job(
             Sync().transfer_mon_files, "interval", seconds=SYNC_TRANSFER_INTERVAL
@@ -158,6 +169,13 @@ class Scheduler:
             hours=META_DELETE_UNKNOWN_INTERVAL,
         )
 
+        # 定时清理超期的RSS记录
+        self.SCHEDULER.add_job(
+            RssHelper().prune_rss_torrents,
+            "interval",
+            hours=RSS_HISTORY_PRUNE_INTERVAL,
+        )
+
         # 定时刷新壁纸
         self.SCHEDULER.add_job(
             get_login_wallpaper,
@@ -44,13 +44,17 @@ class Searcher:
                       key_word: [str, list],
                       filter_args: dict,
                       match_media=None,
-                      in_from: SearchType = None) -> List[MetaInfo]:
+                      in_from: SearchType = None,
+                      callback=None,
+                      use_cache=True) -> List[MetaInfo]:
         """
         根据关键字调用索引器检查媒体
         :param key_word: 搜索的关键字，不能为空
         :param filter_args: 过滤条件
         :param match_media: 区配的媒体信息
         :param in_from: 搜索渠道
+        :param callback: 每个站点搜索完成后的回调，参数为站点名称、结果、耗时
+        :param use_cache: 是否使用站点原始搜索结果的缓存
         :return: 命中的资源媒体信息列表
         """
         if not key_word:
@@ -64,7 +68,8 @@ class Searcher:
             "filter_args": filter_args,
             "search_type": in_from.value if in_from else None
         })
-        return self.indexer.search_by_keyword(key_word, filter_args, match_media, in_from)
+        return self.indexer.search_by_keyword(key_word, filter_args, match_media, in_from,
+                                              callback=callback, use_cache=use_cache)
 
     def search_one_media(self, media_info,
                          in_from: SearchType,
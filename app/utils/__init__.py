@@ -1,14 +1,15 @@
 from .dom_utils import DomUtils
 from .episode_format import EpisodeFormat
 from .http_utils import RequestUtils
-from .json_utils import JsonUtils
+from .json_utils import JsonUtils, JsonPath
 from .number_utils import NumberUtils
 from .path_utils import PathUtils
 from .string_utils import StringUtils
 from .system_utils import SystemUtils
 from .tokens import Tokens
 from .torrent import TorrentUtils
-from .cache_manager import cacheman, TokenCache, ConfigLoadCache, CategoryLoadCache, OpenAISessionCache
+from .cache_manager import cacheman, TokenCache, ConfigLoadCache, CategoryLoadCache, OpenAISessionCache, \
+    OpenAIMediaNameCache, TmdbDetailCache, RssEnclosureCache, RssFeedCache, IndexerResultCache
 from .exception_utils import ExceptionUtils
 from .rsstitle_utils import RssTitleUtils
 from .nfo_reader import NfoReader
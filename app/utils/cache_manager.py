@@ -3,9 +3,7 @@ import time
 
 from cacheout import CacheManager, LRUCache, Cache
 
-CACHES = {
-    "tmdb_supply": {'maxsize': 200}
-}
+CACHES = {}
 
 cacheman = CacheManager(CACHES, cache_class=LRUCache)
 
@@ -16,3 +14,13 @@ ConfigLoadCache = Cache(maxsize=1, ttl=10, timer=time.time, default=None)
 CategoryLoadCache = Cache(maxsize=2, ttl=3, timer=time.time, default=None)
 
 OpenAISessionCache = Cache(maxsize=100, ttl=3600, timer=time.time, default=None)
+
+OpenAIMediaNameCache = Cache(maxsize=2048, ttl=24*3600, timer=time.time, default=None)
+
+TmdbDetailCache = LRUCache(maxsize=512, ttl=24*3600, timer=time.time, default=None)
+
+RssEnclosureCache = LRUCache(maxsize=20000, ttl=7*24*3600, timer=time.time, default=None)
+
+RssFeedCache = Cache(maxsize=128, ttl=60, timer=time.time, default=None)
+
+IndexerResultCache = Cache(maxsize=512, ttl=300, timer=time.time, default=None)
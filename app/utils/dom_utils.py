@@ -17,6 +17,23 @@ class DomUtils:
                     return firstChild.data
         return default
 
+    @staticmethod
+    def etree_tag_value(tag_item, tag_name, attname="", default=None):
+        """
+        解析lxml节点下的XML标签值，匹配规则同tag_value：取第一个同名且无前缀的子孙节点
+        """
+        for node in tag_item.iter("{*}%s" % tag_name):
+            if node is tag_item or node.prefix:
+                continue
+            if attname:
+                attvalue = node.get(attname)
+                if attvalue:
+                    return attvalue
+            elif node.text:
+                return node.text
+            return default
+        return default
+
     @staticmethod
     def add_node(doc, parent, name, value=None):
         """
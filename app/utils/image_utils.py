@@ -1,6 +1,10 @@
+from io import BytesIO
+
 from PIL import Image
 from collections import Counter
 
+import log
+
 
 class ImageUtils:
 
@@ -20,3 +24,43 @@ class ImageUtils:
         theme_color = '#{:02x}{:02x}{:02x}'.format(*dominant_color)
         # 返回主题色
         return theme_color
+
+    @staticmethod
+    def resize_image(content, width):
+        """
+        按宽度等比缩放图片，原图不大于目标宽度时返回None
+        :param content: 图片内容
+        :param width: 目标宽度
+        :return: 缩放后的图片内容
+        """
+        try:
+            img = Image.open(BytesIO(content))
+            if img.width <= width:
+                return None
+            img_format = img.format if img.format in ["JPEG", "PNG", "WEBP"] else "JPEG"
+            if img_format == "JPEG" and img.mode not in ["RGB", "L"]:
+                img = img.convert("RGB")
+            img.thumbnail((width, round(img.height * width / img.width)), resample=Image.LANCZOS)
+            output = BytesIO()
+            img.save(output, format=img_format, quality=85)
+            return output.getvalue()
+        except Exception as e:
+            log.debug(f"【ImageUtils】图片缩放失败：{str(e)}")
+            return None
+
+    @staticmethod
+    def get_image_mimetype(content, default="image/jpeg"):
+        """
+        根据文件头判断图片类型
+        """
+        if not content:
+            return default
+        if content.startswith(b'\x89PNG'):
+            return "image/png"
+        if content.startswith(b'RIFF') and content[8:12] == b'WEBP':
+            return "image/webp"
+        if content.startswith(b'GIF8'):
+            return "image/gif"
+        if content.startswith(b'\xff\xd8'):
+            return "image/jpeg"
+        return default
@@ -1,6 +1,9 @@
 import json
+import re
 from enum import Enum
 
+import jsonpath
+
 
 class JsonUtils:
 
@@ -22,3 +25,110 @@ class JsonUtils:
                 return str(o)
 
         return json.loads(json.dumps(obj, default=lambda o: _try(o)))
+
+
+class JsonPath:
+    """
+    预编译的JSONPath表达式，结果与jsonpath.jsonpath一致（无匹配时返回False）
+    简单路径（如 $.data.list[0].title）预先拆分为键序列直接取值，其余表达式交由jsonpath处理
+    """
+    _simple_re = re.compile(r"^\$((?:\.[^.\[\]()@?*\s]+|\[\d+]|\['[^']*']|\[\"[^\"]*\"])*)$")
+    _step_re = re.compile(r"\.([^.\[\]]+)|\[(\d+)]|\['([^']*)']|\[\"([^\"]*)\"]")
+    _name_re = re.compile(r"\*|[^.\[\]()'\"\s]+")
+    _subscript_re = re.compile(r"^\*$|^-?\d*:-?\d*(?::-?\d*)?$|"
+                               r"^(?:-?\d+|'[^']*'|\"[^\"]*\"|[\w-]+)(?:\s*,\s*(?:-?\d+|'[^']*'|\"[^\"]*\"|[\w-]+))*$")
+
+    def __init__(self, expr):
+        if not isinstance(expr, str) or not expr.strip():
+            raise ValueError("JSONPath表达式不能为空")
+        self.expr = expr.strip()
+        # jsonpath支持省略开头的$，按相对根节点的路径处理
+        path = self.expr if self.expr.startswith("$") else f"${'' if self.expr.startswith('[') else '.'}{self.expr}"
+        match = self._simple_re.match(path)
+        if match and match.group(1):
+            self._keys = [next(g for g in step.groups() if g is not None)
+                          for step in self._step_re.finditer(match.group(1))]
+        else:
+            self._keys = None
+            self.__check_syntax(path)
+
+    @classmethod
+    def __check_syntax(cls, expr):
+        """
+        检查表达式语法，jsonpath对错误的表达式不报错，只返回无匹配
+        """
+        pos = 1
+        while pos < len(expr):
+            if expr[pos] == "[":
+                end = cls.__find_bracket(expr, pos)
+                cls.__check_subscript(expr, expr[pos + 1:end].strip())
+                pos = end + 1
+                continue
+            if expr.startswith("..", pos):
+                pos += 2
+                if pos < len(expr) and expr[pos] == "[":
+                    continue
+            elif expr[pos] == ".":
+                pos += 1
+            else:
+                raise ValueError(f"JSONPath表达式第{pos + 1}个字符有误：{expr}")
+            match = cls._name_re.match(expr, pos)
+            if not match:
+                raise ValueError(f"JSONPath表达式第{pos + 1}个字符缺少属性名：{expr}")
+            pos = match.end()
+
+    @staticmethod
+    def __find_bracket(expr, start):
+        """
+        查找与start处[配对的]，忽略引号中的内容
+        """
+        depth, quote = 0, None
+        for pos in range(start, len(expr)):
+            char = expr[pos]
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char == "[":
+                depth += 1
+            elif char == "]":
+                depth -= 1
+                if not depth:
+                    return pos
+        raise ValueError(f"JSONPath表达式括号或引号不匹配：{expr}")
+
+    @classmethod
+    def __check_subscript(cls, expr, subscript):
+        """
+        检查[]中的下标、切片、属性名或过滤表达式
+        """
+        if cls._subscript_re.match(subscript):
+            return
+        script = subscript[1:] if subscript.startswith("?") else subscript
+        if not script.startswith("(") or not script.endswith(")"):
+            raise ValueError(f"JSONPath表达式下标有误：[{subscript}]")
+        # 与jsonpath执行过滤表达式时的转换一致，再检查是否为合法的表达式
+        script = script.replace("&&", " and ").replace("||", " or ")
+        script = re.sub(r"!@", " not @", script)
+        script = re.sub(r"(?<!\\)@", "__obj", script)
+        try:
+            compile(script, "<jsonpath>", "eval")
+        except SyntaxError:
+            raise ValueError(f"JSONPath表达式过滤条件有误：[{subscript}]")
+
+    def find(self, obj):
+        """
+        在对象中查找表达式的值
+        :return: 匹配值列表，无匹配时返回False
+        """
+        if self._keys is None:
+            return jsonpath.jsonpath(obj, self.expr)
+        for key in self._keys:
+            if isinstance(obj, dict) and key in obj:
+                obj = obj[key]
+            elif isinstance(obj, list) and key.isdigit() and int(key) < len(obj):
+                obj = obj[int(key)]
+            else:
+                return False
+        return [obj]
@@ -81,39 +81,49 @@ class ReleaseGroupsMatcher(object):
                 release_groups.append(release_group)
         self.__release_groups = '|'.join(release_groups)
 
-    def match(self, title=None, groups=None):
+    def match(self, title=None, groups=None, groups_re=None):
         """
         :param title: 资源标题或文件名
         :param groups: 制作组/字幕组
+        :param groups_re: 已编译的制作组/字幕组正则，批量匹配时使用
         :return: 匹配结果
         """
         if not title:
             return ""
-        unique_groups = self.match_list(title, groups)
+        unique_groups = self.match_list(title, groups, groups_re)
         separator = self.get_separator()
         return separator.join(unique_groups)
 
-    def match_list(self, title=None, groups=None):
+    def match_list(self, title=None, groups=None, groups_re=None):
         """
         :param title: 资源标题或文件名
         :param groups: 制作组/字幕组
+        :param groups_re: 已编译的制作组/字幕组正则，传入时忽略groups
         :return: 匹配结果
         """
         if not title:
             return ""
-        if not groups:
-            if self.custom_release_groups:
-                groups = f"{self.__release_groups}|{self.custom_release_groups}"
-            else:
-                groups = self.__release_groups
+        if not groups_re:
+            groups_re = self.get_groups_re(groups)
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
         # 处理一个制作组识别多次的情况，保留顺序
         unique_groups = []
         for match in re.finditer(groups_re, title):
             unique_groups.append(match.group())
         return unique_groups
 
+    def get_groups_re(self, groups=None):
+        """
+        编译制作组/字幕组正则
+        :param groups: 制作组/字幕组，为空时使用内置及自定义的制作组
+        """
+        if not groups:
+            if self.custom_release_groups:
+                groups = f"{self.__release_groups}|{self.custom_release_groups}"
+            else:
+                groups = self.__release_groups
+        return re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
+
     def get_separator(self):
         return self.custom_separator or "@"
 
@@ -30,6 +30,32 @@ RMT_AUDIO_TRACK_EXT = ['.mka']
 ANIME_GENREIDS = ['16']
 # 索引器默认分类
 INDEXER_CATEGORY = ['MOVIE', 'TV', 'ANIME']
+# 索引器搜索线程池的最大线程数
+INDEXER_SEARCH_MAX_WORKERS = 16
+# 同一站点同时执行的搜索数
+INDEXER_SITE_MAX_CONCURRENCY = 2
+# 交互式搜索与后台搜索的调度权重，每执行该数量的交互式搜索后优先执行一个后台搜索
+INDEXER_INTERACTIVE_WEIGHT = 3
+# 索引器原始搜索结果的缓存时间（秒），同一站点短时间内重复搜索同一关键字时不再请求站点
+INDEXER_RESULT_CACHE_TTL = 300
+# 计算自适应超时时保留的每个站点最近请求耗时数
+INDEXER_LATENCY_WINDOW = 20
+# 自适应超时时间为最近请求耗时P95的倍数，不超过站点默认超时时间
+INDEXER_TIMEOUT_FACTOR = 2
+# 自适应超时时间的下限（秒）
+INDEXER_MIN_TIMEOUT = 5
+# 站点连续失败该次数后熔断，暂停搜索
+INDEXER_BREAKER_FAILURES = 3
+# 站点熔断后的冷却时间（秒），之后放行一次探测请求，探测失败时冷却时间加倍
+INDEXER_BREAKER_COOLDOWN = 300
+# 站点熔断冷却时间的上限（秒）
+INDEXER_BREAKER_MAX_COOLDOWN = 3600
+# 浏览器仿真常驻的浏览器数，即同时打开的页面数上限
+PLAYWRIGHT_MAX_BROWSERS = 2
+# 每个浏览器按站点保留的浏览器上下文数，超出时关闭最久未使用的上下文
+PLAYWRIGHT_MAX_CONTEXTS = 8
+# 浏览器空闲该时间（秒）后关闭，下次使用时重新启动
+PLAYWRIGHT_IDLE_TIMEOUT = 300
 # 默认过滤的文件大小，150M
 RMT_MIN_FILESIZE = 150 * 1024 * 1024
 # 删种检查时间间隔
@@ -42,6 +68,20 @@ METAINFO_SAVE_INTERVAL = 600
 SYNC_TRANSFER_INTERVAL = 60
 # RSS队列中处理时间间隔
 RSS_CHECK_INTERVAL = 300
+# RSS订阅同时下载的站点数
+RSS_FETCH_MAX_WORKERS = 5
+# RSS订阅单个站点的下载超时时间（秒）
+RSS_FETCH_TIMEOUT = 30
+# RSS高水位的容差时间（秒），发布时间早于高水位减去该值的条目直接丢弃
+RSS_WATERMARK_GRACE = 3600
+# RSS处理记录默认保留天数
+RSS_HISTORY_KEEP_DAYS = 180
+# RSS处理记录清理间隔（小时）
+RSS_HISTORY_PRUNE_INTERVAL = 24
+# RSS报文共享缓存时间（秒），订阅、刷流、自定义订阅短时间内获取同一RSS地址时只请求一次
+RSS_FEED_CACHE_TTL = 60
+# 自定义订阅单个任务同时获取的RSS地址数
+USERRSS_FETCH_MAX_WORKERS = 4
 # 刷新订阅TMDB数据的时间间隔（小时）
 RSS_REFRESH_TMDB_INTERVAL = 6
 # 刷流删除的检查时间间隔
@@ -50,6 +90,8 @@ BRUSH_REMOVE_TORRENTS_INTERVAL = 300
 META_DELETE_UNKNOWN_INTERVAL = 12
 # 定时刷新壁纸的间隔（小时）
 REFRESH_WALLPAPER_INTERVAL = 1
+# 媒体详情页各部分查询的截止时间（秒）
+MEDIA_DETAIL_TIMEOUT = 8
 # fanart的api，用于拉取封面图片
 FANART_MOVIE_API_URL = 'https://webservice.fanart.tv/v3/movies/%s?api_key=d2d31f9ecabea050fc7d68aa3146015f'
 FANART_TV_API_URL = 'https://webservice.fanart.tv/v3/tv/%s?api_key=d2d31f9ecabea050fc7d68aa3146015f'
@@ -70,6 +112,8 @@ KEYWORD_SEARCH_WEIGHT_2 = [10, 2, 1]
 KEYWORD_SEARCH_WEIGHT_3 = [10, 2]
 KEYWORD_STR_SIMILARITY_THRESHOLD = 0.2
 KEYWORD_DIFF_SCORE_THRESHOLD = 30
+KEYWORD_BING_URL = "https://www.cn.bing.com/search?q=%s&qs=n&form=QBRE&sp=-1"
+KEYWORD_BAIDU_URL = "https://www.baidu.com/s?ie=utf-8&tn=baiduhome_pg&wd=%s"
 KEYWORD_BLACKLIST = ['中字', '韩语', '双字', '中英', '日语', '双语', '国粤', 'HD', 'BD', '中日', '粤语', '完全版',
                      '法语', '西班牙语', 'HRHDTVAC3264', '未删减版', '未删减', '国语', '字幕组', '人人影视', 'www66ystv',
                      '人人影视制作', '英语', 'www6vhaotv', '无删减版', '完成版', '德意']
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+过滤规则性能测试：NASTOOL_CONFIG=config/config.yaml python -m tests.benchmark_filter
+"""
+import copy
+import time
+
+from app.filter import Filter
+from tests.test_filter import GROUPS, RULES, FILTER_ARGS, build_torrents, legacy_check_rules, \
+    legacy_check_torrent_filter
+
+# 去掉出错的规则，避免耗时被错误日志的输出掩盖
+BENCHMARK_RULES = [rule for rule in RULES if rule.ID not in [4, 5]]
+
+
+def __timeit(func, torrents):
+    torrents = [copy.copy(meta_info) for meta_info in torrents]
+    start = time.perf_counter()
+    results = [func(meta_info) for meta_info in torrents]
+    return time.perf_counter() - start, results
+
+
+def benchmark_rules(_filter, torrents):
+    print(f"规则组匹配，种子 {len(torrents)} 个")
+    for rulegroup in [None, 1, 2]:
+        legacy_cost, legacy_results = __timeit(lambda m: legacy_check_rules(_filter, m, rulegroup), torrents)
+        plan_cost, plan_results = __timeit(lambda m: _filter.check_rules(m, rulegroup), torrents)
+        print(f"规则组 {rulegroup or '默认'}  逐条解析 {legacy_cost:7.3f} 秒  执行计划 {plan_cost:7.3f} 秒  "
+              f"{legacy_cost / plan_cost:5.1f} 倍  结果{'一致' if legacy_results == plan_results else '不一致'}")
+
+
+def benchmark_filters(_filter, torrents):
+    print(f"批量过滤，种子 {len(torrents)} 个")
+    volume_factors = [(m.upload_volume_factor, m.download_volume_factor) for m in torrents]
+    for filter_args in FILTER_ARGS:
+        legacy_cost, legacy_results = __timeit_batch(
+            lambda infos: [legacy_check_torrent_filter(_filter, m, filter_args, *volume_factors[i])
+                           for i, m in enumerate(infos)], torrents)
+        single_cost, single_results = __timeit_batch(
+            lambda infos: [_filter.check_torrent_filter(m, filter_args, *volume_factors[i], update_stats=False)
+                           for i, m in enumerate(infos)], torrents)
+        batch_cost, batch_results = __timeit_batch(
+            lambda infos: _filter.check_torrent_filters(infos, filter_args, volume_factors, update_stats=False),
+            torrents)
+        same = legacy_results == single_results == batch_results
+        print(f"{str(filter_args)}\n    逐个解析 {len(torrents) / legacy_cost:8.0f} 个/秒  "
+              f"逐个过滤 {len(torrents) / single_cost:8.0f} 个/秒  批量过滤 {len(torrents) / batch_cost:8.0f} 个/秒  "
+              f"结果{'一致' if same else '不一致'}")
+
+
+def __timeit_batch(func, torrents, repeat=3):
+    # 取多次运行中的最短耗时，过滤制作组会就地修改种子，每次使用新的副本
+    costs = []
+    for _ in range(repeat):
+        infos = [copy.copy(meta_info) for meta_info in torrents]
+        start = time.perf_counter()
+        results = func(infos)
+        costs.append(time.perf_counter() - start)
+    return min(costs), results
+
+
+def benchmark(count=3000, batch_count=5000):
+    _filter = Filter()
+    groups, rules = _filter._groups, _filter._rules
+    _filter._groups, _filter._rules = GROUPS, BENCHMARK_RULES
+    _filter._Filter__build_rule_plans()
+    try:
+        benchmark_rules(_filter, build_torrents(count))
+        benchmark_filters(_filter, build_torrents(batch_count))
+    finally:
+        _filter._groups, _filter._rules = groups, rules
+        _filter._Filter__build_rule_plans()
+
+
+if __name__ == '__main__':
+    benchmark()
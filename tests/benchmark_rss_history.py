@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+RSS历史记录查询性能测试：python -m tests.benchmark_rss_history
+在临时SQLite数据库中逐步增加RSS_TORRENTS的记录数，对比下载链接查询及写入的耗时
+"""
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.models import RSSTORRENTS
+from app.helper import RssHelper
+
+# 每个RSS的条目数及其中新种子的数量
+FEED_ITEMS = 100
+FEED_NEW_ITEMS = 50
+# 新种子的编号，与已有的历史记录不重复
+NEW_IDS = itertools.count(10 ** 10)
+
+
+def __enclosure(num):
+    return f"https://pt.example.com/download.php?id={num}&passkey=0123456789abcdef0123456789abcdef&https=1"
+
+
+def __fill(engine, start, end, batch=100000):
+    """
+    直接写入历史记录，补齐到指定条数
+    """
+    date = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+    for i in range(start, end, batch):
+        rows = [{
+            "TORRENT_NAME": f"Title.{num}.2023.1080p.WEB-DL.H264-TEST",
+            "ENCLOSURE": __enclosure(num),
+            "ENCLOSURE_HASH": RssHelper.get_enclosure_hash(__enclosure(num)),
+            "TITLE": f"Title {num}",
+            "YEAR": "2023",
+            "DATE": date
+        } for num in range(i, min(i + batch, end))]
+        with engine.begin() as conn:
+            conn.execute(insert(RSSTORRENTS), rows)
+
+
+def __feed(rows, rnd):
+    """
+    生成一个RSS的下载链接，一半为已处理过的历史记录，一半为新种子
+    """
+    olds = [__enclosure(rnd.randrange(rows)) for _ in range(FEED_ITEMS - FEED_NEW_ITEMS)]
+    news = [__enclosure(next(NEW_IDS)) for _ in range(FEED_NEW_ITEMS)]
+    return olds + news
+
+
+def __timeit(func, repeat=5):
+    costs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        costs.append(time.perf_counter() - start)
+    return min(costs) * 1000
+
+
+def benchmark_lookup(session, rows, rnd):
+    enclosures = __feed(rows, rnd)
+    hashes = [RssHelper.get_enclosure_hash(enclosure) for enclosure in enclosures]
+
+    def __count_enclosure():
+        # 原逐条按下载链接统计
+        return [session.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0
+                for enclosure in enclosures]
+
+    def __first_hash():
+        return [session.query(RSSTORRENTS.ID).filter(RSSTORRENTS.ENCLOSURE_HASH == enclosure_hash).first()
+                is not None for enclosure_hash in hashes]
+
+    def __in_hash():
+        ret = session.query(RSSTORRENTS.ENCLOSURE_HASH).filter(RSSTORRENTS.ENCLOSURE_HASH.in_(hashes)).all()
+        found = set([item[0] for item in ret])
+        return [enclosure_hash in found for enclosure_hash in hashes]
+
+    expected = __count_enclosure()
+    same = expected == __first_hash() == __in_hash() and expected.count(True) == FEED_ITEMS - FEED_NEW_ITEMS
+    return __timeit(__count_enclosure), __timeit(__first_hash), __timeit(__in_hash), same
+
+
+def benchmark_insert(session, rows, rnd):
+    def __items():
+        return [{
+            "TORRENT_NAME": "Title.2023.1080p.WEB-DL.H264-TEST",
+            "ENCLOSURE": enclosure,
+            "ENCLOSURE_HASH": RssHelper.get_enclosure_hash(enclosure),
+            "DATE": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        } for enclosure in __feed(rows, rnd)[-FEED_NEW_ITEMS:]]
+
+    def __row_commit():
+        # 原逐条插入并提交
+        for item in __items():
+            session.add(RSSTORRENTS(**item))
+            session.commit()
+
+    def __batch():
+        session.execute(insert(RSSTORRENTS).prefix_with("OR IGNORE"), __items())
+        session.commit()
+
+    return __timeit(__row_commit, repeat=3), __timeit(__batch, repeat=3)
+
+
+def benchmark(sizes=(10000, 100000, 1000000, 3000000)):
+    tmp_path = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'user.db')}")
+    RSSTORRENTS.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    rnd = random.Random(0)
+    print(f"每个RSS {FEED_ITEMS} 个条目，其中新种子 {FEED_NEW_ITEMS} 个，单位毫秒")
+    print(f"{'记录数':>10}  {'逐条链接统计':>8}  {'逐条哈希查询':>8}  {'批量哈希查询':>8}  "
+          f"{'逐条插入提交':>8}  {'批量插入':>8}")
+    try:
+        rows = 0
+        for size in sizes:
+            __fill(engine, rows, size)
+            rows = size
+            count_cost, first_cost, in_cost, same = benchmark_lookup(session, rows, rnd)
+            row_cost, batch_cost = benchmark_insert(session, rows, rnd)
+            print(f"{rows:>13,}  {count_cost:>14.2f}  {first_cost:>14.2f}  {in_cost:>14.2f}  "
+                  f"{row_cost:>14.2f}  {batch_cost:>10.2f}  结果{'一致' if same else '不一致'}")
+    finally:
+        session.close()
+        engine.dispose()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+RSS解析性能测试：python -m tests.benchmark_rss_parse
+将 tests/fixtures/rss/large_feed.xml 中的条目放大为不同规模的报文，分别在独立的进程中解析，
+对比原minidom整体解析与流式解析的耗时、Python对象内存峰值（tracemalloc）及进程常驻内存的增长（ru_maxrss）
+重新生成测试报文：python -m tests.benchmark_rss_parse --fixture
+"""
+import gc
+import hashlib
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+import xml.dom.minidom
+
+from app.helper import RssHelper
+from app.helper.rss_helper import RssFeed
+from app.utils import DomUtils, StringUtils, RssFeedCache
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "rss", "large_feed.xml")
+FEED_URL = "https://rss.example.com/torrentrss.php"
+TAGS = ["1080p", "2160p", "WEB-DL", "BluRay", "REMUX", "HDR", "DoVi", "x264", "x265", "DTS-HD", "TrueHD"]
+
+
+def build_fixture(count=2000, seed=0):
+    """
+    生成测试报文：带CDATA描述、链接中含转义的&、部分条目只有link没有enclosure
+    """
+    rnd = random.Random(seed)
+    items = []
+    for i in range(count):
+        title = f"Title.{i}.{2000 + i % 24}.{'.'.join(rnd.sample(TAGS, 4))}-TEST"
+        enclosure = f'<enclosure url="https://pt.example.com/download.php?id={i}&amp;passkey=' \
+                    f'0123456789abcdef" length="{rnd.randint(1, 80) * 1024 ** 3}" type="application/x-bittorrent"/>' \
+            if i % 10 else ""
+        description = "".join(f"<p>第{n + 1}段简介：{title} 的剧情介绍、演职员表及截图。</p>" for n in range(4))
+        items.append(f"""<item>
+<title><![CDATA[{title} 中文标题{i}]]></title>
+<link>https://pt.example.com/details.php?id={i}&amp;hit=1</link>
+<description><![CDATA[{description}<img src="https://img.example.com/{i}.jpg"/>]]></description>
+{enclosure}
+<author>uploader{i % 37}@example.com</author>
+<category domain="https://pt.example.com/torrents.php?cat={i % 9}">分类{i % 9}</category>
+<guid isPermaLink="false">{hashlib.md5(title.encode("utf-8")).hexdigest()}</guid>
+</item>""")
+    os.makedirs(os.path.dirname(FIXTURE_PATH), exist_ok=True)
+    with open(FIXTURE_PATH, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<rss version="2.0"><channel><title>Torrents</title><link>https://pt.example.com</link>\n')
+        f.write("\n".join(items))
+        f.write("\n</channel></rss>\n")
+
+
+def scale_feed(content, scale):
+    """
+    重复测试报文中的条目，放大报文
+    """
+    head, rest = content.split(b"<item>", 1)
+    body, tail = rest.rsplit(b"</item>", 1)
+    return head + b"".join([b"<item>" + body + b"</item>\n"] * scale) + tail
+
+
+def legacy_parse_rssxml(ret):
+    """
+    原整体解析的实现：按探测到的编码解码全文，再生成minidom文档
+    """
+    ret_array = []
+    dom_tree = xml.dom.minidom.parseString(ret.text)
+    items = dom_tree.documentElement.getElementsByTagName("item")
+    for item in items:
+        title = DomUtils.tag_value(item, "title", default="")
+        if not title:
+            continue
+        description = DomUtils.tag_value(item, "description", default="")
+        link = DomUtils.tag_value(item, "link", default="")
+        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+        if not enclosure and not link:
+            continue
+        if not enclosure and link:
+            enclosure = link
+            link = None
+        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
+        if size and str(size).isdigit():
+            size = int(size)
+        else:
+            size = 0
+        pubdate = DomUtils.tag_value(item, "pubDate", default="")
+        if pubdate:
+            pubdate = StringUtils.get_time_stamp(pubdate)
+        ret_array.append({'title': title,
+                          'enclosure': enclosure,
+                          'size': size,
+                          'description': description,
+                          'link': link,
+                          'pubdate': pubdate})
+    return ret_array
+
+
+def stream_parse_rssxml(ret):
+    """
+    流式解析，报文放入共享下载缓存，parse_rssxml不再发出请求
+    """
+    RssFeedCache.clear()
+    RssFeedCache.set("%s|%s" % (FEED_URL, False), ret)
+    return RssHelper.parse_rssxml(FEED_URL)
+
+
+def run_parse(method, scale):
+    """
+    在独立进程中执行一次解析，返回耗时、tracemalloc峰值、常驻内存增长及结果摘要
+    """
+    with open(FIXTURE_PATH, "rb") as f:
+        content = scale_feed(f.read(), scale)
+    parse = legacy_parse_rssxml if method == "minidom" else stream_parse_rssxml
+    # 预热，加载解析相关的模块
+    parse(RssFeed(200, {}, content[:content.index(b"</item>") + 7] + b"</channel></rss>"))
+    ret = RssFeed(200, {}, content)
+    gc.collect()
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = parse(ret)
+    cost = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) * 1024
+    digest = hashlib.md5(repr(results).encode("utf-8")).hexdigest()
+    return len(content), len(results), cost, traced_peak, rss_growth, digest
+
+
+def benchmark(scales=(1, 5, 10)):
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'条目数':>6} {'报文大小':>6}  {'方式':<8} {'耗时':>8} {'Python内存峰值':>10} {'常驻内存增长':>8}")
+    for scale in scales:
+        digests = set()
+        for method in ["minidom", "iterparse"]:
+            with ctx.Pool(1) as pool:
+                size, count, cost, traced_peak, rss_growth, digest = pool.apply(run_parse, (method, scale))
+            digests.add(digest)
+            print(f"{count:>9,} {size / 1024 ** 2:>8.1f}MB  {method:<10} {cost:>8.3f}秒 "
+                  f"{traced_peak / 1024 ** 2:>14.1f}MB {rss_growth / 1024 ** 2:>14.1f}MB")
+        print(f"{'':>20}结果{'一致' if len(digests) == 1 else '不一致'}")
+
+
+if __name__ == '__main__':
+    if "--fixture" in sys.argv:
+        build_fixture()
+    else:
+        benchmark()
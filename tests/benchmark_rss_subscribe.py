@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+RSS订阅匹配性能测试：python -m tests.benchmark_rss_subscribe
+"""
+import time
+
+from app.helper import SubscribeHelper
+from tests.test_rss_subscribe import build_subscribes, build_items, linear_match
+
+
+def benchmark(subscribe_count=1000, item_count=5000):
+    rss_movies, rss_tvs = build_subscribes(subscribe_count)
+    items = build_items(item_count, subscribe_count)
+    print(f"订阅 {subscribe_count} 个，种子 {item_count} 个")
+
+    start = time.perf_counter()
+    expected = [linear_match(media_info, rss_movies, rss_tvs) for media_info in items]
+    linear_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    subscribe_index = SubscribeHelper.build_subscribe_index(rss_movies, rss_tvs)
+    build_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [SubscribeHelper.match_subscribe(media_info, rss_movies, rss_tvs, subscribe_index)
+               for media_info in items]
+    index_cost = time.perf_counter() - start
+
+    same = all((r or {}).get("id") == (e or {}).get("id") for r, e in zip(results, expected))
+    print(f"逐个匹配    {linear_cost:8.3f} 秒")
+    print(f"建立索引    {build_cost:8.4f} 秒")
+    print(f"索引匹配    {index_cost:8.3f} 秒  {linear_cost / index_cost:6.1f} 倍")
+    print(f"命中 {len([e for e in expected if e])} 个，结果{'一致' if same else '不一致'}")
+
+
+if __name__ == '__main__':
+    benchmark()
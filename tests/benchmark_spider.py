@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+站点页面解析性能测试：python -m tests.benchmark_spider
+"""
+import time
+
+from app.indexer.client import TorrentSpider
+from tests.test_torrent_spider import load_fixture, FIXTURE_PATH, SITE_PATH
+
+FIXTURES = [("nyaa", SITE_PATH), ("torrentgalaxy", SITE_PATH), ("dmhy", SITE_PATH), ("nexusphp", FIXTURE_PATH)]
+
+
+def benchmark(seconds=2):
+    for name, site_path in FIXTURES:
+        indexer, html = load_fixture(name, site_path=site_path)
+        rows = len(TorrentSpider(indexer).parse(html)[1])
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            TorrentSpider(indexer).parse(html)
+            count += 1
+        cost = (time.perf_counter() - start) / count
+        print(f"{name:16s}{rows:6d} 条  {cost * 1000:8.2f} 毫秒/页  {rows / cost:10.0f} 条/秒")
+
+
+if __name__ == '__main__':
+    benchmark()
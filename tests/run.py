@@ -1,11 +1,60 @@
 import unittest
 
 from tests.test_metainfo import MetaInfoTest
+from tests.test_search_engine import SearchEngineTest
+from tests.test_openai_helper import OpenAiHelperTest
+from tests.test_rss_helper import RssHelperTest
+from tests.test_rss_subscribe import RssSubscribeTest
+from tests.test_search_pool import SearchPoolTest
+from tests.test_indexer_health import IndexerHealthTest
+from tests.test_torrent_spider import TorrentSpiderTest
+from tests.test_browser_pool import BrowserPoolTest
+from tests.test_json_path import JsonPathTest
+from tests.test_filter import FilterTest
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
     # 测试名称识别
     suite.addTest(MetaInfoTest('test_metainfo'))
+    # 测试辅助识别缓存
+    suite.addTest(SearchEngineTest('test_search_engine_cache'))
+    suite.addTest(SearchEngineTest('test_search_engine_budget'))
+    # 测试ChatGPT批量识别
+    suite.addTest(OpenAiHelperTest('test_media_name_batch'))
+    suite.addTest(OpenAiHelperTest('test_media_name_coalesce'))
+    # 测试RSS条件请求
+    suite.addTest(RssHelperTest('test_rss_conditional_etag'))
+    suite.addTest(RssHelperTest('test_rss_conditional_hash'))
+    suite.addTest(RssHelperTest('test_rss_conditional_persist'))
+    # 测试RSS容错解析
+    suite.addTest(RssHelperTest('test_rss_malformed'))
+    # 测试RSS共享下载
+    suite.addTest(RssHelperTest('test_rss_fetch_shared'))
+    suite.addTest(RssHelperTest('test_rss_fetch_decoded'))
+    # 测试RSS订阅倒排索引
+    suite.addTest(RssSubscribeTest('test_rss_subscribe_index'))
+    # 测试搜索线程池
+    suite.addTest(SearchPoolTest('test_search_pool_limit'))
+    suite.addTest(SearchPoolTest('test_search_pool_fair'))
+    suite.addTest(SearchPoolTest('test_search_pool_burst'))
+    # 测试索引站点自适应超时及熔断
+    suite.addTest(IndexerHealthTest('test_indexer_adaptive_timeout'))
+    suite.addTest(IndexerHealthTest('test_indexer_breaker'))
+    # 测试站点页面解析
+    suite.addTest(TorrentSpiderTest('test_torrent_spider_layouts'))
+    suite.addTest(TorrentSpiderTest('test_torrent_spider_nexusphp'))
+    # 测试JSONPath表达式
+    suite.addTest(JsonPathTest('test_json_path_find'))
+    suite.addTest(JsonPathTest('test_json_path_invalid'))
+    # 测试过滤规则执行计划
+    suite.addTest(FilterTest('test_filter_rule_plans'))
+    # 测试批量过滤种子
+    suite.addTest(FilterTest('test_filter_batch'))
+    # 测试浏览器池
+    suite.addTest(BrowserPoolTest('test_browser_pool_reuse'))
+    suite.addTest(BrowserPoolTest('test_browser_pool_limit'))
+    suite.addTest(BrowserPoolTest('test_browser_pool_health'))
+    suite.addTest(BrowserPoolTest('test_browser_pool_idle'))
 
     # 运行测试
     runner = unittest.TextTestRunner()
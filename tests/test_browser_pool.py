@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, SkipTest
+
+from playwright.sync_api import sync_playwright
+
+from app.indexer.client.browser import BrowserPool, PlaywrightHelper, WaitElement
+
+PAGE_HTML = """<html><head><title>test</title></head>
+<body><table class="torrents"><tr><td>Movie.2023.1080p.WEB-DL.H264-TEST</td></tr></table></body></html>
+"""
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def do_GET(self):
+        with _PageHandler.lock:
+            _PageHandler.running += 1
+            _PageHandler.max_running = max(_PageHandler.max_running, _PageHandler.running)
+        try:
+            if self.path == "/slow":
+                time.sleep(0.3)
+            data = PAGE_HTML.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with _PageHandler.lock:
+                _PageHandler.running -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class BrowserPoolTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        try:
+            with sync_playwright() as playwright:
+                installed = os.path.exists(playwright.chromium.executable_path)
+        except Exception:
+            installed = False
+        if not installed:
+            raise SkipTest("chromium is not installed")
+
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _PageHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.host = "http://127.0.0.1:%s" % self.server.server_port
+        self.pool = BrowserPool(max_browsers=2, idle_timeout=1)
+        self.chrome = PlaywrightHelper(pool=self.pool)
+        _PageHandler.running = 0
+        _PageHandler.max_running = 0
+
+    def tearDown(self) -> None:
+        self.pool.shutdown()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_browser_pool_reuse(self):
+        for _ in range(3):
+            self.assertIn("Movie.2023.1080p", self.chrome.get_page_source(url=self.host + "/index.html"))
+        # 浏览器只启动一次，同一站点复用上下文
+        stats = self.pool.get_stats()
+        self.assertEqual((stats.get("launches"), stats.get("created"), stats.get("reuses")), (1, 1, 2))
+        # 未带Cookie的页面操作使用独立的上下文
+        title = self.chrome.action(url=self.host + "/index.html", callback=lambda page: page.title())
+        self.assertEqual(title, "test")
+        stats = self.pool.get_stats()
+        self.assertEqual((stats.get("launches"), stats.get("created"), stats.get("contexts")), (1, 2, 1))
+
+    def test_browser_pool_limit(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.chrome.get_page_source(url=self.host + "/slow"))) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 同时打开的页面数及启动的浏览器数不超过上限
+        self.assertEqual(len([result for result in results if "Movie.2023.1080p" in result]), 6)
+        self.assertLessEqual(_PageHandler.max_running, 2)
+        self.assertLessEqual(self.pool.get_stats().get("launches"), 2)
+
+    def test_browser_pool_health(self):
+        # 浏览器断开后，下次使用时重新启动
+        self.pool.submit(lambda page: page.context.browser.close(), url=self.host).result()
+        self.assertIn("Movie.2023.1080p", self.chrome.get_page_source(url=self.host + "/index.html"))
+        stats = self.pool.get_stats()
+        self.assertEqual((stats.get("launches"), stats.get("restarts")), (2, 1))
+        # 页面操作出错后不再复用该站点的上下文
+        self.assertIsNone(self.chrome.get_page_source(url=self.host + "/index.html",
+                                                      wait_item=WaitElement("#missing", "attached"),
+                                                      timeout=1))
+        self.assertEqual(self.pool.get_stats().get("contexts"), 0)
+        self.assertIn("Movie.2023.1080p", self.chrome.get_page_source(url=self.host + "/index.html"))
+        self.assertEqual(self.pool.get_stats().get("created"), 3)
+
+    def test_browser_pool_idle(self):
+        self.assertIn("Movie.2023.1080p", self.chrome.get_page_source(url=self.host + "/index.html"))
+        self.assertEqual(self.pool.get_stats().get("browsers"), 1)
+        # 空闲超时后关闭浏览器，再次使用时重新启动
+        time.sleep(2)
+        stats = self.pool.get_stats()
+        self.assertEqual((stats.get("threads"), stats.get("browsers")), (0, 0))
+        self.assertIn("Movie.2023.1080p", self.chrome.get_page_source(url=self.host + "/index.html"))
+        self.assertEqual(self.pool.get_stats().get("launches"), 2)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+import copy
+import random
+import re
+from unittest import TestCase
+
+import log
+from app.conf import ModuleConf
+from app.db.models import CONFIGFILTERGROUP, CONFIGFILTERRULES
+from app.filter import Filter
+from app.media.meta import MetaBase
+from app.utils import StringUtils
+from app.utils.types import MediaType
+
+GROUPS = [
+    CONFIGFILTERGROUP(ID=1, GROUP_NAME="默认", IS_DEFAULT="Y", NOTE=""),
+    CONFIGFILTERGROUP(ID=2, GROUP_NAME="高清", IS_DEFAULT="N", NOTE="")
+]
+
+RULES = [
+    CONFIGFILTERRULES(ID=1, GROUP_ID="1", ROLE_NAME="蓝光", PRIORITY="1",
+                      INCLUDE="BLU-?RAY\n1080P|2160P", EXCLUDE="REMUX", SIZE_LIMIT="2,40", NOTE=None),
+    CONFIGFILTERRULES(ID=2, GROUP_ID="1", ROLE_NAME="WEB", PRIORITY="2",
+                      INCLUDE="WEB-?DL", EXCLUDE="\nCAM\nTS", SIZE_LIMIT="30", NOTE="1.0 0.0"),
+    CONFIGFILTERRULES(ID=3, GROUP_ID="1", ROLE_NAME="其它", PRIORITY="3",
+                      INCLUDE="", EXCLUDE="", SIZE_LIMIT=None, NOTE=None),
+    CONFIGFILTERRULES(ID=4, GROUP_ID="2", ROLE_NAME="错误正则", PRIORITY="1",
+                      INCLUDE="2160P\n(HDR", EXCLUDE="", SIZE_LIMIT="", NOTE=None),
+    CONFIGFILTERRULES(ID=5, GROUP_ID="2", ROLE_NAME="4K", PRIORITY="x",
+                      INCLUDE="2160P", EXCLUDE="", SIZE_LIMIT="10,", NOTE="2.0 0.0"),
+    CONFIGFILTERRULES(ID=6, GROUP_ID="2", ROLE_NAME="1080P", PRIORITY="5",
+                      INCLUDE="1080P", EXCLUDE="X264", SIZE_LIMIT="1,20", NOTE="1.0 1.0")
+]
+
+TOKENS = ["BluRay", "Blu-ray", "WEB-DL", "WEBDL", "REMUX", "CAM", "1080p", "2160p", "720p",
+          "HDR", "DoVi", "x264", "x265", "H264", "DTS", "TrueHD", "AAC"]
+TEAMS = ["CHD", "FRDS", "HDS", "MTeam", "NoGroup"]
+
+FILTER_ARGS = [
+    {},
+    {"rule": -1},
+    {"rule": 2},
+    {"restype": "BLURAY", "pix": "1080p"},
+    {"restype": "WEB", "pix": "4k", "rule": 1},
+    {"team": "CHD|FRDS"},
+    {"team": "CHD", "rule": -1},
+    {"include": "x26[45]", "exclude": "CAM|720p", "key": "Title"},
+    {"sp_state": "* 0.0", "rule": -1},
+    {"sp_state": "2.0 *"},
+    {"restype": "REMUX", "include": "HDR", "team": "MTeam|HDS", "sp_state": "1.0 *", "rule": -1}
+]
+
+
+def build_torrents(count, seed=0):
+    """
+    生成已识别的种子，覆盖各分辨率、质量、大小、集数及促销
+    """
+    rnd = random.Random(seed)
+    torrents = []
+    for i in range(count):
+        tokens = rnd.sample(TOKENS, rnd.randint(1, 5))
+        team = rnd.choice(TEAMS)
+        title = f"Title.{i}.{2000 + i % 24}.{'.'.join(tokens)}-{team}"
+        meta_info = MetaBase(title)
+        meta_info.rev_string = title
+        meta_info.subtitle = rnd.choice([None, "", "中字", "国语 2160p"])
+        meta_info.type = rnd.choice([MediaType.MOVIE, MediaType.TV])
+        meta_info.total_episodes = rnd.choice([0, 1, 8, 24]) if meta_info.type == MediaType.TV else 0
+        meta_info.size = rnd.choice([0, rnd.randint(1, 60) * 1024 ** 3, f"{rnd.randint(1, 60)}.5 GB"])
+        meta_info.resource_pix = next((t for t in tokens if t.endswith("p")), None)
+        meta_info.resource_type = next((t for t in tokens if t.lower().startswith(("blu", "web", "remux"))), None)
+        # 部分未识别制作组，过滤制作组时从标题中匹配
+        meta_info.resource_team = team if rnd.random() < 0.5 else None
+        meta_info.upload_volume_factor, meta_info.download_volume_factor = \
+            rnd.choice([(None, None), (1.0, 1.0), (1.0, 0.0), (2.0, 0.0), (1.0, 0.5)])
+        torrents.append(meta_info)
+    return torrents
+
+
+def legacy_check_rules(_filter, meta_info, rulegroup=None):
+    """
+    编译规则组执行计划前逐条解析规则的实现
+    """
+    if not meta_info:
+        return False, 0, ""
+    if rulegroup and int(rulegroup) == -1:
+        return True, 0, "不过滤"
+    title = meta_info.rev_string
+    if meta_info.subtitle:
+        title = f"{title} {meta_info.subtitle}"
+    if not rulegroup:
+        rulegroup = _filter.get_rule_groups(default=True)
+        if not rulegroup:
+            return True, 0, "未配置过滤规则"
+    else:
+        rulegroup = _filter.get_rule_groups(groupid=rulegroup)
+    filters = _filter.get_rules(groupid=rulegroup.get("id"))
+    order_seq = 0
+    group_match = True
+    for filter_info in filters:
+        try:
+            rule_match = True
+            order_seq = 100 - int(filter_info.get('pri'))
+            includes = filter_info.get('include')
+            if includes and rule_match:
+                include_flag = True
+                for include in includes:
+                    if not include:
+                        continue
+                    if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
+                        include_flag = False
+                        break
+                if not include_flag:
+                    rule_match = False
+            excludes = filter_info.get('exclude')
+            if excludes and rule_match:
+                exclude_flag = False
+                exclude_count = 0
+                for exclude in excludes:
+                    if not exclude:
+                        continue
+                    exclude_count += 1
+                    if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
+                        exclude_flag = True
+                if exclude_count > 0 and not exclude_flag:
+                    rule_match = False
+            sizes = filter_info.get('size')
+            if sizes and rule_match and meta_info.size:
+                meta_info.size = StringUtils.num_filesize(meta_info.size)
+                if sizes.find(',') != -1:
+                    sizes = sizes.split(',')
+                    begin_size = int(sizes[0].strip()) if sizes[0].isdigit() else 0
+                    end_size = int(sizes[1].strip()) if sizes[1].isdigit() else 0
+                else:
+                    begin_size = 0
+                    end_size = int(sizes.strip()) if sizes.isdigit() else 0
+                if meta_info.type == MediaType.MOVIE:
+                    if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
+                        rule_match = False
+                else:
+                    if meta_info.total_episodes \
+                            and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(
+                                meta_info.total_episodes) <= end_size * 1024 ** 3:
+                        rule_match = False
+            free = filter_info.get("free")
+            if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
+                ul_factor, dl_factor = free.split()
+                if float(ul_factor) > meta_info.upload_volume_factor \
+                        or float(dl_factor) < meta_info.download_volume_factor:
+                    rule_match = False
+            if rule_match:
+                return True, order_seq, rulegroup.get("name")
+            else:
+                group_match = False
+        except Exception as err:
+            log.debug(f"【Filter】过滤规则出现严重错误 {err}，请检查：{filter_info}")
+    if not group_match:
+        return False, 0, rulegroup.get("name")
+    return True, order_seq, rulegroup.get("name")
+
+
+def legacy_check_torrent_filter(_filter, meta_info, filter_args, uploadvolumefactor=None, downloadvolumefactor=None):
+    """
+    批量过滤前逐个种子解析过滤条件的实现
+    """
+    text = meta_info.rev_string
+    if meta_info.subtitle:
+        text = f"{text} {meta_info.subtitle}"
+    if filter_args.get("restype"):
+        restype_re = ModuleConf.TORRENT_SEARCH_PARAMS["restype"].get(filter_args.get("restype"))
+        if not meta_info.get_edtion_string():
+            return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
+        if restype_re and not re.search(r"%s" % restype_re, meta_info.get_edtion_string(), re.I):
+            return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
+    if filter_args.get("pix"):
+        pix_re = ModuleConf.TORRENT_SEARCH_PARAMS["pix"].get(filter_args.get("pix"))
+        if not meta_info.resource_pix:
+            return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
+        if pix_re and not re.search(r"%s" % pix_re, meta_info.resource_pix, re.I):
+            return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
+    if filter_args.get("team"):
+        team = filter_args.get("team")
+        if not meta_info.resource_team:
+            resource_team = _filter.rg_matcher.match(title=meta_info.rev_string, groups=team)
+            if not resource_team:
+                return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
+            else:
+                meta_info.resource_team = resource_team
+        elif not re.search(r"%s" % team, meta_info.resource_team, re.I):
+            return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
+    if filter_args.get("sp_state"):
+        ul_factor, dl_factor = filter_args.get("sp_state").split()
+        if uploadvolumefactor and ul_factor not in ("*", str(uploadvolumefactor)):
+            return False, 0, f"{meta_info.org_string} 不符合促销要求"
+        if downloadvolumefactor and dl_factor not in ("*", str(downloadvolumefactor)):
+            return False, 0, f"{meta_info.org_string} 不符合促销要求"
+    if filter_args.get("include"):
+        include = filter_args.get("include")
+        if not re.search(r"%s" % include, text, re.I):
+            return False, 0, f"{meta_info.org_string} 不符合包含 {include} 要求"
+    if filter_args.get("exclude"):
+        exclude = filter_args.get("exclude")
+        if re.search(r"%s" % exclude, text, re.I):
+            return False, 0, f"{meta_info.org_string} 不符合排除 {exclude} 要求"
+    if filter_args.get("key"):
+        key = filter_args.get("key")
+        if not re.search(r"%s" % key, text, re.I):
+            return False, 0, f"{meta_info.org_string} 不符合 {key} 要求"
+    match_flag, order_seq, rule_name = legacy_check_rules(_filter, meta_info, filter_args.get("rule"))
+    match_msg = "%s 大小：%s 促销：%s 不符合%s过滤规则 %s 要求" % (
+        meta_info.org_string,
+        StringUtils.str_filesize(meta_info.size),
+        meta_info.get_volume_factor_string(),
+        "订阅/站点" if filter_args.get("rule") else "默认",
+        rule_name
+    )
+    return match_flag, order_seq, match_msg
+
+
+class FilterTest(TestCase):
+    def setUp(self) -> None:
+        self.filter = Filter()
+        self._groups, self._rules = self.filter._groups, self.filter._rules
+        self._rule_stats = copy.deepcopy(self.filter._rule_stats)
+        self.filter._groups, self.filter._rules = GROUPS, RULES
+        self.filter._Filter__build_rule_plans()
+
+    def tearDown(self) -> None:
+        self.filter._groups, self.filter._rules = self._groups, self._rules
+        self.filter._Filter__build_rule_plans()
+        self.filter._rule_stats.clear()
+        self.filter._rule_stats.update(self._rule_stats)
+
+    def test_filter_rule_plans(self):
+        # 编译后的规则组与逐条解析规则的结果一致，包括错误正则、错误优先级及大小的就地换算
+        for rulegroup in [None, 1, 2, -1]:
+            for meta_info in build_torrents(300):
+                legacy_info = copy.copy(meta_info)
+                self.assertEqual(self.filter.check_rules(meta_info, rulegroup),
+                                 legacy_check_rules(self.filter, legacy_info, rulegroup),
+                                 f"{rulegroup} {meta_info.rev_string}")
+                self.assertEqual(meta_info.size, legacy_info.size)
+
+    def test_filter_batch(self):
+        # 批量过滤与逐个过滤、原逐个解析过滤条件的结果一致，包括识别出的制作组
+        torrents = build_torrents(500)
+        volume_factors = [(m.upload_volume_factor, m.download_volume_factor) for m in torrents]
+        for filter_args in FILTER_ARGS:
+            batch_infos = [copy.copy(meta_info) for meta_info in torrents]
+            single_infos = [copy.copy(meta_info) for meta_info in torrents]
+            legacy_infos = [copy.copy(meta_info) for meta_info in torrents]
+            results = self.filter.check_torrent_filters(batch_infos, filter_args, volume_factors,
+                                                        update_stats=False)
+            self.assertEqual(len(results), len(torrents))
+            for i, result in enumerate(results):
+                self.assertEqual(result, self.filter.check_torrent_filter(single_infos[i], filter_args,
+                                                                          *volume_factors[i],
+                                                                          update_stats=False))
+                self.assertEqual(result, legacy_check_torrent_filter(self.filter, legacy_infos[i], filter_args,
+                                                                     *volume_factors[i]),
+                                 f"{filter_args} {torrents[i].rev_string}")
+                self.assertEqual((batch_infos[i].resource_team, batch_infos[i].size),
+                                 (legacy_infos[i].resource_team, legacy_infos[i].size))
+            self.assertTrue(any(result[0] for result in results), filter_args)
+        # 不传促销因子时不过滤促销，未通过时可同时返回过滤说明
+        results = self.filter.check_torrent_filters(torrents[:20], {"sp_state": "2.0 0.0", "rule": -1},
+                                                    explain=True, update_stats=False)
+        self.assertTrue(all(result[0] and result[3].get("stage") is None for result in results))
+        self.assertEqual(self.filter.check_torrent_filters([], {}), [])
+        # 测试过滤不累计规则命中统计
+        self.assertEqual(self.filter._rule_stats, self._rule_stats)
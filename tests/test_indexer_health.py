@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from app.indexer.indexer_health import IndexerHealth, BREAKER_OPEN, BREAKER_HALF_OPEN, BREAKER_CLOSED
+
+
+class IndexerHealthTest(TestCase):
+    def setUp(self) -> None:
+        self.now = 1000.0
+        self.health = IndexerHealth(window=20, factor=2, min_timeout=5, failures=3,
+                                    cooldown=60, max_cooldown=300, timer=lambda: self.now)
+
+    def test_indexer_adaptive_timeout(self):
+        # 样本不足时使用默认超时时间
+        self.assertEqual(self.health.get_timeout("site", 15), 15)
+        for seconds in [1.0] * 18 + [3.2, 3.5]:
+            self.health.record("site", seconds, success=True)
+        # P95为3.2秒，超时时间为其2倍并向上取整
+        self.assertEqual(self.health.get_timeout("site", 15), 7)
+        # 不超过默认超时时间，不低于下限
+        self.assertEqual(self.health.get_timeout("site", 6), 6)
+        for _ in range(20):
+            self.health.record("fast", 0.5, success=True)
+        self.assertEqual(self.health.get_timeout("fast", 15), 5)
+        self.assertEqual(self.health.get_stats().get("site").get("p95"), 3.2)
+
+    def test_indexer_breaker(self):
+        # 连续失败达到阈值后熔断
+        for _ in range(2):
+            self.health.record("dead", 10, success=False)
+            self.assertTrue(self.health.allow("dead"))
+        self.health.record("dead", 10, success=False)
+        self.assertFalse(self.health.allow("dead"))
+        self.assertEqual(self.health.get_stats().get("dead").get("state"), BREAKER_OPEN)
+        self.assertEqual(self.health.get_stats().get("dead").get("retry"), 60)
+        # 冷却结束后只放行一次探测
+        self.now += 60
+        self.assertTrue(self.health.allow("dead"))
+        self.assertFalse(self.health.allow("dead"))
+        self.assertEqual(self.health.get_stats().get("dead").get("state"), BREAKER_HALF_OPEN)
+        # 探测失败，冷却时间加倍
+        self.health.record("dead", 10, success=False)
+        self.now += 60
+        self.assertFalse(self.health.allow("dead"))
+        self.now += 60
+        self.assertTrue(self.health.allow("dead"))
+        # 探测成功后恢复
+        self.health.record("dead", 1, success=True)
+        self.assertTrue(self.health.allow("dead"))
+        self.assertEqual(self.health.get_stats().get("dead").get("state"), BREAKER_CLOSED)
+        # 成功会重置连续失败次数
+        for success in [False, False, True, False, False]:
+            self.health.record("flaky", 1, success=success)
+        self.assertTrue(self.health.allow("flaky"))
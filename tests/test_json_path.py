@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from app.utils import JsonPath
+
+
+class JsonPathTest(TestCase):
+    def test_json_path_find(self):
+        obj = {"data": {"list": [{"title": "a", "size": 1}, {"title": "b", "size": 2}]}}
+        self.assertEqual(JsonPath("$.data.list[1].title").find(obj), ["b"])
+        self.assertEqual(JsonPath("title").find({"title": "a"}), ["a"])
+        self.assertEqual(JsonPath("$.data.list[?(@.size>1)].title").find(obj), ["b"])
+        self.assertEqual(JsonPath("$..title").find(obj), ["a", "b"])
+        self.assertFalse(JsonPath("$.data.none").find(obj))
+
+    def test_json_path_invalid(self):
+        # jsonpath对错误的表达式只返回无匹配，保存解析器时需提前报错
+        for expr in ["", "$..[", "$.a[?(@.x==", "foo bar", "$.", "$.a[?(@.x=1)]", "$.a[1:2:3:4]"]:
+            with self.assertRaises(ValueError, msg=expr):
+                JsonPath(expr)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import openai
+
+from app.helper.openai_helper import OpenAiHelper
+from app.utils import OpenAIMediaNameCache
+
+
+class _FakeCompletionHandler(BaseHTTPRequestHandler):
+    requests = []
+    # 未放行时请求挂起，模拟进行中的识别
+    gate = threading.Event()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        _FakeCompletionHandler.requests.append(body)
+        _FakeCompletionHandler.gate.wait(10)
+        content = body.get("messages")[-1].get("content")
+        try:
+            names = json.loads(content)
+        except ValueError:
+            names = None
+        if isinstance(names, list):
+            answer = [{"title": str(name).split(".")[0], "year": "2023"} for name in names]
+        else:
+            answer = {"title": str(content).split(".")[0], "year": "2023"}
+        ret = {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-3.5-turbo",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(answer)},
+                "finish_reason": "stop"
+            }]
+        }
+        data = json.dumps(ret).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class OpenAiHelperTest(TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeCompletionHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.helper = OpenAiHelper()
+        # 单例及openai模块的配置在测试后恢复，避免后续测试请求已关闭的端口
+        self._config = (self.helper._api_key, openai.api_key, openai.base_url)
+        self.helper._api_key = "sk-test"
+        openai.api_key = "sk-test"
+        openai.base_url = "http://127.0.0.1:%s/v1/" % self.server.server_port
+        OpenAIMediaNameCache.clear()
+        _FakeCompletionHandler.requests = []
+        _FakeCompletionHandler.gate.set()
+
+    def tearDown(self) -> None:
+        _FakeCompletionHandler.gate.set()
+        self.helper._api_key, openai.api_key, openai.base_url = self._config
+        OpenAIMediaNameCache.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def __wait_until(condition, timeout=5):
+        end = time.time() + timeout
+        while not condition() and time.time() < end:
+            time.sleep(0.01)
+
+    def test_media_name_batch(self):
+        names = ["Title%s.2023.1080p.WEB-DL.mkv" % i for i in range(12)]
+        results = self.helper.get_media_names(names)
+        self.assertEqual(len(_FakeCompletionHandler.requests), 2)
+        self.assertEqual(results.get(names[3]).get("title"), "Title3")
+        # 归一化后相同的名称命中缓存
+        self.assertEqual(self.helper.get_media_name("title3 2023 1080p web dl mkv").get("title"), "Title3")
+        self.assertEqual(len(_FakeCompletionHandler.requests), 2)
+
+    def test_media_name_coalesce(self):
+        # 没有进行中的请求时立即提交，不等待攒批
+        start = time.time()
+        self.assertEqual(self.helper.get_media_name("Movie.2023.1080p.mkv").get("title"), "Movie")
+        self.assertLess(time.time() - start, 0.2)
+        self.assertEqual(len(_FakeCompletionHandler.requests), 1)
+        # 请求数达到上限后，后续到达的文件名等待进行中的请求完成，再合并为一次请求
+        _FakeCompletionHandler.gate.clear()
+        _FakeCompletionHandler.requests = []
+        names = ["Show%s.S01E01.1080p.mkv" % i for i in range(8)]
+        results = {}
+
+        def __recognize(_name):
+            results[_name] = self.helper.get_media_name(_name)
+
+        threads = [threading.Thread(target=__recognize, args=(name,)) for name in names]
+        for thread in threads[:2]:
+            thread.start()
+        self.__wait_until(lambda: len(_FakeCompletionHandler.requests) == 2)
+        for thread in threads[2:]:
+            thread.start()
+        self.__wait_until(lambda: len(self.helper._pending) == 6)
+        _FakeCompletionHandler.gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([len(json.loads(r.get("messages")[-1].get("content")))
+                          if r.get("messages")[-1].get("content").startswith("[") else 1
+                          for r in _FakeCompletionHandler.requests], [1, 1, 6])
+        self.assertEqual({name: info.get("title") for name, info in results.items()},
+                         {name: name.split(".")[0] for name in names})
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from app.helper import RssHelper
+from app.helper.rss_helper import RssFeed
+from app.utils import SiteUtils, RssFeedCache
+
+RSS_XML = """<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>test</title>
+<item>
+<title>Movie.2023.1080p.WEB-DL.H264-TEST</title>
+<link>https://example.org/details.php?id=1</link>
+<enclosure url="https://example.org/download.php?id=1" length="1073741824" type="application/x-bittorrent"/>
+<pubDate>Mon, 16 Oct 2023 08:00:00 +0800</pubDate>
+</item>
+<item>
+<title>Show.S01E01.2160p.WEB-DL.H265-TEST</title>
+<link>https://example.org/details.php?id=2</link>
+<enclosure url="https://example.org/download.php?id=2" length="2147483648" type="application/x-bittorrent"/>
+<pubDate>Mon, 16 Oct 2023 09:00:00 +0800</pubDate>
+</item>
+</channel></rss>
+"""
+
+# 未转义的&及被截断的报文
+BROKEN_XML = """<rss version="2.0"><channel><title>test</title>
+<item><title>Movie.2023.1080p.BluRay.x264-A&B</title>
+<enclosure url="https://example.org/download.php?id=3&passkey=abc" length="1024"/></item>
+<item><title>Show.S01E02.1080p.WEB-DL</title>
+<link>https://example.org/download.php?id=4</link></item>
+<item><title>Truncated
+"""
+
+# 没有XML声明的GBK报文
+GBK_XML = """<rss version="2.0"><channel><title>测试站点的种子订阅</title>
+<item><title>流浪地球2 The.Wandering.Earth.II.2023.1080p.WEB-DL.H264-TEST</title>
+<description>太阳即将毁灭，人类在地球表面建造出巨大的推进器，寻找新的家园。然而宇宙之路危机四伏，为了拯救地球，流浪地球时代的年轻人再次挺身而出，展开争分夺秒的生死之战。</description>
+<enclosure url="https://example.org/download.php?id=5" length="1024"/></item>
+</channel></rss>
+"""
+
+ETAG = '"rss-v1"'
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        _FeedHandler.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/slow":
+            time.sleep(0.3)
+        if self.path == "/etag" and self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if self.path == "/gbk":
+            data = GBK_XML.encode("gbk")
+        else:
+            data = (BROKEN_XML if self.path == "/broken" else RSS_XML).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if self.path == "/etag":
+            self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _MemoryDict:
+    """
+    代替数据库字典保存RSS条件请求状态
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, dtype, key):
+        return self.values.get((dtype, key)) or ""
+
+    def set(self, dtype, key, value, note=""):
+        self.values[(dtype, key)] = value
+        return True
+
+
+class RssHelperTest(TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.host = "http://127.0.0.1:%s" % self.server.server_port
+        self._dicthelper = RssHelper._dicthelper
+        RssHelper._dicthelper = _MemoryDict()
+        RssHelper._feed_states = {}
+        RssHelper._feed_stats = {}
+        RssFeedCache.clear()
+        _FeedHandler.requests = []
+
+    def tearDown(self) -> None:
+        RssHelper._dicthelper = self._dicthelper
+        RssHelper._feed_states = {}
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_rss_conditional_etag(self):
+        url = self.host + "/etag"
+        articles = RssHelper.parse_rssxml(url, conditional=True)
+        self.assertEqual([a.get("size") for a in articles], [1073741824, 2147483648])
+        # 共享缓存过期后，第二次请求带上ETag，服务端返回304，不再解析
+        RssFeedCache.clear()
+        self.assertEqual(RssHelper.parse_rssxml(url, conditional=True), [])
+        self.assertEqual(_FeedHandler.requests[-1], ("/etag", ETAG))
+        stats = RssHelper.get_feed_stats(SiteUtils.get_url_domain(url))
+        self.assertEqual(stats.get("not_modified"), 1)
+        self.assertEqual(stats.get("parses_saved"), 1)
+        self.assertEqual(stats.get("bytes_saved"), len(RSS_XML.encode("utf-8")))
+        # 未开启条件请求时始终完整解析
+        self.assertEqual(len(RssHelper.parse_rssxml(url)), 2)
+
+    def test_rss_conditional_hash(self):
+        url = self.host + "/plain"
+        self.assertEqual(len(RssHelper.parse_rssxml(url, conditional=True)), 2)
+        # 服务端不支持条件请求，报文相同也跳过解析
+        RssFeedCache.clear()
+        self.assertEqual(RssHelper.parse_rssxml(url, conditional=True), [])
+        stats = RssHelper.get_feed_stats(SiteUtils.get_url_domain(url))
+        self.assertEqual((stats.get("unchanged"), stats.get("parses_saved"), stats.get("bytes_saved")), (1, 1, 0))
+
+    def test_rss_conditional_persist(self):
+        url = self.host + "/etag"
+        self.assertEqual(len(RssHelper.parse_rssxml(url, conditional=True)), 2)
+        self.assertEqual(len(RssHelper._dicthelper.values), 1)
+        # 重启后内存中的状态丢失，从字典中读取ETag，仍发出条件请求
+        RssHelper._feed_states = {}
+        RssFeedCache.clear()
+        self.assertEqual(RssHelper.parse_rssxml(url, conditional=True), [])
+        self.assertEqual(_FeedHandler.requests[-1], ("/etag", ETAG))
+        # 报文未变化时状态不变，不重复写入
+        RssHelper._dicthelper.values.clear()
+        RssFeedCache.clear()
+        self.assertEqual(RssHelper.parse_rssxml(url, conditional=True), [])
+        self.assertEqual(RssHelper._dicthelper.values, {})
+
+    def test_rss_malformed(self):
+        articles = RssHelper.parse_rssxml(self.host + "/broken")
+        self.assertEqual([(a.get("enclosure"), a.get("size")) for a in articles],
+                         [("https://example.org/download.php?id=3&passkey=abc", 1024),
+                          ("https://example.org/download.php?id=4", 0)])
+
+    def test_rss_fetch_shared(self):
+        url = self.host + "/slow"
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(len(RssHelper.parse_rssxml(url))))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 并发下载同一地址只请求一次，缓存有效期内再次获取也不再请求
+        self.assertEqual(results, [2, 2, 2, 2])
+        self.assertEqual(len(RssHelper.parse_rssxml(url)), 2)
+        self.assertEqual(len(_FeedHandler.requests), 1)
+        stats = RssHelper.get_feed_stats(SiteUtils.get_url_domain(url))
+        self.assertEqual((stats.get("requests"), stats.get("shared"), stats.get("cache_hits")), (1, 3, 1))
+
+    def test_rss_fetch_decoded(self):
+        url = self.host + "/gbk"
+        titles = [a.get("title") for a in RssHelper.parse_rssxml(url)]
+        self.assertEqual(titles, ["流浪地球2 The.Wandering.Earth.II.2023.1080p.WEB-DL.H264-TEST"])
+        # 缓存的是报文而不是响应对象，各调用方拿到同一份已解码的内容
+        feed = RssHelper.fetch_feed(url)
+        self.assertIsInstance(feed, RssFeed)
+        self.assertIn("流浪地球2", feed.text)
+        self.assertIs(feed, RssHelper.fetch_feed(url))
+        self.assertEqual(len(_FeedHandler.requests), 1)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import random
+from unittest import TestCase
+
+from app.helper import SubscribeHelper
+from app.media.meta import MetaBase
+from app.utils.types import MediaType
+
+SITES = ["站点A", "站点B", "站点C"]
+
+
+def build_subscribes(count, seed=0):
+    """
+    生成电影、电视剧订阅清单，包含TMDBID、豆瓣、仅名称、模糊匹配、限定站点及同一媒体的重复订阅
+    """
+    rnd = random.Random(seed)
+    rss_movies, rss_tvs = {}, {}
+    for i in range(count):
+        is_movie = i % 2 == 0
+        num = i // 2
+        kind = rnd.random()
+        rss_info = {
+            "id": i,
+            "name": f"电影{num}" if is_movie else f"剧集{num}",
+            "year": str(2000 + num % 24),
+            "tmdbid": None,
+            "fuzzy_match": 0,
+            "rss_sites": [rnd.choice(SITES)] if rnd.random() < 0.2 else []
+        }
+        if kind < 0.02:
+            # 模糊匹配，名称为关键字或正则表达式
+            rss_info.update({"fuzzy_match": 1, "name": f"(电影|剧集){num % 50} ", "year": None})
+        elif kind < 0.6:
+            # 取值范围较小，存在同一TMDBID的多个订阅
+            rss_info["tmdbid"] = str(10000 + num % (count // 3 or 1))
+        elif kind < 0.7:
+            rss_info["tmdbid"] = f"DB:{num}"
+        if not is_movie:
+            rss_info["season"] = rnd.choice([None, "S01", "S02", "S00"])
+            rss_tvs[i] = rss_info
+        else:
+            rss_movies[i] = rss_info
+    return rss_movies, rss_tvs
+
+
+def build_items(count, subscribe_count, seed=1):
+    """
+    生成已识别的种子，部分命中订阅的TMDBID或名称，部分不命中
+    """
+    rnd = random.Random(seed)
+    items = []
+    for i in range(count):
+        is_movie = rnd.random() < 0.5
+        num = rnd.randrange(subscribe_count // 2 + 50)
+        year = 2000 + num % 24 + rnd.choice([0, 0, 1, -1])
+        season = rnd.choice([1, 2])
+        title = f"Title.{num}.{year}.1080p.WEB-DL.H264-TEST" if is_movie \
+            else f"Title.{num}.S{season:02d}E01.{year}.1080p.WEB-DL.H264-TEST"
+        media_info = MetaBase(title)
+        media_info.rev_string = title
+        media_info.type = MediaType.MOVIE if is_movie else MediaType.TV
+        media_info.title = f"电影{num}" if is_movie else f"剧集{num}"
+        media_info.year = str(year)
+        media_info.tmdb_id = 10000 + rnd.randrange(subscribe_count // 3 + 20)
+        media_info.site = rnd.choice(SITES)
+        if not is_movie:
+            media_info.begin_season = season
+        items.append(media_info)
+    return items
+
+
+def linear_match(media_info, rss_movies, rss_tvs):
+    """
+    原逐个订阅顺序匹配的方式，返回第一个命中的订阅
+    """
+    if media_info.type == MediaType.MOVIE and rss_movies:
+        rss_infos, check = rss_movies, SubscribeHelper.check_movie_subscribe
+    elif rss_tvs:
+        rss_infos, check = rss_tvs, SubscribeHelper.check_tv_subscribe
+    else:
+        return None
+    for rss_info in rss_infos.values():
+        if check(media_info, rss_info):
+            return rss_info
+    return None
+
+
+class RssSubscribeTest(TestCase):
+    def test_rss_subscribe_index(self):
+        rss_movies, rss_tvs = build_subscribes(300)
+        subscribe_index = SubscribeHelper.build_subscribe_index(rss_movies, rss_tvs)
+        matched, fuzzy = 0, 0
+        for media_info in build_items(800, 300):
+            expected = linear_match(media_info, rss_movies, rss_tvs)
+            result = SubscribeHelper.match_subscribe(media_info, rss_movies, rss_tvs, subscribe_index)
+            # 倒排索引与逐个匹配命中同一个订阅
+            self.assertEqual((result or {}).get("id"), (expected or {}).get("id"), media_info.org_string)
+            if expected:
+                matched += 1
+                fuzzy += 1 if expected.get("fuzzy_match") else 0
+        self.assertGreater(matched, 100)
+        self.assertGreater(fuzzy, 0)
+        # 只有一种订阅时，另一类型的种子与原逐个匹配的处理一致
+        media_info = build_items(1, 300)[0]
+        for movies, tvs in [(rss_movies, {}), ({}, rss_tvs), ({}, {})]:
+            expected = linear_match(media_info, movies, tvs)
+            result = SubscribeHelper.match_subscribe(media_info, movies, tvs)
+            self.assertEqual((result or {}).get("id"), (expected or {}).get("id"))
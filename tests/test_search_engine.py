@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+
+from app.helper import SearchEngineHelper
+
+BING_HTML = """
+<html><body>
+<aside><h2 class=" b_entityTitle">流浪地球 (2019)</h2><div data-feedbk-ids="Movie"></div></aside>
+<h2><strong>流浪地球</strong></h2>
+<div class="b_caption"><p><strong>流浪地球</strong></p></div>
+</body></html>
+"""
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        _StubHandler.requests.append(self.path)
+        body = BING_HTML if self.path.startswith("/bing") else "<html><body></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class SearchEngineTest(TestCase):
+    def setUp(self) -> None:
+        self.server = HTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host = "http://127.0.0.1:%s" % self.server.server_port
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.helper = SearchEngineHelper()
+        self.helper.init_config()
+        # 单例的配置及缓存在测试后恢复，避免影响其它测试或被写回实际的缓存文件
+        self._config = (self.helper._keyword_path, self.helper._bing_url, self.helper._baidu_url,
+                        self.helper._hourly_budget, self.helper._keyword_data, self.helper._changed)
+        self.helper.clear_keyword_data()
+        self.helper._keyword_path = os.path.join(self.tmpdir.name, "keyword.dat")
+        self.helper._bing_url = host + "/bing?q=%s"
+        self.helper._baidu_url = host + "/baidu?wd=%s"
+        self.helper._hourly_budget = 2
+        _StubHandler.requests = []
+
+    def tearDown(self) -> None:
+        self.helper._keyword_path, self.helper._bing_url, self.helper._baidu_url, \
+            self.helper._hourly_budget, self.helper._keyword_data, self.helper._changed = self._config
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_search_engine_cache(self):
+        keyword, is_movie = self.helper.get_keyword("流浪地球")
+        self.assertEqual(keyword, "流浪地球")
+        self.assertTrue(is_movie)
+        self.assertEqual(len(_StubHandler.requests), 2)
+        # 再次查询命中缓存，不再请求搜索引擎
+        self.assertEqual(self.helper.get_keyword("流浪地球"), (keyword, is_movie))
+        self.assertEqual(len(_StubHandler.requests), 2)
+        stats = self.helper.get_stats()
+        self.assertEqual((stats.get("hit"), stats.get("query")), (1, 1))
+        # 持久化
+        self.helper.save_keyword_data()
+        with open(self.helper._keyword_path, "rb") as f:
+            self.assertIn("流浪地球", pickle.load(f))
+
+    def test_search_engine_budget(self):
+        self.helper.get_keyword("标题一")
+        self.helper.get_keyword("标题二")
+        self.assertEqual(self.helper.get_keyword("标题三"), (None, False))
+        stats = self.helper.get_stats()
+        self.assertEqual(stats.get("over_budget"), 1)
+        self.assertEqual(stats.get("budget_left"), 0)
+        self.assertEqual(len(_StubHandler.requests), 4)
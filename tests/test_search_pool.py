@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from concurrent.futures import as_completed
+from unittest import TestCase
+
+from app.indexer.search_pool import SearchPool
+
+
+class SearchPoolTest(TestCase):
+    def setUp(self) -> None:
+        self.pool = SearchPool(max_workers=4, site_limit=2, interactive_weight=3)
+        self.lock = threading.Lock()
+        self.running = {}
+        self.max_running = {}
+        self.order = []
+
+    def _search(self, site, name, seconds=0.05):
+        with self.lock:
+            self.running[site] = self.running.get(site, 0) + 1
+            self.max_running[site] = max(self.max_running.get(site, 0), self.running[site])
+            self.order.append(name)
+        time.sleep(seconds)
+        with self.lock:
+            self.running[site] -= 1
+        return name
+
+    def test_search_pool_limit(self):
+        # 多个搜索同时提交，线程数及同一站点的并发数均受限
+        futures = []
+        for search in range(5):
+            for site in ["site%s" % i for i in range(4)]:
+                futures.append(self.pool.submit(site, self._search, site, f"{site}-{search}"))
+        results = [future.result() for future in as_completed(futures)]
+        self.assertEqual(len(results), 20)
+        self.assertLessEqual(self.pool.get_stats().get("threads"), 4)
+        self.assertLessEqual(max(self.max_running.values()), 2)
+        # 线程常驻，再次提交不新建线程
+        self.pool.submit("site0", self._search, "site0", "again").result()
+        self.assertLessEqual(self.pool.get_stats().get("threads"), 4)
+
+    def test_search_pool_fair(self):
+        # 占满所有线程后同时排队交互式和后台搜索，后台搜索按权重穿插执行
+        blockers = [self.pool.submit(f"block{i}", self._search, f"block{i}", "block", 0.2) for i in range(4)]
+        futures = [self.pool.submit(f"web{i}", self._search, f"web{i}", "web") for i in range(12)]
+        futures += [self.pool.submit(f"rss{i}", self._search, f"rss{i}", "rss", interactive=False) for i in range(4)]
+        for future in blockers + futures:
+            future.result()
+        order = [name for name in self.order if name != "block"]
+        self.assertIn("rss", order[:4])
+        self.assertEqual(order.count("rss"), 4)
+        self.assertTrue(SearchPool.is_interactive(None))
+
+    def test_search_pool_burst(self):
+        # 预热后线程空闲，突发提交多个站点的搜索时仍按需新建线程并发执行
+        self.pool.submit("site0", self._search, "site0", "warm").result()
+        start = time.time()
+        futures = [self.pool.submit(f"burst{i}", self._search, f"burst{i}", "burst", 0.3) for i in range(4)]
+        for future in futures:
+            future.result()
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(self.pool.get_stats().get("threads"), 4)
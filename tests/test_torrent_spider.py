@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import os
+from unittest import TestCase
+
+import yaml
+
+from app.indexer.client import TorrentSpider
+from app.indexer.manager import IndexerConf
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "spider")
+SITE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "sites")
+
+
+def load_fixture(name, site_path=SITE_PATH):
+    """
+    加载站点配置及对应的页面
+    """
+    with open(os.path.join(site_path, f"{name}.yml"), encoding="utf-8") as f:
+        indexer = IndexerConf(datas=yaml.safe_load(f))
+    with open(os.path.join(FIXTURE_PATH, f"{name}.html"), encoding="utf-8") as f:
+        html = f.read()
+    return indexer, html
+
+
+class TorrentSpiderTest(TestCase):
+
+    def test_torrent_spider_layouts(self):
+        # 表格布局
+        indexer, html = load_fixture("dmhy")
+        flag, torrents = TorrentSpider(indexer).parse(html)
+        self.assertTrue(flag)
+        self.assertEqual(len(torrents), 30)
+        self.assertEqual(torrents[1].get("title"),
+                         "【字幕组1】月光港湾 / Moonlight.Harbor.2001.2160p.BluRay.x265.10bit.HDR-GRP [简繁内封]")
+        self.assertEqual(torrents[1].get("page_url"), "https://dmhy.org/topics/view/650001_Moonlight.Harbor.html")
+        self.assertEqual((torrents[1].get("seeders"), torrents[1].get("downloadvolumefactor")), ("115", 0))
+        # DIV布局
+        indexer, html = load_fixture("torrentgalaxy")
+        flag, torrents = TorrentSpider(indexer).parse(html)
+        self.assertEqual(len(torrents), 25)
+        self.assertEqual(torrents[0].get("title"), "The.Last.Voyage.S01E01.1080p.WEB-DL.H264.AAC-TEAM")
+        self.assertEqual((torrents[0].get("seeders"), torrents[0].get("peers")), ("706", "69"))
+        self.assertTrue(torrents[0].get("enclosure").startswith("magnet:?xt=urn:btih:"))
+
+    def test_torrent_spider_nexusphp(self):
+        # 标题模板、移除元素、促销判断
+        indexer, html = load_fixture("nexusphp", site_path=FIXTURE_PATH)
+        flag, torrents = TorrentSpider(indexer).parse(html)
+        self.assertEqual(len(torrents), 40)
+        self.assertEqual(torrents[0].get("title"), "The.Last.Voyage.S01E01.1080p.WEB-DL.H264.AAC-TEAM")
+        self.assertEqual(torrents[0].get("description"), "最后的航程 | 导演: 某某 主演: 某某")
+        self.assertEqual((torrents[0].get("downloadvolumefactor"), torrents[0].get("uploadvolumefactor")), (0, 1))
+        self.assertEqual(torrents[1].get("imdbid"), "tt0100001")
+        self.assertEqual(torrents[3].get("labels"), "官方|中字|DIY")
+        self.assertEqual((torrents[5].get("downloadvolumefactor"), torrents[5].get("uploadvolumefactor")), (0.5, 2))
+        self.assertEqual(torrents[0].get("enclosure"), "https://pt.example.org/download.php?id=40000")
+        # 移除元素不影响原页面，重复解析结果一致
+        self.assertEqual(TorrentSpider(indexer).parse(html), (flag, torrents))
@@ -24,9 +24,10 @@ from app.downloader import Downloader
 from app.filetransfer import FileTransfer
 from app.filter import Filter
 from app.helper import DbHelper, ProgressHelper, ThreadHelper, \
-    MetaHelper, DisplayHelper, WordsHelper
+    MetaHelper, DisplayHelper, WordsHelper, FanartHelper, ImageCacheHelper
 from app.helper import RssHelper, PluginHelper
 from app.indexer import Indexer
+from app.indexer.client.browser import PlaywrightHelper
 from app.indexer.manager import IndexerManager
 from app.media import Category, Media, Bangumi, DouBan, Scraper
 from app.media.meta import MetaInfo, MetaBase
@@ -45,7 +46,7 @@ from app.utils import StringUtils, EpisodeFormat, RequestUtils, PathUtils, \
     SystemUtils, ExceptionUtils
 from app.utils.types import RmtMode, OsType, SearchType, SyncType, MediaType, MovieTypes, TvTypes, \
     EventType, SystemConfigKey, RssType
-from config import RMT_MEDIAEXT, RMT_SUBEXT, RMT_AUDIO_TRACK_EXT, Config
+from config import RMT_MEDIAEXT, RMT_SUBEXT, RMT_AUDIO_TRACK_EXT, MEDIA_DETAIL_TIMEOUT, Config
 from web.backend.search_torrents import search_medias_for_web, search_media_by_message
 from web.backend.user import User
 from web.backend.web_utils import WebUtils
@@ -317,6 +318,8 @@ class WebAction:
         Downloader().stop_service()
         # 关闭插件
         PluginManager().stop_service()
+        # 关闭常驻浏览器
+        PlaywrightHelper.stop_service()
 
     @staticmethod
     def start_service():
@@ -538,6 +541,7 @@ class WebAction:
         filters = data.get("filters")
         tmdbid = data.get("tmdbid")
         media_type = data.get("media_type")
+        use_cache = False if data.get("nocache") else True
         if media_type:
             if media_type in MovieTypes:
                 media_type = MediaType.MOVIE
@@ -548,7 +552,8 @@ class WebAction:
                                                  ident_flag=ident_flag,
                                                  filters=filters,
                                                  tmdbid=tmdbid,
-                                                 media_type=media_type)
+                                                 media_type=media_type,
+                                                 use_cache=use_cache)
             if ret != 0:
                 return {"code": ret, "msg": ret_msg}
         return {"code": 0}
@@ -573,7 +578,7 @@ class WebAction:
             elif res.TYPE == 'TV': 
                 mtype = MediaType.TV
 
-            info = Media().get_tmdb_info(tmdbid=res.TMDBID, mtype=mtype, append_to_response="all")
+            info = Media().get_tmdb_info(tmdbid=res.TMDBID, mtype=mtype, append_to_response="basic")
             if not info:
                 continue
             media_info = MetaInfo(f'{res.TITLE} {res.ES_STRING}')
@@ -1861,7 +1866,7 @@ class WebAction:
                         }
         else:
             if tid:
-                tmdb_info = Media().get_tmdb_info(mtype=MediaType.MOVIE, tmdbid=tid)
+                tmdb_info = Media().get_tmdb_info(mtype=MediaType.MOVIE, tmdbid=tid, append_to_response="basic")
             else:
                 return {"code": 1, "retmsg": "没有TMDBID信息"}
             if not tmdb_info:
@@ -1930,7 +1935,7 @@ class WebAction:
             episode_events = []
             air_date = tmdb_info.get("air_date")
             if not tmdb_info.get("poster_path"):
-                tv_tmdb_info = Media().get_tmdb_info(mtype=MediaType.TV, tmdbid=tid)
+                tv_tmdb_info = Media().get_tmdb_info(mtype=MediaType.TV, tmdbid=tid, append_to_response="basic")
                 if tv_tmdb_info:
                     poster_path = Config().get_tmdbimage_url(tv_tmdb_info.get('poster_path'))
                 else:
@@ -2184,14 +2189,17 @@ class WebAction:
             return {"code": -1}
         meta_info = MetaInfo(title=title, subtitle=subtitle)
         meta_info.size = float(size) * 1024 ** 3 if size else 0
-        match_flag, res_order, match_msg = \
+        match_flag, res_order, match_msg, explain = \
             Filter().check_torrent_filter(meta_info=meta_info,
-                                          filter_args={"rule": rulegroup})
+                                          filter_args={"rule": rulegroup},
+                                          explain=True,
+                                          update_stats=False)
         return {
             "code": 0,
             "flag": match_flag,
             "text": "匹配" if match_flag else "未匹配",
-            "order": 100 - res_order if res_order else 0
+            "order": 100 - res_order if res_order else 0,
+            "rules": explain.get("rules")
         }
 
     @staticmethod
@@ -2612,6 +2620,9 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
+            Media.clear_tmdb_detail_cache()
+            FanartHelper().clear_fanart_data()
+            FanartHelper().save_fanart_data(force=True)
             os.remove(MetaHelper().get_meta_data_path())
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
@@ -2845,10 +2856,11 @@ class WebAction:
             "format": data.get("format"),
             "params": data.get("params")
         }
-        if RssChecker().update_userrss_parser(params):
+        ret, msg = RssChecker().update_userrss_parser(params)
+        if ret:
             return {"code": 0}
         else:
-            return {"code": 1}
+            return {"code": 1, "msg": msg or "保存失败"}
 
     @staticmethod
     def __run_userrss(data):
@@ -2948,7 +2960,7 @@ class WebAction:
             _media = Media()
             if tmdb_type == "tv":
                 if not _wordshelper.is_custom_word_group_existed(tmdbid=tmdb_id, gtype=2):
-                    tmdb_info = _media.get_tmdb_info(mtype=MediaType.TV, tmdbid=tmdb_id)
+                    tmdb_info = _media.get_tmdb_info(mtype=MediaType.TV, tmdbid=tmdb_id, append_to_response="basic")
                     if not tmdb_info:
                         return {"code": 1, "msg": "添加失败，无法查询到TMDB信息"}
                     _wordshelper.insert_custom_word_groups(title=tmdb_info.get("name"),
@@ -2962,7 +2974,7 @@ class WebAction:
                     return {"code": 1, "msg": "识别词组（TMDB ID）已存在"}
             elif tmdb_type == "movie":
                 if not _wordshelper.is_custom_word_group_existed(tmdbid=tmdb_id, gtype=1):
-                    tmdb_info = _media.get_tmdb_info(mtype=MediaType.MOVIE, tmdbid=tmdb_id)
+                    tmdb_info = _media.get_tmdb_info(mtype=MediaType.MOVIE, tmdbid=tmdb_id, append_to_response="basic")
                     if not tmdb_info:
                         return {"code": 1, "msg": "添加失败，无法查询到TMDB信息"}
                     _wordshelper.insert_custom_word_groups(title=tmdb_info.get("title"),
@@ -4060,7 +4072,8 @@ class WebAction:
         return {
             "code": 0,
             "ruleGroups": RuleGroups,
-            "initRules": Init_RuleGroups
+            "initRules": Init_RuleGroups,
+            "statsSince": Filter.get_rule_stats_since()
         }
 
     def __update_directory(self, data):
@@ -4578,41 +4591,69 @@ class WebAction:
         mtype = MediaType.MOVIE if data.get("type") in MovieTypes else MediaType.TV
         if not tmdbid:
             return {"code": 1, "msg": "未指定媒体ID"}
+        start_time = time.time()
         media_info = WebUtils.get_mediainfo_from_id(mediaid=tmdbid, mtype=mtype)
+        timings = {"media": round(time.time() - start_time, 3)}
         # 检查TMDB信息
         if not media_info or not media_info.tmdb_info:
             return {
                 "code": 1,
                 "msg": "无法查询到TMDB信息"
             }
-        # 查询存在及订阅状态
-        fav, rssid, item_url = self.get_media_exists_info(mtype=mtype,
-                                                          title=media_info.title,
-                                                          year=media_info.year,
-                                                          mediaid=media_info.tmdb_id)
         MediaHandler = Media()
         MediaServerHandler = MediaServer()
         # 查询季
         seasons = MediaHandler.get_tmdb_tv_seasons(media_info.tmdb_info)
-        # 查询季是否存在
-        if seasons:
-            for season in seasons:
-                season.update({
-                    "state": True if MediaServerHandler.check_item_exists(
-                        mtype=mtype,
-                        title=media_info.title,
-                        year=media_info.year,
-                        tmdbid=media_info.tmdb_id,
-                        season=season.get("season_number")) else False
-                })
 
-        crews = []
-        actors = []
-        if media_info.douban_id:
-            crews, actors = DouBan().scraper_media_celebrities(media_info.douban_id.split(',')[0])
-        else:
-            crews = MediaHandler.get_tmdb_crews(tmdbinfo=media_info.tmdb_info, nums=6)
-            actors = MediaHandler.get_tmdb_cats(mtype=mtype, tmdbid=media_info.tmdb_id)
+        def __exists_info():
+            """
+            查询存在及订阅状态
+            """
+            return self.get_media_exists_info(mtype=mtype,
+                                              title=media_info.title,
+                                              year=media_info.year,
+                                              mediaid=media_info.tmdb_id)
+
+        def __season_state(season_number):
+            """
+            查询季是否存在
+            """
+            return True if MediaServerHandler.check_item_exists(
+                mtype=mtype,
+                title=media_info.title,
+                year=media_info.year,
+                tmdbid=media_info.tmdb_id,
+                season=season_number) else False
+
+        def __celebrities():
+            """
+            查询演职员
+            """
+            if media_info.douban_id:
+                return DouBan().scraper_media_celebrities(media_info.douban_id.split(',')[0])
+            return MediaHandler.get_tmdb_crews(tmdbinfo=media_info.tmdb_info, nums=6), \
+                MediaHandler.get_tmdb_cats(mtype=mtype, tmdbid=media_info.tmdb_id)
+
+        # 各部分互不依赖，并发查询，超时的部分返回空结果
+        tasks = {
+            "exists": __exists_info,
+            "celebrities": __celebrities
+        }
+        for season in seasons or []:
+            tasks[f"season_{season.get('season_number')}"] = \
+                lambda _season_number=season.get("season_number"): __season_state(_season_number)
+        results, section_timings, timeouts = ThreadHelper().run_tasks(tasks=tasks, timeout=MEDIA_DETAIL_TIMEOUT)
+        timings.update(section_timings)
+        if timeouts:
+            log.warn(f"【Web】媒体详情 {media_info.title} 查询超时：{timeouts}")
+        log.debug(f"【Web】媒体详情 {media_info.title} 各部分耗时：{timings}")
+
+        fav, rssid, item_url = results.get("exists") or ("0", "", None)
+        for season in seasons or []:
+            season.update({
+                "state": results.get(f"season_{season.get('season_number')}") or False
+            })
+        crews, actors = results.get("celebrities") or ([], [])
 
         return {
             "code": 0,
@@ -4633,7 +4674,9 @@ class WebAction:
                 "fav": fav,
                 "item_url": item_url,
                 "rssid": rssid,
-                "seasons": seasons
+                "seasons": seasons,
+                "partial": timeouts,
+                "timings": timings
             }
         }
 
@@ -5051,7 +5094,10 @@ class WebAction:
         """
         dataset = [["indexer", "avg"]]
         result = Indexer().get_indexer_statistics() or []
+        cache_stats = Indexer().get_search_cache_stats()
+        health_stats = Indexer().get_health_stats()
         dataset.extend([[ret[0], round(ret[4], 1)] for ret in result])
+        image_cache = ImageCacheHelper().get_cache_info()
         return {
             "code": 0,
             "data": [{
@@ -5060,8 +5106,23 @@ class WebAction:
                 "fail": ret[2],
                 "success": ret[3],
                 "avg": round(ret[4], 1),
+                "cache_hits": cache_stats.get(ret[0], {}).get("hits", 0),
+                "cache_hit_rate": cache_stats.get(ret[0], {}).get("hit_rate", 0),
+                "state": health_stats.get(ret[0], {}).get("state") or "closed",
+                "failures": health_stats.get(ret[0], {}).get("failures") or 0,
+                "retry": health_stats.get(ret[0], {}).get("retry") or 0,
+                "p95": health_stats.get(ret[0], {}).get("p95"),
             } for ret in result],
-            "dataset": dataset
+            "dataset": dataset,
+            "runtime": {
+                "search_pool": Indexer().get_search_pool_stats(),
+                "browser_pool": PlaywrightHelper.get_pool_stats(),
+                "image_cache": {
+                    "count": image_cache.get("count"),
+                    "size": StringUtils.str_filesize(image_cache.get("size")),
+                    "max_size": StringUtils.str_filesize(image_cache.get("max_size"))
+                }
+            }
         }
 
     @staticmethod
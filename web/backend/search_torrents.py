@@ -1,5 +1,6 @@
 import os.path
 import re
+import time
 
 from app.utils.media_utils import MediaUtils
 import log
@@ -21,7 +22,7 @@ SEARCH_MEDIA_CACHE = {}
 SEARCH_MEDIA_TYPE = {}
 
 
-def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, media_type=None):
+def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, media_type=None, use_cache=True):
     """
     WEB资源搜索
     :param content: 关键字文本，可以包括 类型、标题、季、集、年份等信息，使用 空格分隔，也支持种子的命名格式
@@ -29,6 +30,7 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
     :param filters: 其它过滤条件
     :param tmdbid: TMDBID或DB:豆瓣ID
     :param media_type: 媒体类型，配合tmdbid传入
+    :param use_cache: 是否使用站点原始搜索结果的缓存，为False时强制请求所有站点
     :return: 错误码，错误原因，成功时直接插入数据库
     """
     mtype, key_word, season_num, episode_num, year, content = StringUtils.get_keyword_from_string(content)
@@ -117,13 +119,49 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
         filter_args.update(filters)
     # 开始搜索
     log.info("【Web】开始搜索 %s ..." % content)
+    # 清空缓存结果，各站点搜索完成后结果立即入库，并推送给页面
+    _searcher.delete_all_search_torrents()
+    start_time = time.time()
+    site_timings = {}
+    # 已分批入库的批次
+    batches = []
+
+    def __site_finished(site, results, seconds):
+        if results:
+            _searcher.insert_search_results(media_items=sorted(results, key=lambda x: x.get_sort_str(), reverse=True),
+                                            ident_flag=ident_flag,
+                                            title=content)
+            batches.append(site)
+        timing = site_timings.setdefault(site, {"site": site, "count": 0, "seconds": 0})
+        timing["count"] += len(results)
+        timing["seconds"] = max(timing["seconds"], seconds)
+        _process.push({
+            "site": site,
+            "count": len(results),
+            "seconds": seconds,
+            "total": sum(t.get("count") for t in site_timings.values())
+        }, ProgressKey.Search)
+
     media_list = _searcher.search_medias(key_word=first_search_name,
                                          filter_args=filter_args,
                                          match_media=media_info,
-                                         in_from=SearchType.WEB)
-
-    # 清空缓存结果
-    _searcher.delete_all_search_torrents()
+                                         in_from=SearchType.WEB,
+                                         callback=__site_finished,
+                                         use_cache=use_cache)
+    if len(batches) > 1:
+        # 分多批入库的，全部完成后按整体排序重新入库
+        _searcher.delete_all_search_torrents()
+        media_list = sorted(media_list, key=lambda x: x.get_sort_str(), reverse=True)
+        _searcher.insert_search_results(media_items=media_list,
+                                        ident_flag=ident_flag,
+                                        title=content)
+    # 推送各站点耗时汇总
+    _process.push({
+        "done": True,
+        "total": len(media_list),
+        "seconds": round(time.time() - start_time, 1),
+        "sites": sorted(site_timings.values(), key=lambda x: x.get("seconds"), reverse=True)
+    }, ProgressKey.Search)
     # 结束进度
     _process.end(ProgressKey.Search)
     if len(media_list) == 0:
@@ -131,11 +169,6 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
         return 1, "%s 未搜索到任何资源" % content
     else:
         log.info("【Web】共搜索到 %s 个有效资源" % len(media_list))
-        # 插入数据库
-        media_list = sorted(media_list, key=lambda x: x.get_sort_str(), reverse=True)
-        _searcher.insert_search_results(media_items=media_list,
-                                        ident_flag=ident_flag,
-                                        title=content)
         return 0, ""
 
 
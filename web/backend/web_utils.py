@@ -1,4 +1,3 @@
-from functools import lru_cache
 from urllib.parse import quote
 
 import cn2an
@@ -100,12 +99,12 @@ class WebUtils:
             if mtype == MediaType.TV and re.search(r'%s' % DB_SEASON_SUFFIX, title, flags=re.IGNORECASE):
                 title, begin_season = MediaUtils.resolve_douban_season_tag(title)
 
-            tmdb_info = Media().query_tmdb_info(title, mtype, year, begin_season, append_to_response="all")
+            tmdb_info = Media().query_tmdb_info(title, mtype, year, begin_season, append_to_response="detail")
             if not tmdb_info:
                 log.warn("【Douban】根据名称[%s]查询tmdb数据失败" % title)
                 if original_title:
                     log.info("【Douban】尝试根据别名[%s]查询tmdb数据" % original_title)
-                    tmdb_info = Media().query_tmdb_info(original_title, mtype, year, begin_season, append_to_response="all")
+                    tmdb_info = Media().query_tmdb_info(original_title, mtype, year, begin_season, append_to_response="detail")
                     if not tmdb_info:
                         log.info("【Douban】尝试根据别名[%s]查询tmdb数据失败" % original_title)
                     else:
@@ -133,14 +132,14 @@ class WebUtils:
             year = info.get("date")[:4] if info.get("date") else ""
             media_info = Media().get_media_info(title=f"{title} {year}",
                                                 mtype=MediaType.ANIME,
-                                                append_to_response="all")
+                                                append_to_response="detail")
             if not media_info or not media_info.tmdb_info:
                 media_info = Media().get_media_info(title=f"{title_cn} {year}",
                                                     mtype=MediaType.ANIME,
-                                                    append_to_response="all")
+                                                    append_to_response="detail")
         else:
             # TMDB
-            info = Media().get_tmdb_info(tmdbid=mediaid, mtype=mtype, append_to_response="all")
+            info = Media().get_tmdb_info(tmdbid=mediaid, mtype=mtype, append_to_response="detail")
             if not info:
                 return None
             title = info.get("title") if mtype == MediaType.MOVIE else info.get("name")
@@ -248,14 +247,3 @@ class WebUtils:
                 else:
                     EndPage = total_page
         return range(StartPage, EndPage + 1)
-
-    @staticmethod
-    @lru_cache(maxsize=128)
-    def request_cache(url):
-        """
-        带缓存的请求
-        """
-        ret = RequestUtils().get_res(url)
-        if ret:
-            return ret.content
-        return None
@@ -1,6 +1,5 @@
 import base64
 import datetime
-import hashlib
 import mimetypes
 import os.path
 import re
@@ -28,8 +27,10 @@ from app.brushtask import BrushTask
 from app.conf import ModuleConf, SystemConfig
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import SecurityHelper, MetaHelper, ThreadHelper
+from app.helper import SecurityHelper, MetaHelper, ThreadHelper, FanartHelper, ImageCacheHelper, \
+    SearchEngineHelper, ProgressHelper
 from app.indexer import Indexer
+from app.media import Media
 from app.media.meta import MetaInfo
 from app.mediaserver import MediaServer
 from app.message import Message
@@ -39,7 +40,7 @@ from app.sites import Sites, SiteUserInfo
 from app.subscribe import Subscribe
 from app.sync import Sync
 from app.torrentremover import TorrentRemover
-from app.utils import DomUtils, SystemUtils, ExceptionUtils, StringUtils
+from app.utils import DomUtils, SystemUtils, ExceptionUtils, StringUtils, ImageUtils
 from app.utils.types import *
 from config import PT_TRANSFER_INTERVAL, Config, TMDB_API_DOMAINS
 from web.action import WebAction
@@ -887,6 +888,9 @@ def tmdbcache():
                            TotalCount=total_count,
                            Count=len(tmdb_caches),
                            TmdbCaches=tmdb_caches,
+                           FanartCache=FanartHelper().get_cache_info(),
+                           KeywordStats=SearchEngineHelper().get_stats(),
+                           DetailCache=Media.get_tmdb_cache_info(),
                            Search=search_str,
                            CurrentPage=current_page,
                            TotalPage=total_page,
@@ -1037,7 +1041,8 @@ def filterrule():
     return render_template("setting/filterrule.html",
                            Count=len(result.get("ruleGroups")),
                            RuleGroups=result.get("ruleGroups"),
-                           Init_RuleGroups=result.get("initRules"))
+                           Init_RuleGroups=result.get("initRules"),
+                           StatsSince=result.get("statsSince"))
 
 
 # 自定义订阅页面
@@ -1749,19 +1754,26 @@ def Img():
     url = request.args.get('url')
     if not url:
         return make_response("参数错误", 400)
-    # 计算Etag
-    etag = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    width = request.args.get('width')
     # 检查协商缓存
+    etag = ImageCacheHelper().get_etag(url, width)
     if_none_match = request.headers.get('If-None-Match')
-    if if_none_match and if_none_match == etag:
-        return make_response('', 304)
+    if etag and if_none_match and if_none_match.strip('"') == etag:
+        response = make_response('', 304)
+        response.headers.set('Cache-Control', 'max-age=604800')
+        response.headers.set('Etag', etag)
+        return response
     # 获取图片数据
+    content, etag = ImageCacheHelper().get_image(url, width)
+    if not content:
+        return make_response("图片获取失败", 404)
     response = Response(
-        WebUtils.request_cache(url),
-        mimetype='image/jpeg'
+        content,
+        mimetype=ImageUtils.get_image_mimetype(content)
     )
     response.headers.set('Cache-Control', 'max-age=604800')
-    response.headers.set('Etag', etag)
+    if etag:
+        response.headers.set('Etag', etag)
     return response
 
 
@@ -1820,6 +1832,43 @@ def stream_progress():
     )
 
 
+@App.route('/stream-search')
+@login_required
+def stream_search():
+    """
+    搜索结果EventSources响应，各站点搜索完成后即推送
+    """
+    def __search():
+        """
+        推送搜索事件
+        """
+        progress = ProgressHelper()
+        serial, index, running, idle = None, 0, None, 0
+        while True:
+            time.sleep(0.2)
+            _serial, events, _running = progress.get_events(ptype=ProgressKey.Search)
+            # 开始了新的搜索，从头推送
+            if _serial != serial:
+                serial, index = _serial, 0
+            events = events[index:]
+            if events or _running != running:
+                index += len(events)
+                running = _running
+                idle = 0
+                yield 'data: %s\n\n' % json.dumps({"serial": serial, "running": running, "events": events})
+            else:
+                # 定时发送心跳，以便及时发现连接断开
+                idle += 1
+                if idle >= 75:
+                    idle = 0
+                    yield ': keepalive\n\n'
+
+    return Response(
+        __search(),
+        mimetype='text/event-stream'
+    )
+
+
 @Sock.route('/message')
 @login_required
 def message_handler(ws):
@@ -20,6 +20,10 @@ let NavPageXhr;
 let GlobalModalAbort = true;
 // 进度刷新EventSource
 let ProgressES;
+// 搜索结果推送EventSource
+let SearchES;
+// 已刷新过结果页面的搜索批次
+let SearchRefreshedSerial;
 // 日志来源筛选时关掉之前的刷新日志计时器
 let LoggingSource = "";
 // 日志EventSource
@@ -188,17 +192,92 @@ function navmenu(page, newflag = false) {
 // 搜索
 function media_search(tmdbid, title, type) {
   const param = { "tmdbid": tmdbid, "search_word": title, "media_type": type };
+  start_media_search(param, title);
+}
+
+// 发起WEB搜索，有站点返回结果后即跳转到结果页面，其余站点的结果在结果页面中继续推送
+function start_media_search(param, title, fail_func) {
+  let navigated = false;
   show_refresh_progress("正在搜索 " + title + " ...", "search");
+  stop_search_stream();
+  SearchES = new EventSource("stream-search");
+  SearchES.onmessage = function (event) {
+    let ret = JSON.parse(event.data);
+    if (!ret.running || ret.events.length === 0) {
+      return;
+    }
+    if (ret.events[ret.events.length - 1].total > 0) {
+      navigated = true;
+      stop_search_stream();
+      hide_refresh_process();
+      navmenu('search?s=' + title);
+    }
+  };
   ajax_post("search", param, function (ret) {
+    if (navigated) {
+      return;
+    }
+    stop_search_stream();
     hide_refresh_process();
     if (ret.code === 0) {
-      navmenu('search?s=' + title)
+      navmenu('search?s=' + title);
     } else {
-      show_fail_modal(ret.msg);
+      show_fail_modal(ret.msg, fail_func);
     }
   }, true, false);
 }
 
+// 停止接收搜索结果推送
+function stop_search_stream() {
+  if (SearchES) {
+    SearchES.close();
+    SearchES = undefined;
+  }
+}
+
+// 结果页面接收搜索推送，显示各站点进度，完成后显示各站点耗时并刷新结果
+function start_search_stream(count) {
+  stop_search_stream();
+  let status_obj = $("#search_stream_status");
+  SearchES = new EventSource("stream-search");
+  SearchES.onmessage = function (event) {
+    if (!CurrentPageUri.startsWith("search")) {
+      stop_search_stream();
+      return;
+    }
+    let ret = JSON.parse(event.data);
+    if (ret.events.length === 0) {
+      if (!ret.running) {
+        stop_search_stream();
+      }
+      return;
+    }
+    let last = ret.events[ret.events.length - 1];
+    if (last.done) {
+      stop_search_stream();
+      if (last.total !== count && SearchRefreshedSerial !== ret.serial) {
+        // 最终结果已重新排序入库，刷新一次
+        SearchRefreshedSerial = ret.serial;
+        window_history_refresh();
+        return;
+      }
+      let sites = last.sites.map(function (site) {
+        return `${site.site} ${site.seconds}秒/${site.count}条`;
+      });
+      status_obj.text(`搜索完成，共 ${last.total} 条结果，耗时 ${last.seconds} 秒：${sites.join("，")}`).show();
+    } else if (ret.running) {
+      let finished = new Set(ret.events.map(function (item) {
+        return item.site;
+      }));
+      let text = `正在搜索，已完成 ${finished.size} 个站点，共 ${last.total} 条结果`;
+      status_obj.text(text).show();
+      if (last.total > count) {
+        status_obj.append(` <a href="javascript:window_history_refresh()">显示新结果</a>`);
+      }
+    }
+  };
+}
+
 // 显示全局加载蒙版
 function show_wait_modal(blur) {
   if (blur) {
@@ -784,15 +863,7 @@ function show_rss_seasons_modal(name, year, type, mediaid, seasons, func) {
 function search_mediainfo_media(tmdbid, title, typestr) {
   hide_mediainfo_modal();
   const param = { "tmdbid": tmdbid, "search_word": title, "media_type": typestr };
-  show_refresh_progress("正在搜索 " + title + " ...", "search");
-  ajax_post("search", param, function (ret) {
-    hide_refresh_process();
-    if (ret.code === 0) {
-      navmenu('search?s=' + title);
-    } else {
-      show_fail_modal(ret.msg);
-    }
-  }, true, false);
+  start_media_search(param, title);
 }
 
 //新增订阅
@@ -1447,19 +1518,16 @@ function search_media_advanced() {
     "sp_state": sp_state,
     "rule": search_rule
   };
-  const param = { "search_word": keyword, "filters": filters, "unident": true };
+  const param = {
+    "search_word": keyword,
+    "filters": filters,
+    "unident": true,
+    "nocache": $("#advanced_search_nocache").prop("checked")
+  };
   $("#modal-search-advanced").modal("hide");
-  show_refresh_progress(`正在搜索 ${keyword} ...`, "search");
-  ajax_post("search", param, function (ret) {
-    hide_refresh_process();
-    if (ret.code === 0) {
-      navmenu(`search?s=${keyword}`);
-    } else {
-      show_fail_modal(ret.msg, function () {
-        $("#modal-search-advanced").modal("show");
-      });
-    }
-  }, true, false);
+  start_media_search(param, keyword, function () {
+    $("#modal-search-advanced").modal("show");
+  });
 }
 
 //刷新tooltip